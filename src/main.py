@@ -3,7 +3,9 @@ from rag_nakamo.agents.base import BaseAgent
 from rag_nakamo.agents.orchestrator import OrchestratorAgent
 from rag_nakamo.agents.rag import RAGAgent
 from rag_nakamo.agents.response import ResponseAgent
+from rag_nakamo.deadline import Deadline
 from rag_nakamo.logger_config import setup_logging
+from rag_nakamo.llm.usage import get_usage_stats
 from rag_nakamo.security.prompt_guard import PromptGuard
 from rag_nakamo.security.schemas import ClassificationResult
 import logging, os
@@ -15,6 +17,8 @@ def main():
 
     # sample query
     query = "What are the requirements for medical device software?"
+    # optional latency budget (QUERY_DEADLINE_S), stages degrade instead of running over
+    deadline = Deadline.from_budget(settings.query_deadline_s)
 
     # 1. Orchestrator 
     orchestrator = OrchestratorAgent(name="Orchestrator", description="Orchestrates the RAG process")
@@ -22,6 +26,7 @@ def main():
     action_plan, duration = orchestrator.timed(query)
     # logger.info(f"Generated action plan: {action_plan} in {duration:.2f} seconds.")
     logger.info(f"Generated action plan in {duration:.2f} seconds.")
+    action_plan["deadline"] = deadline
 
     # 2. RAG Agent
     rag_agent = RAGAgent(name="RAG Agent", description="Retrieval-Augmented Generation Agent")
@@ -36,7 +41,7 @@ def main():
 
     # 3. Response Agent - After RAG processing
     response_agent = ResponseAgent(name="Response Agent", description="Final response formatting and validation age")
-    final_response = response_agent.process_message(query, retrieval)
+    final_response = response_agent.process_message(query, retrieval, deadline)
     logger.info(f"Final answer OK")
     # if timed
     # logger.info(f"ResponseAgent formatted answer in {duration:.2f} seconds.")
@@ -61,6 +66,9 @@ def main():
     # final
     guarded_response = prompt_guard.classify_and_decide(user_prompt=query, draft_answer=final_response, context_docs=retrieval)
     logger.info(f"Guarded final response: OK")
+    if deadline is not None:
+        logger.info(f"Deadline {deadline.budget:.1f}s, elapsed {deadline.elapsed():.2f}s, degradations: {deadline.fired}")
+    logger.info(f"Token usage (cached input tokens per agent): {get_usage_stats().snapshot()}")
     # logger.info(f"Guarded final response: {guarded_response.final_answer}")
 
 if __name__ == "__main__":
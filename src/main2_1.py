@@ -5,6 +5,7 @@ from rag_nakamo.agents.response import ResponseAgent
 from rag_nakamo.security.prompt_guard import PromptGuard
 from rag_nakamo.security.schemas import ClassificationResult
 from rag_nakamo.logger_config import setup_logging
+from rag_nakamo.llm.usage import get_usage_stats
 import logging
 
 
@@ -68,6 +69,7 @@ def main():
         else:
             logger.error(f"❌ FAILED: {result.get('error', 'Unknown')}")
 
+    logger.info(f"Token usage (cached input tokens per agent): {get_usage_stats().snapshot()}")
     logger.info(f"\n Simple orchestration test complete!")
 
 if __name__ == "__main__":
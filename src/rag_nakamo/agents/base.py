@@ -1,14 +1,39 @@
 import time
-from openai import OpenAI
+from rag_nakamo.llm.client import get_hedged_llm_client, get_llm_client, llm_configured, warm_up_llm
 
 class BaseAgent():
+    # True for agents that can work without an LLM (client is then None)
+    optional_llm = False
+    # True for agents on the latency critical path: calls are hedged when enable_hedging is set
+    hedged_llm = False
+
     def __init__(self, name: str, description: str = ""):
-        # self.client = OpenAI(api_key=openai_api_key)
-        # self.client_type = "OpenAI"
-        self.message_history = []
+        # LLM client is created on first use, see `client`
+        # no per-request state here: agents are shared across threads, see RequestContext
+        self._client = None
         self.name = name
         self.description = description
 
+    @property
+    def client(self):
+        """Shared chat client, initialized on demand."""
+        if self._client is None and (not self.optional_llm or llm_configured()):
+            self._client = get_hedged_llm_client(self.name) if self.hedged_llm else get_llm_client()
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def warm_up(self, preload: bool = True, connect: bool = True):
+        """Pay one-off initialization costs before the first query.
+        preload: read-only state safe to share with forked workers, connect: per process state."""
+        if not self.optional_llm or llm_configured():
+            warm_up_llm(preload=preload, connect=connect)
+
+    def close(self):
+        """Release what the agent started (threads, files). Nothing by default."""
+
     def process_message(self, query: str):
         """Process the input query and return a result"""
         pass
@@ -19,4 +44,4 @@ class BaseAgent():
         result = self.process_message(query)
         duration = time.perf_counter() - start
 
-        return result, duration
\ No newline at end of file
+        return result, duration
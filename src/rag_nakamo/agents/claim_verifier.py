@@ -0,0 +1,119 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Claim support scoring for the claims-checking ResponseAgent.
+# Lexical mode keeps the original heuristic (>= 30% of up to 7 key terms of a claim
+# appear somewhere in the retrieved docs, substring match) but builds an index of the
+# docs once per request instead of scanning every doc for every token of every claim.
+# Embedding mode scores the whole claims x chunks cosine matrix in one matmul.
+
+WORD = re.compile(r"\w+")
+STOPWORDS = {"medical", "device", "regulation", "requirement", "guidance"}
+MAX_TERMS = 7
+MIN_TERM_RATIO = 0.3
+
+
+def claim_terms(claim: str) -> List[str]:
+    """Key terms of a claim: first 7 words longer than 3 chars, minus generic regulatory words."""
+    return [t for t in WORD.findall(claim.lower()) if len(t) > 3 and t not in STOPWORDS][:MAX_TERMS]
+
+
+class DocTermIndex:
+    """Vocabulary of the retrieved docs, built once per request.
+
+    A term (\\w+) occurs as a substring of the doc text iff it is a substring of one of the
+    doc words, so `term in doc_text` is answered by an exact vocabulary hit, or else a
+    single substring search over the deduplicated vocabulary, memoized per term.
+    """
+
+    def __init__(self, doc_texts: Sequence[str]):
+        self.vocab = set()
+        for text in doc_texts:
+            self.vocab.update(WORD.findall(text.lower()))
+        # newline separated, a term never spans two words
+        self._joined = "\n".join(sorted(self.vocab, key=len, reverse=True))
+        self._memo: Dict[str, bool] = {}
+
+    def contains(self, term: str) -> bool:
+        found = self._memo.get(term)
+        if found is None:
+            found = term in self.vocab or term in self._joined
+            self._memo[term] = found
+        return found
+
+
+class ClaimVerifier:
+    def __init__(self, mode: str = "lexical", embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 similarity_threshold: float = 0.5):
+        if mode == "embedding" and embed_fn is None:
+            raise ValueError("embedding mode needs an embed_fn (e.g. OpenAIEmbeddings.embed_documents)")
+        self.mode = mode
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+
+    @staticmethod
+    def _doc_texts(docs: List[Dict[str, Any]]) -> List[str]:
+        return [doc.get("content", "") for doc in docs if isinstance(doc.get("content", ""), str)]
+
+    def build_index(self, docs: List[Dict[str, Any]]) -> Optional[DocTermIndex]:
+        """Per request doc index, reusable across several `check` calls (lexical mode)."""
+        return DocTermIndex(self._doc_texts(docs)) if self.mode == "lexical" else None
+
+    def check(self, claims: List[str], docs: List[Dict[str, Any]],
+              index: Optional[DocTermIndex] = None) -> Tuple[List[str], List[str]]:
+        """Split claims into (supported, unsupported)."""
+        if not claims:
+            return [], []
+        if self.mode == "embedding":
+            mask = self.embedding_support(claims, self._doc_texts(docs))
+        else:
+            mask = self.lexical_support(claims, index or self.build_index(docs))
+        supported = [c for c, ok in zip(claims, mask) if ok]
+        unsupported = [c for c, ok in zip(claims, mask) if not ok]
+        return supported, unsupported
+
+    def lexical_support(self, claims: List[str], index: DocTermIndex) -> List[bool]:
+        mask = []
+        for claim in claims:
+            terms = claim_terms(claim)
+            if not terms:
+                mask.append(False)
+                continue
+            support_count = sum(index.contains(t) for t in terms)
+            mask.append(support_count >= max(1, len(terms) * MIN_TERM_RATIO))
+        return mask
+
+    def embedding_support(self, claims: List[str], doc_texts: List[str]) -> List[bool]:
+        if not doc_texts:
+            return [False] * len(claims)
+        import numpy as np
+        vectors = np.asarray(self.embed_fn(claims + doc_texts), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        claim_vecs, doc_vecs = vectors[: len(claims)], vectors[len(claims):]
+        best = (claim_vecs @ doc_vecs.T).max(axis=1)  # claims x chunks in one matmul
+        return (best >= self.similarity_threshold).tolist()
+
+
+class SentenceStream:
+    """Incremental sentence splitter for streamed text, same boundaries as
+    re.split(r'(?<=[.!?])\\s+', text) on the full text."""
+    BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """Add streamed text, return the sentences completed by it."""
+        self.buffer += delta
+        last = None
+        for match in self.BOUNDARY.finditer(self.buffer):
+            if match.end() < len(self.buffer):  # whitespace run is complete
+                last = match
+        if last is None:
+            return []
+        done, self.buffer = self.buffer[: last.start()], self.buffer[last.end():]
+        return self.BOUNDARY.split(done)
+
+    def flush(self) -> List[str]:
+        rest, self.buffer = self.buffer, ""
+        return self.BOUNDARY.split(rest) if rest else []
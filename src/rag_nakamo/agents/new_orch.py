@@ -2,22 +2,36 @@
 Simplified Orchestrator that executes a standard RAG workflow.
 """
 import logging
-from typing import Dict, Any
-from openai import OpenAI
+from typing import Dict, Any, Optional
 from rag_nakamo.agents.base import BaseAgent
+from rag_nakamo.context import RequestContext
+from rag_nakamo.conversation import ConversationStore
+from rag_nakamo.deadline import Deadline
+from rag_nakamo.logger_config import sample_query
+from rag_nakamo.metrics import REQUESTS, REQUESTS_IN_FLIGHT
 from rag_nakamo.settings import get_settings
+from rag_nakamo.singleflight import SingleFlight, normalize_query
 
 logger = logging.getLogger(__name__)
 
 class SimpleOrchestrator(BaseAgent):
-    """Simplified orchestrator that executes a standard RAG workflow."""
+    """Simplified orchestrator that executes a standard RAG workflow.
+    Stateless per request (see RequestContext), one instance serves concurrent threads;
+    multi-turn history comes from the optional bounded ConversationStore."""
     
     def __init__(self, name: str = "SimpleOrchestrator", 
-                 description: str = "Executes standard RAG workflow"):
+                 description: str = "Executes standard RAG workflow",
+                 conversation_store: Optional[ConversationStore] = None):
         super().__init__(name, description)
         self.settings = get_settings()
-        self.client = OpenAI(api_key=self.settings.openai_api_key)
         self.agents = {}
+        self.conversations = conversation_store
+        # identical normalized questions in flight share one pipeline execution
+        self._inflight = SingleFlight("orchestrator") if self.settings.enable_singleflight else None
+        self.compressor = None
+        if self.settings.enable_compression:
+            from rag_nakamo.compression import ContextCompressor
+            self.compressor = ContextCompressor.from_settings(self.settings)
         self.system_prompt = """
         You are an orchestrator for a medtech regulatory assistant system. 
         Your job is to analyze regulatory questions and decide which agents to use.
@@ -31,30 +45,94 @@ class SimpleOrchestrator(BaseAgent):
         self.agents[name] = agent
         logger.info(f"Registered agent: {name}")
 
-    def process_message(self, query: str) -> Dict[str, Any]:
+    def close(self):
+        """Close the registered agents."""
+        for agent in self.agents.values():
+            agent.close()
+
+    def process_message(self, query: str, deadline: Optional[Deadline] = None,
+                        conversation_id: Optional[str] = None, record_turn: bool = True) -> Dict[str, Any]:
+        """Execute the standard RAG workflow, coalescing identical in-flight queries.
+        Without an explicit deadline, one is started from settings.query_deadline_s (if set).
+        record_turn=False: the caller stores the final (e.g. guarded) answer with record_turn()."""
+        context = RequestContext(
+            query=query,
+            conversation_id=conversation_id,
+            deadline=deadline or Deadline.from_budget(self.settings.query_deadline_s),
+        )
+        if self.conversations is not None and conversation_id is not None:
+            context.summary, context.history = self.conversations.get(conversation_id)
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            with context.timed("request"):
+                if self._inflight is None:
+                    result = self._run_workflow(context)
+                else:
+                    # same conversation and deadline class only; each caller gets its own copy
+                    deadline_class = None if context.deadline is None else context.deadline.budget_class()
+                    key = (conversation_id, deadline_class, normalize_query(query))
+                    result = self._inflight.do(key, self._run_workflow, context)
+                    if result["request_id"] != context.request_id:
+                        result.update(self._own_fields(context), coalesced_with=result["request_id"])
+        except Exception:
+            REQUESTS.labels("unknown", "error").inc()
+            raise
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+        REQUESTS.labels("true" if result["used_rag"] else "false", result["status"]).inc()
+        if record_turn:
+            self.record_turn(conversation_id, query, result["response"])
+        return result
+
+    @staticmethod
+    def _own_fields(context: RequestContext) -> Dict[str, Any]:
+        """Per-request fields of a result, rebuilt for a caller served by another one's execution.
+        Degradations are not: the shared answer was produced under the leader's deadline."""
+        return {"request_id": context.request_id, "timings": context.timings}
+
+    def record_turn(self, conversation_id: Optional[str], query: str, response: str):
+        if self.conversations is not None and conversation_id is not None:
+            self.conversations.append(conversation_id, "user", query)
+            self.conversations.append(conversation_id, "assistant", response)
+
+    def _run_workflow(self, context: RequestContext) -> Dict[str, Any]:
         """Execute the standard RAG workflow."""
+        query, deadline = context.query, context.deadline
+        sample_query()  # keep or drop this query's DEBUG detail (log_debug_sample_rate)
         logger.info(f"Orchestrating query: {query}")
         # Step 1: Decide if we should use RAG (simple check)
         should_use_rag = self._should_use_rag(query)
 
         if should_use_rag:
             # Execute RAG search
-            rag_results = self._execute_rag_search(query)
+            with context.timed("rag"):
+                rag_results = self._execute_rag_search(query, deadline)
             logger.info(f"RAG search found {len(rag_results)} sources")
         else:
             # Skip RAG for non-regulatory queries
             rag_results = []
             logger.info("Skipped RAG search - not a regulatory query")
 
-        # Step 2: Always generate response (with or without RAG results)
-        response = self._generate_response(query, rag_results)
+        # Step 2: keep the sentences relevant to the question (response agent and guard input)
+        context_docs, compression = rag_results, None
+        if rag_results and self.compressor is not None:
+            with context.timed("compress"):
+                context_docs, compression = self._compress_context(query, rag_results)
+
+        # Step 3: Always generate response (with or without RAG results)
+        with context.timed("response"):
+            response = self._generate_response(query, context_docs, deadline, context.history_text())
 
         return {
             "status": "success",
             "response": response,
             "rag_results": rag_results,
+            "context": context_docs,
+            "compression": compression,
             "used_rag": should_use_rag,
-            "sources": [r.get('source') for r in rag_results] if rag_results else []
+            "sources": [r.get('source') for r in rag_results] if rag_results else [],
+            "degradations": list(deadline.degradations) if deadline else [],
+            **self._own_fields(context),
         }
 
     def _should_use_rag(self, query: str) -> bool:
@@ -64,7 +142,7 @@ class SimpleOrchestrator(BaseAgent):
         query_lower = query.lower()
         return any(keyword in query_lower for keyword in regulatory_keywords)
 
-    def _execute_rag_search(self, query: str) -> list:
+    def _execute_rag_search(self, query: str, deadline: Optional[Deadline] = None) -> list:
         """Execute RAG search with the RAG agent."""
         rag_agent = self.agents.get("rag_agent")
         logger.info(f"Executing RAG search for: {query}")
@@ -72,7 +150,8 @@ class SimpleOrchestrator(BaseAgent):
         # Format query for RAG agent
         rag_query = {
             "original_question": query,
-            "arguments": {"focus_areas": []}
+            "arguments": {"focus_areas": []},
+            "deadline": deadline
         }
 
         results, duration = rag_agent.timed(rag_query)
@@ -80,7 +159,15 @@ class SimpleOrchestrator(BaseAgent):
 
         return results if results else []
 
-    def _generate_response(self, query: str, rag_results: list) -> str:
+    def _compress_context(self, query: str, rag_results: list):
+        """Extractive compression within compression_token_budget, see rag_nakamo/compression.py."""
+        embeddings = None
+        if self.compressor.method == "embedding" and "rag_agent" in self.agents:
+            embeddings = self.agents["rag_agent"].embeddings
+        return self.compressor.compress(query, rag_results, embeddings=embeddings)
+
+    def _generate_response(self, query: str, rag_results: list, deadline: Optional[Deadline] = None,
+                           history: str = "") -> str:
         """Generate response with the Response agent."""
         response_agent = self.agents.get("response_agent")
         if not response_agent:
@@ -93,7 +180,7 @@ class SimpleOrchestrator(BaseAgent):
         logger.info(f"Generating response for: {query}")
 
         # response agent
-        response, duration = response_agent.timed(query, rag_results)
+        response, duration = response_agent.timed(query, rag_results, deadline=deadline, history=history)
         logger.info(f"Response generated in {duration:.2f}s")
 
         return response if response else f"Unable to generate response for: {query}"
\ No newline at end of file
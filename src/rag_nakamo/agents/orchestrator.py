@@ -1,6 +1,5 @@
 from rag_nakamo.agents.base import BaseAgent
 from rag_nakamo.settings import get_settings
-from openai import OpenAI
 import logging, json
 
 logger = logging.getLogger(__name__)
@@ -15,7 +14,6 @@ class OrchestratorAgent(BaseAgent):
         super().__init__(name, description)
         self.settings = get_settings()
         self.model = self.settings.orchestrator_model
-        self.client = OpenAI(api_key=self.settings.openai_api_key)
         self.available_functions = {
             "use_rag_agent": {
                 "name": "use_rag_agent",
@@ -102,4 +100,12 @@ class OrchestratorAgent(BaseAgent):
             }
             return action_plan
 
+        # no function call (e.g. local providers without function calling): default RAG plan
+        logger.warning("No function call in orchestrator response, defaulting to use_rag_agent")
+        return {
+            "function": "use_rag_agent",
+            "arguments": {"query": query},
+            "original_question": query
+        }
+
     
@@ -1,35 +1,299 @@
 from rag_nakamo.agents.base import BaseAgent
 from rag_nakamo.settings import get_settings
-from rag_nakamo.vectorstore.chroma_manager import get_vector_store_retriever
-from openai import OpenAI
-from langchain_openai.embeddings import OpenAIEmbeddings
-from sentence_transformers import CrossEncoder
-import logging, json, time
+from rag_nakamo.vectorstore.metadata import build_where, filters_from_focus_areas
+from rag_nakamo.singleflight import SingleFlight
+from functools import cached_property
+from contextlib import contextmanager
+from rag_nakamo.logger_config import LazyJson
+from rag_nakamo.metrics import RETRIEVED, STAGE_SECONDS
+import logging, threading, time
 
 logger = logging.getLogger(__name__)
 
+
+class _IndexHandle:
+    """ Retriever, chunk / parent stores and quantized index of one index version, opened on first use.
+        A query pins one handle for its whole run, so a version switch never mixes indexes. """
+
+    def __init__(self, agent, version=None, chroma_db_path=None, chunk_store_path=None, quantized_index_path=None,
+                 parent_store_path=None):
+        self.agent = agent
+        self.version = version
+        self.chroma_db_path = chroma_db_path
+        self.chunk_store_path = chunk_store_path
+        self.quantized_index_path = quantized_index_path
+        self.parent_store_path = parent_store_path
+        self._pins = 0
+        self._retired = False
+        self._pin_lock = threading.Lock()
+
+    def pin(self) -> bool:
+        """ a query starts using the handle; False once retired (a newer version is current) """
+        with self._pin_lock:
+            if self._retired:
+                return False
+            self._pins += 1
+            return True
+
+    def unpin(self):
+        with self._pin_lock:
+            self._pins -= 1
+            release = self._retired and self._pins == 0
+        if release:
+            self.close()
+
+    def retire(self):
+        """ replaced by a newer version: closed now, or when the last query pinning it finishes """
+        with self._pin_lock:
+            self._retired = True
+            release = self._pins == 0
+        if release:
+            self.close()
+
+    def close(self):
+        """ release what was opened: the Chroma system of the version's path (HNSW segment),
+            store mmaps, quantized index arrays """
+        for name in ("chunk_store", "parent_store"):
+            store = self.__dict__.pop(name, None)
+            if store is not None:
+                store.close()
+        self.__dict__.pop("quantized_index", None)
+        self.__dict__.pop("space", None)
+        if self.__dict__.pop("retriever", None) is not None:
+            from rag_nakamo.vectorstore.chroma_manager import close_persistent_client
+            close_persistent_client(self.chroma_db_path)
+        logger.info(f"RAG closed index version {self.version}")
+
+    @cached_property
+    def retriever(self):
+        from rag_nakamo.vectorstore.chroma_manager import get_vector_store_retriever
+        return get_vector_store_retriever(
+            embeddings=self.agent.embeddings,
+            chroma_db_path=self.chroma_db_path,
+            search_kwargs={"k": self.agent.settings.retrieval_top_k}
+        )
+
+    @cached_property
+    def chunk_store(self):
+        """ compact mode: Chroma holds ids/embeddings/metadata, texts live in the chunk store """
+        if not self.agent.settings.use_chunk_store:
+            return None
+        from rag_nakamo.vectorstore.chunk_store import ChunkStore
+        return ChunkStore(self.chunk_store_path)
+
+    @cached_property
+    def parent_store(self):
+        """ parent-child retrieval: Chroma holds child spans, the parents returned live here """
+        if not self.agent.settings.enable_parent_retrieval:
+            return None
+        from rag_nakamo.vectorstore.chunk_store import ChunkStore
+        return ChunkStore(self.parent_store_path)
+
+    @cached_property
+    def quantized_index(self):
+        """ truncated / quantized first stage + full-precision rescoring (vectorstore/quantized_index.py) """
+        if self.agent.settings.vector_index != "quantized":
+            return None
+        from rag_nakamo.vectorstore.quantized_index import QuantizedIndex
+        return QuantizedIndex(self.quantized_index_path)
+
+    @cached_property
+    def space(self):
+        """ distance metric the collection was built with, relevance scores are converted from it """
+        from rag_nakamo.vectorstore.chroma_manager import collection_space
+        return collection_space(self.retriever.vectorstore._collection)
+
+    def open(self, query_embedding):
+        """ everything a query touches, loaded before the handle serves traffic """
+        self.retriever.vectorstore._collection.query(query_embeddings=[query_embedding], n_results=1)
+        self.space  # collection metadata read once, not on the first query
+        for store in (self.chunk_store, self.parent_store):
+            if store is not None:
+                store.prefetch()
+        if self.quantized_index is not None:
+            self.quantized_index.search(query_embedding, k=1)
+
+
 class RAGAgent(BaseAgent):
+    """ Heavy dependencies (langchain_openai, chromadb, sentence_transformers) are imported
+        and initialized on first use, so a worker without reranking never loads the CrossEncoder """
+
     def __init__(self, name: str, description: str):
         super().__init__(name, description)
         self.settings = get_settings()
-        self.client = OpenAI(api_key=self.settings.openai_api_key)
-        self.client_type = "OpenAI"
-        self.embeddings = OpenAIEmbeddings(api_key=self.settings.openai_api_key, model=self.settings.embeddings_model)
-        self.retriever = get_vector_store_retriever(
-            embeddings=self.embeddings,
-            chroma_db_path=self.settings.chroma_db_path,
-            search_kwargs={"k": self.settings.retrieval_top_k}
-        )
-        self.reranker = CrossEncoder(self.settings.rerank_model)
+        self.client_type = self.settings.model_provider
+        # coalesce identical in-flight embedding and Chroma queries
+        self._inflight = SingleFlight("rag") if self.settings.enable_singleflight else None
+        # index handle: fixed paths from settings, or the version CURRENT points at (vectorstore/versions.py)
+        self._versions = None
+        if self.settings.index_root:
+            from rag_nakamo.vectorstore.versions import IndexVersions
+            self._versions = IndexVersions(self.settings.index_root, keep=self.settings.index_keep_versions)
+        self._index = None
+        self._index_stamp = None
+        self._index_lock = threading.Lock()
+        self._switching = False
+        self._pinned = threading.local()
         logger.info(f"RAG initialized with embeddings: {self.settings.embeddings_model}, reranker: {self.settings.enable_rerank} {self.settings.rerank_model}, retrieval_top_k: {self.settings.retrieval_top_k}")
 
+    @cached_property
+    def embeddings(self):
+        from rag_nakamo.llm.client import get_embeddings
+        return get_embeddings()
+
+    @property
+    def index(self) -> _IndexHandle:
+        """ the handle pinned by the running query, else the current one """
+        return getattr(self._pinned, "index", None) or self._current_index()
+
+    @property
+    def retriever(self):
+        return self.index.retriever
+
+    @property
+    def chunk_store(self):
+        return self.index.chunk_store
+
+    @property
+    def parent_store(self):
+        return self.index.parent_store
+
+    @property
+    def quantized_index(self):
+        return self.index.quantized_index
+
+    def _current_index(self) -> _IndexHandle:
+        if self._versions is None:
+            if self._index is None:
+                with self._index_lock:
+                    if self._index is None:
+                        self._index = _IndexHandle(self, None, self.settings.chroma_db_path,
+                                                   self.settings.chunk_store_path, self.settings.quantized_index_path,
+                                                   self.settings.parent_store_path)
+            return self._index
+        stamp = self._versions.pointer_stamp()  # one stat per query
+        if stamp != self._index_stamp:
+            self._switch_index(stamp)
+        if self._index is None:
+            raise RuntimeError(f"No active index version in {self.settings.index_root}")
+        return self._index
+
+    def _switch_index(self, stamp):
+        """ First handle: opened inline. Later versions: opened and warmed in a background thread
+            while queries keep using the old handle, then swapped in. """
+        with self._index_lock:
+            if stamp == self._index_stamp or self._switching:
+                return
+            version = self._versions.current()
+            if version is None or (self._index is not None and version == self._index.version):
+                self._index_stamp = stamp
+                return
+            handle = _IndexHandle(self, version, **self._versions.paths(version))
+            if self._index is None:
+                self._index, self._index_stamp = handle, stamp
+                logger.info(f"RAG serving index version {version}")
+                return
+            self._switching = True
+
+        def open_and_swap():
+            try:
+                start = time.perf_counter()
+                handle.open(self.embed_query("warm up"))
+                with self._index_lock:
+                    previous, self._index, self._index_stamp = self._index, handle, stamp
+                logger.info(f"RAG index version {previous.version} -> {version} "
+                            f"(opened in {time.perf_counter() - start:.2f}s)")
+                previous.retire()  # closed once the queries still pinning it are done
+            except Exception as e:  # keep serving the old version until the pointer changes again
+                with self._index_lock:
+                    self._index_stamp = stamp
+                handle.close()
+                logger.error(f"RAG could not open index version {version}, still serving {self._index.version}: {e}")
+            finally:
+                with self._index_lock:
+                    self._switching = False
+
+        threading.Thread(target=open_and_swap, name="rag-index-switch", daemon=True).start()
+
+    @contextmanager
+    def pinned_index(self):
+        """ one index version for everything the current query does """
+        if getattr(self._pinned, "index", None) is not None:
+            yield self._pinned.index
+            return
+        handle = self._current_index()
+        while not handle.pin():  # retired between the lookup and the pin: the newer one is current
+            handle = self._current_index()
+        self._pinned.index = handle
+        try:
+            yield handle
+        finally:
+            self._pinned.index = None
+            handle.unpin()
+
+    @cached_property
+    def reranker(self):
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(self.settings.rerank_model)
+
+    def warm_up(self, preload: bool = True, connect: bool = True):
+        """ preload (fork-safe, shared copy-on-write): chunk store mmap, reranker weights, index files in page cache.
+            connect (per process): Chroma client + dummy query (HNSW segment load), embeddings API connection. """
+        start = time.perf_counter()
+        if preload:
+            from rag_nakamo.vectorstore.chroma_manager import prefetch_index_files
+            prefetched = prefetch_index_files(self.index.chroma_db_path)
+            for store in (self.chunk_store, self.parent_store):
+                if store is not None:
+                    store.prefetch()
+            if self.quantized_index is not None:  # first stage loaded, full vectors into the page cache
+                prefetched += prefetch_index_files(self.index.quantized_index_path)
+            if self.settings.enable_rerank:
+                self.reranker.predict([("warm up", "warm up")])
+            logger.info(f"RAG preload done in {time.perf_counter() - start:.2f}s ({prefetched / 1e6:.1f} MB index files)")
+        if connect:
+            start = time.perf_counter()
+            query_embedding = self.embeddings.embed_query("warm up")
+            self.retriever.vectorstore._collection.query(query_embeddings=[query_embedding], n_results=1)
+            logger.info(f"RAG connect warm-up done in {time.perf_counter() - start:.2f}s")
+
     def process_message(self, query: str, focus_areas: list = None):
-        """ Here query is the action plan from orchestrator """
+        """ Here query is the action plan from orchestrator.
+            Explicit `filters` in the plan win over filters derived from focus areas.
+            An optional `deadline` in the plan can shrink k and skip the rerank.
+        """
+        with self.pinned_index():
+            return self._process_message(query, focus_areas)
+
+    def _process_message(self, query: dict, focus_areas: list = None):
         orch_query = query.get("original_question", "")
-        # focus_areas = query.get("arguments", {}).get("focus_areas", []) # currently unused
-        retrieved = self.search_documents(orch_query)
+        if focus_areas is None:
+            focus_areas = query.get("arguments", {}).get("focus_areas", [])
+        filters, derived = query.get("filters"), False
+        if filters is None and self.settings.enable_metadata_filters:
+            filters, derived = filters_from_focus_areas(focus_areas), True
+        deadline = query.get("deadline")  # see rag_nakamo/deadline.py
+        k = None
+        if deadline is not None and deadline.degrade("shrink_top_k", self.settings.degrade_top_k_below_s):
+            k = min(self.settings.degraded_top_k, self.settings.retrieval_top_k)
+        retrieved = self.search_documents(orch_query, filters=filters, k=k)
+        if not retrieved and derived and filters:
+            # an index built without the metadata (or a wrong guess of the orchestrator) matches nothing
+            logger.info(f"No results with focus area filters {filters}, searching unfiltered")
+            retrieved = self.search_documents(orch_query, k=k)
         # rerank after first retrieval
-        if self.settings.enable_rerank: retrieved = self.rerank_documents(orch_query, retrieved)
+        if self.settings.enable_rerank:
+            if deadline is not None and deadline.degrade("skip_rerank", self.settings.degrade_rerank_below_s):
+                retrieved = retrieved[:self.settings.rerank_top_k]
+            else:
+                with STAGE_SECONDS.labels("rerank").time():
+                    retrieved = self.rerank_documents(orch_query, retrieved)
+        if self.chunk_store is not None or self.parent_store is not None:
+            # hits behave like the result dicts, text is decompressed only when read
+            for i, hit in enumerate(retrieved):
+                hit.rank = i + 1
+            return retrieved
+
         results = []
         for i, doc in enumerate(retrieved):
             source = doc.metadata.get("source", "")
@@ -38,26 +302,152 @@ class RAGAgent(BaseAgent):
                 "content": doc.page_content,
                 "source": doc.metadata.get("source", "Unknown"),
                 "page": doc.metadata.get("page", "Unknown"),
+                "section": doc.metadata.get("section_heading", ""),
                 "relevance_score": doc.metadata.get("score")
             }
             results.append(result)
 
         return results
 
-    def search_documents(self, query: str):
+    def search_documents(self, query: str, filters: dict = None, k: int = None):
+        """ Similarity search, filters (see build_where) are applied inside the Chroma query """
         # retrieved_docs = self.retriever.invoke(query)-> no score
         # now returns tuples of (document, score)
-        docs_scores = self.retriever.vectorstore.similarity_search_with_score(
-            query, 
-            k=self.settings.retrieval_top_k
+        where = build_where(filters)
+        if where: logger.info(f"Metadata filter: {where}")
+        k = k or self.settings.retrieval_top_k
+        with STAGE_SECONDS.labels("embed").time():
+            query_embedding = self.embed_query(query)
+        with self.pinned_index() as index:
+            key = (index.version, query, repr(where), k)  # queries on different versions never coalesce
+            if self.parent_store is not None:
+                path, fn, args = "parents", self._search_parents, (query_embedding, where, k)
+            elif self.settings.enable_mmr:
+                path, fn, args = "mmr", self._search_diverse, (query_embedding, where, k)
+            elif self.quantized_index is not None and not where:
+                # metadata filters need Chroma's where clause, filtered queries stay on Chroma
+                path, fn, args = "quantized", self._search_quantized, (query_embedding, k)
+            elif self.chunk_store is not None:
+                path, fn, args = "hits", self._search_chunk_hits, (query_embedding, where, k)
+            else:
+                path, fn, args = "docs", self._search_docs, (query_embedding, where, k)
+            with STAGE_SECONDS.labels("search").time():
+                retrieved = self._coalesced((path,) + key, fn, *args)
+            RETRIEVED.labels(path).observe(len(retrieved))
+            return retrieved
+
+    def embed_query(self, query: str):
+        """ Query embedding, identical concurrent queries share one API call """
+        return self._coalesced(("embed", query), self.embeddings.embed_query, query)
+
+    def _coalesced(self, key, fn, *args):
+        if self._inflight is None:
+            return fn(*args)
+        return self._inflight.do(key, fn, *args)
+
+    def _relevance(self, distances):
+        from rag_nakamo.vectorstore.chroma_manager import relevance_score
+        space = self.index.space
+        return [relevance_score(d, space) for d in distances]
+
+    def _search_docs(self, query_embedding, where: dict, k: int):
+        # returns raw distances despite the name (lower is closer)
+        docs_scores = self.retriever.vectorstore.similarity_search_by_vector_with_relevance_scores(
+            query_embedding,
+            k=k,
+            filter=where
         )
         # Add scores to document metadata
         retrieved_docs = []
-        for doc, score in docs_scores:
+        for (doc, _), score in zip(docs_scores, self._relevance([d for _, d in docs_scores])):
             doc.metadata["score"] = score
             retrieved_docs.append(doc)
         return retrieved_docs
 
+    def _search_chunk_hits(self, query_embedding, where: dict, k: int):
+        """ Query the Chroma collection directly, without documents, returning ChunkHits """
+        from rag_nakamo.vectorstore.chunk_store import ChunkHit
+        res = self.retriever.vectorstore._collection.query(
+            query_embeddings=[query_embedding],
+            n_results=k,
+            where=where,
+            include=["metadatas", "distances"]
+        )
+        return [
+            ChunkHit(metadata["chunk_id"], score, metadata, self.chunk_store)
+            for metadata, score in zip(res["metadatas"][0], self._relevance(res["distances"][0]))
+        ]
+
+    def _search_quantized(self, query_embedding, k: int):
+        """ Same outputs as the Chroma paths (Documents or ChunkHits), score is the exact cosine similarity """
+        hits = self.quantized_index.search(query_embedding, k=k, oversample=self.settings.rescore_oversample)
+        return self._quantized_hits(hits)
+
+    def _quantized_hits(self, hits):
+        index = self.quantized_index
+        if self.chunk_store is not None:
+            from rag_nakamo.vectorstore.chunk_store import ChunkHit
+            return [ChunkHit(index.metadatas[i]["chunk_id"], score, index.metadatas[i], self.chunk_store)
+                    for i, score in hits]
+        # the index keeps ids only: texts of the returned hits are read from Chroma
+        from langchain_core.documents import Document
+        ids = [index.ids[i] for i, _ in hits]
+        res = self.retriever.vectorstore._collection.get(ids=ids, include=["documents"]) if ids else {"ids": []}
+        texts = dict(zip(res["ids"], res.get("documents") or []))
+        return [Document(page_content=texts.get(index.ids[i]) or "", metadata={**index.metadatas[i], "score": score})
+                for i, score in hits]
+
+    def _search_parents(self, query_embedding, where: dict, k: int):
+        """ parent_fetch_k children -> grouped by parent, best child scores -> ChunkHits of the parents,
+            at most k and parent_token_budget tokens """
+        from rag_nakamo.vectorstore.chunk_store import ChunkHit
+        from rag_nakamo.vectorstore.parents import select_parents
+        n = max(k, self.settings.parent_fetch_k)
+        index = self.quantized_index
+        if index is not None and not where:
+            pairs = index.search(query_embedding, k=n, oversample=self.settings.rescore_oversample)
+            metadatas, scores = [index.metadatas[i] for i, _ in pairs], [score for _, score in pairs]
+        else:
+            res = self.retriever.vectorstore._collection.query(
+                query_embeddings=[query_embedding], n_results=n, where=where, include=["metadatas", "distances"])
+            metadatas, scores = res["metadatas"][0], self._relevance(res["distances"][0])
+        parents = select_parents(metadatas, scores, k, self.settings.parent_token_budget)
+        logger.info(f"{len(metadatas)} children -> {len(parents)} parents "
+                    f"({sum(m.get('parent_tokens', 0) for _, _, m in parents)} tokens)")
+        return [ChunkHit(parent_id, score, metadata, self.parent_store) for parent_id, score, metadata in parents]
+
+    def _search_candidates(self, query_embedding, where: dict, n: int):
+        """ (hits, embedding matrix) of the top n, hits as returned by the other search paths """
+        import numpy as np
+        index = self.quantized_index
+        if index is not None and not where:
+            pairs = index.search(query_embedding, k=n, oversample=self.settings.rescore_oversample)
+            return self._quantized_hits(pairs), np.asarray(index.full[[i for i, _ in pairs]])
+        include = ["metadatas", "distances", "embeddings"]
+        if self.chunk_store is None:
+            include.append("documents")
+        res = self.retriever.vectorstore._collection.query(
+            query_embeddings=[query_embedding], n_results=n, where=where, include=include)
+        metadatas, scores = res["metadatas"][0], self._relevance(res["distances"][0])
+        if self.chunk_store is not None:
+            from rag_nakamo.vectorstore.chunk_store import ChunkHit
+            hits = [ChunkHit(m["chunk_id"], s, m, self.chunk_store) for m, s in zip(metadatas, scores)]
+        else:
+            from langchain_core.documents import Document
+            hits = [Document(page_content=text, metadata={**m, "score": s})
+                    for text, m, s in zip(res["documents"][0], metadatas, scores)]
+        return hits, np.asarray(res["embeddings"][0], dtype=np.float32)
+
+    def _search_diverse(self, query_embedding, where: dict, k: int):
+        """ mmr_fetch_k candidates -> at most max_chunks_per_page per page -> MMR down to k """
+        from rag_nakamo.vectorstore.mmr import dedup_indices, mmr_select
+        hits, embeddings = self._search_candidates(query_embedding, where, max(k, self.settings.mmr_fetch_k))
+        kept = dedup_indices([hit.metadata for hit in hits], self.settings.max_chunks_per_page,
+                             self.settings.max_chunks_per_source)
+        selected = mmr_select(query_embedding, embeddings[kept], k, self.settings.mmr_lambda)
+        logger.info(f"Diversified {len(hits)} candidates -> {len(kept)} after page dedup -> {len(selected)}")
+        return [hits[kept[i]] for i in selected]
+
     def rerank_documents(self, query: str, documents: list):
         """ Optional rerank retrieved documents based on relevance to query """
         # Prepare inputs for reranker
@@ -69,11 +459,12 @@ class RAGAgent(BaseAgent):
         sorted_docs = sorted(scored_docs, key=lambda x: x[2], reverse=True) # desc order scores, 2: score
         top_docs = [doc for _, doc, _ in sorted_docs[:self.settings.rerank_top_k]] # top k
 
-        # log changes in order
-        order_changes = [
-            {"change": f"{idx} -> {new_idx} ({float(score):.4f})"}
-            for new_idx, (idx, doc, score) in enumerate(sorted_docs)
-        ]
-        logging.info(f"Reranked documents: {json.dumps(order_changes, indent=2)}")
+        # log changes in order (built and serialized only when DEBUG is on for this query)
+        if logger.isEnabledFor(logging.DEBUG):
+            order_changes = [
+                {"change": f"{idx} -> {new_idx} ({float(score):.4f})"}
+                for new_idx, (idx, doc, score) in enumerate(sorted_docs)
+            ]
+            logger.debug("Reranked documents: %s", LazyJson(order_changes))
 
         return top_docs  # top k
\ No newline at end of file
@@ -1,11 +1,18 @@
 import re
 import json
 import logging
-from typing import List, Dict, Any, Tuple, Optional
-from openai import OpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterator
 
 from rag_nakamo.settings import get_settings
 from rag_nakamo.agents.base import BaseAgent
+from rag_nakamo.agents.claim_verifier import ClaimVerifier, SentenceStream
+from rag_nakamo.agents.prompts import (
+    CLAIMS_FORMAT_SYSTEM_PROMPT, ASSESSMENT_SYSTEM_PROMPT,
+    format_claims_user, format_assessment_user, format_documents,
+)
+from rag_nakamo.llm.usage import get_usage_stats
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +36,9 @@ class ResponseAgent(BaseAgent):
       }
     """
 
+    optional_llm = True # without api key: client is None
+    hedged_llm = True # latency critical, see enable_hedging
+
     def __init__(
         self,
         name: str = "ResponseAgent",
@@ -37,16 +47,41 @@ class ResponseAgent(BaseAgent):
         max_unsupported: int = 2,
         enable_llm_assessment: bool = True,
         enable_regulatory_formatting: bool = True,
+        support_mode: str = "lexical",
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        overlap_validation: bool = False,
+        skip_assessment_when_decisive: bool = False,
+        decisive_coverage: Tuple[float, float] = (0.3, 0.95),
     ):
         super().__init__(name, description)
         settings = get_settings()
         self.model = settings.response_model
         self.validation_model = getattr(settings, "validation_model", self.model)
-        self.client = OpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
         self.min_coverage = min_coverage
         self.max_unsupported = max_unsupported
         self.enable_llm_assessment = enable_llm_assessment
         self.enable_regulatory_formatting = enable_regulatory_formatting
+        # "lexical" (indexed term heuristic) or "embedding" (cosine, needs embed_fn)
+        self.verifier = ClaimVerifier(mode=support_mode, embed_fn=embed_fn)
+        # overlap: stream formatting, check claims per completed sentence, assess the draft concurrently
+        self.overlap_validation = overlap_validation
+        self.skip_assessment_when_decisive = skip_assessment_when_decisive
+        self.decisive_coverage = decisive_coverage
+        self._executor = None  # assessment threads, started on the first overlapped request
+        self._executor_lock = threading.Lock()
+
+    def _assessment_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="assessment")
+            return self._executor
+
+    def close(self):
+        """Stop the assessment threads; a later overlapped request starts new ones."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """Process and format the final answer."""
@@ -82,6 +117,9 @@ class ResponseAgent(BaseAgent):
         if not answer:
             return self._error_result("Missing answer content")
 
+        if self.overlap_validation and self.enable_regulatory_formatting and self.client and docs:
+            return self._process_overlapped(question, answer, docs)
+
         # Format the answer using LLM if available and enabled
         if self.enable_regulatory_formatting and self.client:
             formatted_answer = self._format_answer_with_llm(answer, question, docs)
@@ -106,6 +144,9 @@ class ResponseAgent(BaseAgent):
         if self.enable_llm_assessment and self.client and docs:
             assessment = self._get_llm_assessment(question, formatted_answer, claims, supported, docs)
 
+        return self._build_result(decision, formatted_answer, coverage, claims, unsupported, assessment)
+
+    def _build_result(self, decision, formatted_answer, coverage, claims, unsupported, assessment) -> Dict[str, Any]:
         result = {
             "decision": decision,
             "formatted_answer": formatted_answer,
@@ -121,58 +162,77 @@ class ResponseAgent(BaseAgent):
         logger.info(f"ResponseAgent decision: {decision} (coverage: {coverage:.2f})")
         return result
 
-    def _format_answer_with_llm(self, answer: str, question: str = "", docs: List[Dict] = None) -> str:
-        """Format the answer using LLM with regulatory expert prompt."""
-        try:
-            # Prepare document context for the LLM
-            doc_context = ""
-            if docs:
-                doc_context = "\n\nREGULATORY DOCUMENTS:\n"
-                for i, doc in enumerate(docs, 1):
-                    source = doc.get('source', f'Document_{i}')
-                    content = doc.get('content', '')
-                    doc_context += f"\n[{source}]\n{content}\n"
-            
-            regulatory_prompt = """You are a regulatory expert assistant. 
-Your task is to provide comprehensive, accurate answers to regulatory questions about medical devices based on the provided regulatory documents.
+    def _is_decisive(self, coverage: float) -> bool:
+        low, high = self.decisive_coverage
+        return coverage <= low or coverage >= high
 
-IMPORTANT GUIDELINES:
-1. Base your answer ONLY on the provided regulatory documents
-2. Provide a structured response with clear sections
-3. Include specific citations for each major point
-4. If the documents don't contain enough information, clearly state this
-5. Use professional, technical language appropriate for regulatory context
-6. Highlight key requirements, processes, or standards mentioned
-7. Compare FDA vs WHO approaches when relevant
+    def _process_overlapped(self, question: str, answer: str, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Overlapped validation: the assessment of the draft runs while the formatted answer
+        streams in, and claims are checked as soon as their sentence is complete."""
+        index = self.verifier.build_index(docs)
 
-RESPONSE STRUCTURE:
-- ## Executive Summary (brief overview)
-- ## Detailed Analysis (main content with citations)
-- ## Key Requirements/Standards (if applicable)
-- ## Sources (list all referenced documents)
+        assessment_future = None
+        assessment = {}
+        if self.enable_llm_assessment:
+            # the assessment only needs the draft and its claims, start it right away
+            draft_claims = self._extract_claims(answer)
+            draft_supported, _ = self.verifier.check(draft_claims, docs, index)
+            draft_coverage = (len(draft_supported) / len(draft_claims)) if draft_claims else 1.0
+            if self.skip_assessment_when_decisive and self._is_decisive(draft_coverage):
+                assessment = {"skipped": f"decisive draft coverage {draft_coverage:.2f}"}
+            else:
+                assessment_future = self._assessment_executor().submit(
+                    self._get_llm_assessment, question, answer, draft_claims, draft_supported, docs
+                )
 
-Use citation format: [Source Name, Page X] after each major point.
+        parts, claims, supported, unsupported = [], [], [], []
+        splitter = SentenceStream()
 
-QUESTION: {question}
+        def check(sentences):
+            new_claims = [c.strip() for c in sentences if self._is_claim(c.strip())]
+            if new_claims and self.verifier.mode == "lexical":
+                ok, ko = self.verifier.check(new_claims, docs, index)
+                supported.extend(ok)
+                unsupported.extend(ko)
+            claims.extend(new_claims)
 
-CURRENT ANSWER TO REFORMAT: {answer}
-{doc_context}
+        for delta in self._stream_format_with_llm(answer, question, docs):
+            parts.append(delta)
+            check(splitter.feed(delta))
+        check(splitter.flush())
+        if self.verifier.mode != "lexical":
+            supported, unsupported = self.verifier.check(claims, docs)
 
-Please reformat the current answer following the guidelines above."""
+        formatted_answer = "".join(parts).strip()
+        coverage = (len(supported) / len(claims)) if claims else 1.0
+        decision = self._make_decision(coverage, unsupported)
 
+        if assessment_future is not None:
+            if self.skip_assessment_when_decisive and self._is_decisive(coverage) and not assessment_future.done():
+                assessment_future.cancel()  # no effect once running, the late result is just dropped
+                assessment = {"skipped": f"decisive coverage {coverage:.2f}"}
+            else:
+                assessment = assessment_future.result()
+
+        return self._build_result(decision, formatted_answer, coverage, claims, unsupported, assessment)
+
+    def _format_answer_with_llm(self, answer: str, question: str = "", docs: List[Dict] = None) -> str:
+        """Format the answer using LLM with regulatory expert prompt."""
+        try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are a regulatory expert specializing in medical device regulations. Format responses according to the provided structure."},
-                    {"role": "user", "content": regulatory_prompt.format(
+                    {"role": "system", "content": CLAIMS_FORMAT_SYSTEM_PROMPT},
+                    {"role": "user", "content": format_claims_user(
+                        documents=format_documents(docs or []),
                         question=question,
-                        answer=answer,
-                        doc_context=doc_context
+                        answer=answer
                     )},
                 ],
                 temperature=0.1,
                 max_tokens=2000,
             )
+            get_usage_stats().record(self.name, response)
             
             formatted_answer = response.choices[0].message.content.strip()
             logger.info("Successfully formatted answer using LLM regulatory prompt")
@@ -182,6 +242,43 @@ Please reformat the current answer following the guidelines above."""
             logger.warning(f"LLM formatting failed: {e}. Falling back to basic formatting.")
             return self._format_answer_basic(answer, question, docs)
 
+    def _stream_format_with_llm(self, answer: str, question: str = "", docs: List[Dict] = None) -> Iterator[str]:
+        """Streaming variant of _format_answer_with_llm, yields text deltas."""
+        produced = False
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": CLAIMS_FORMAT_SYSTEM_PROMPT},
+                    {"role": "user", "content": format_claims_user(
+                        documents=format_documents(docs or []),
+                        question=question,
+                        answer=answer
+                    )},
+                ],
+                temperature=0.1,
+                max_tokens=2000,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            if hasattr(stream, "choices"):  # backend without streaming (local providers)
+                get_usage_stats().record(self.name, stream)
+                produced = True
+                yield stream.choices[0].message.content
+                return
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    get_usage_stats().record(self.name, chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    produced = True
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            if produced:
+                logger.warning(f"LLM formatting stream interrupted: {e}. Keeping partial answer.")
+                return
+            logger.warning(f"LLM formatting failed: {e}. Falling back to basic formatting.")
+            yield self._format_answer_basic(answer, question, docs)
+
     def _format_answer_basic(self, answer: str, question: str = "", docs: List[Dict] = None) -> str:
         """Basic formatting fallback when LLM is not available."""
         if not answer.strip():
@@ -220,53 +317,21 @@ Please reformat the current answer following the guidelines above."""
         """Extract factual claims from the answer."""
         # Split by sentences and filter meaningful ones
         sentences = re.split(r'(?<=[.!?])\s+', answer)
-        claims = []
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            # Skip short sentences, questions, headers, and source citations
-            if (len(sentence.split()) >= 4 and 
+        return [sentence.strip() for sentence in sentences if self._is_claim(sentence.strip())]
+
+    @staticmethod
+    def _is_claim(sentence: str) -> bool:
+        # Skip short sentences, questions, headers, and source citations
+        return (len(sentence.split()) >= 4 and 
                 not sentence.startswith('#') and
                 not sentence.startswith('Sources:') and
                 not sentence.startswith('-') and
                 not sentence.endswith('?') and
-                not re.match(r'^\[.*\]$', sentence)):  # Skip citation-only lines
-                claims.append(sentence)
-        
-        return claims
+                not re.match(r'^\[.*\]$', sentence))  # Skip citation-only lines
 
     def _check_support(self, claims: List[str], docs: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
-        """Check which claims are supported by the retrieved documents."""
-        doc_texts = []
-        for doc in docs:
-            content = doc.get("content", "")
-            if isinstance(content, str):
-                doc_texts.append(content.lower())
-        
-        supported, unsupported = [], []
-        
-        for claim in claims:
-            # Extract key terms from the claim, excluding common regulatory words
-            tokens = [t for t in re.findall(r'\w+', claim.lower()) 
-                     if len(t) > 3 and t not in {'medical', 'device', 'regulation', 'requirement', 'guidance'}][:7]
-            
-            if not tokens:
-                unsupported.append(claim)
-                continue
-            
-            # Check if sufficient tokens appear in documents
-            support_count = 0
-            for token in tokens:
-                if any(token in doc_text for doc_text in doc_texts):
-                    support_count += 1
-            
-            # Require at least 30% of key terms to be found
-            if support_count >= max(1, len(tokens) * 0.3):
-                supported.append(claim)
-            else:
-                unsupported.append(claim)
-        
-        return supported, unsupported
+        """Check which claims are supported by the retrieved documents (single pass, see ClaimVerifier)."""
+        return self.verifier.check(claims, docs)
 
     def _make_decision(self, coverage: float, unsupported: List[str]) -> str:
         """Make approval decision based on coverage and unsupported claims."""
@@ -286,30 +351,22 @@ Please reformat the current answer following the guidelines above."""
         try:
             sources = [d.get('source', 'Unknown') for d in docs[:3]]
             
-            prompt = f"""Evaluate this regulatory answer for quality and accuracy. Return JSON only.
-
-Question: {question}
-Answer: {answer}
-Supported claims: {len(supported)}/{len(claims)}
-Available sources: {sources}
-
-Return JSON with:
-- overall_quality: 1-5 scale
-- regulatory_compliance: 1-5 scale for regulatory formatting
-- citation_quality: 1-5 scale for proper citations
-- missing_aspects: list of missing important regulatory aspects
-- potential_hallucinations: list of potentially unsupported statements
-- formatting_score: 1-5 for clarity and regulatory structure"""
-
             response = self.client.chat.completions.create(
                 model=self.validation_model,
                 messages=[
-                    {"role": "system", "content": "You are a regulatory quality assessor. Return only valid JSON."},
-                    {"role": "user", "content": prompt},
+                    {"role": "system", "content": ASSESSMENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": format_assessment_user(
+                        sources=sources,
+                        supported=len(supported),
+                        claims=len(claims),
+                        question=question,
+                        answer=answer
+                    )},
                 ],
                 temperature=0.1,
                 max_tokens=500,
             )
+            get_usage_stats().record(self.name, response)
             
             raw_content = response.choices[0].message.content.strip()
             
@@ -1,82 +1,100 @@
 import re, json
 import logging, time
-from typing import List, Dict, Any
-from openai import OpenAI
+from typing import List, Dict, Any, Optional
 from rag_nakamo.settings import get_settings
 from rag_nakamo.agents.base import BaseAgent
+from rag_nakamo.deadline import Deadline
+from rag_nakamo.agents.prompts import (
+    RESPONSE_SYSTEM_PROMPT, format_response_user, format_response_user_with_history, format_documents,
+)
+from rag_nakamo.llm.usage import get_usage_stats
+from rag_nakamo.metrics import LLM_SECONDS
 
 logger = logging.getLogger(__name__)
 
 class ResponseAgent(BaseAgent):
     """ Final answer formatter and validator for regulatory content. """
 
+    optional_llm = True # without api key: client is None
+    hedged_llm = True # latency critical, see enable_hedging
+
     def __init__( self, name: str, description: str, enable_regulatory_formatting: bool = True):
         super().__init__(name, description)
         settings = get_settings()
         self.model = settings.response_model
         self.validation_model = getattr(settings, "validation_model", self.model)
-        self.client = OpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
         self.enable_regulatory_formatting = enable_regulatory_formatting
         logger.info(f"Responser initialized with model: {self.model}")
 
-    def process_message(self, query, content):
+    def process_message(self, query, content, deadline: Optional[Deadline] = None, history: str = ""):
         """ Process and format the final answer.
             content : output of RAGAgent
+            deadline : optional, a short remaining budget shrinks the context and caps the output
+            history : optional conversation so far (RequestContext.history_text)
         """
         # logger.info(f"Processing message with ResponseAgent: {self.name}")
         # Format the answer using LLM if available and enabled
-        formatted_answer = self._format_answer_with_llm(query, content)
+        formatted_answer = self._format_answer_with_llm(query, content, deadline, history)
         return formatted_answer
 
-    def _format_answer_with_llm(self, question: str, content: List[Dict[str, Any]]) -> str:
-        """Format the answer using LLM with regulatory expert prompt."""
-
-        regulatory_prompt = """You are a regulatory expert assistant. 
-        Your task is to provide comprehensive, accurate answers to a given regulatory QUESTION about medical devices based on the provided regulatory documents content.
-
-        IMPORTANT GUIDELINES:
-        1. Base your answer ONLY on the provided regulatory documents snippets
-        2. Provide a structured response with clear sections
-        3. Include specific citations for each major point
-        4. If the documents don't contain enough information, clearly state this
-        5. Use professional, technical language appropriate for regulatory context
-        6. Highlight key requirements, processes, or standards mentioned
-        7. Compare FDA vs WHO approaches when relevant
-
-        RESPONSE STRUCTURE:
-        - ## Executive Summary (brief overview) and key requirements (if applicable)
-        - ## Detailed Analysis (main content with citations from the first answer)
-        - ## Sources (list all referenced documents, with pages)
-
-        Use citation format: [Source Name, Page X] after each major point and at the end Sources."""
-
-        user_prompt = """
-        QUESTION: {question}
-
-        CURRENT ANSWER CONTENT TO CREATE A FINAL RESPONSE FROM: {content}
-
-        Please reformat the current answer to the question following the guidelines above."""
+    def _format_answer_with_llm(self, question: str, content: List[Dict[str, Any]], deadline: Optional[Deadline] = None,
+                                history: str = "") -> str:
+        """Format the answer using LLM with regulatory expert prompt.
+        Static instructions are the system message, documents then question close the user message.
+        """
+        settings = get_settings()
+        max_tokens, options = 10000, {}
+        if deadline is not None:
+            if deadline.degrade("shrink_context", settings.degrade_context_below_s):
+                content = self._fit_context(content, settings.degraded_context_chars)
+            if deadline.degrade("cap_max_tokens", settings.degrade_max_tokens_below_s):
+                max_tokens = settings.degraded_max_tokens
+            options["timeout"] = max(deadline.remaining(), 1.0)
+        documents = content if isinstance(content, str) else format_documents(content)
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": regulatory_prompt},
-                {"role": "user", "content": user_prompt.format(
-                    question=question,
-                    content=content
-                )},
-            ],
-            temperature=0.1,
-            max_tokens=10000,
-        )
+        with LLM_SECONDS.labels(self.name).time():
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": RESPONSE_SYSTEM_PROMPT},
+                    {"role": "user", "content": format_response_user(
+                        documents=documents,
+                        question=question
+                    ) if not history else format_response_user_with_history(
+                        documents=documents,
+                        history=history,
+                        question=question
+                    )},
+                ],
+                temperature=0.1,
+                max_tokens=max_tokens,
+                **options,
+            )
+        get_usage_stats().record(self.name, response)
         formatted_answer = response.choices[0].message.content.strip()
         logger.info("Formatted answer using LLM regulatory prompt")
         return formatted_answer
     
-    def timed(self, query: str, content):
+    @staticmethod
+    def _fit_context(content, max_chars: int):
+        """Top ranked documents up to max_chars of content, the last one truncated."""
+        if isinstance(content, str):
+            return content[:max_chars]
+        fitted, total = [], 0
+        for doc in content:
+            text = doc.get("content", "")
+            if total + len(text) > max_chars:
+                if max_chars - total > 200:
+                    fitted.append({**doc, "content": text[:max_chars - total]})
+                break
+            fitted.append(doc)
+            total += len(text)
+        return fitted
+
+    def timed(self, query: str, content, deadline: Optional[Deadline] = None, history: str = ""):
         """Rewriten for content arg"""
         start = time.perf_counter()
-        result = self.process_message(query, content)
+        result = self.process_message(query, content, deadline, history)
         duration = time.perf_counter() - start
 
         return result, duration
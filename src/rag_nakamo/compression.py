@@ -0,0 +1,148 @@
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from rag_nakamo.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Extractive context compression between retrieval and generation: the retrieved chunks are
+# split into sentences, every sentence is scored against the question (BM25 over the sentence
+# pool, or cosine similarity of sentence embeddings) and the best ones are kept, in their
+# original order, until the token budget is used. Each document keeps its source / page, so
+# citations still work, and documents without a selected sentence are dropped.
+# Token counts are the shared estimate of rag_nakamo/tokens.py.
+
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+(?=[\"'(\[]?[A-Z0-9])|\n\s*\n|\n(?=\s*(?:[-•*▪]|\(?[a-z0-9]{1,3}[.)])\s)")
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its must of on or should "
+    "that the their there these this to under what when which who will with".split()
+)
+GAP = " [...] "
+
+
+def split_sentences(text: str, min_chars: int = 20) -> List[str]:
+    """Sentences / list items of a chunk; fragments shorter than min_chars join the previous one."""
+    sentences: List[str] = []
+    for part in SENTENCE_END.split(text):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        if sentences and len(part) < min_chars:
+            sentences[-1] += " " + part
+        else:
+            sentences.append(part)
+    return sentences
+
+
+def terms(text: str) -> List[str]:
+    return [w for w in WORD.findall(text.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def bm25_scores(query: str, sentences: List[str], k1: float = 1.2, b: float = 0.75) -> np.ndarray:
+    """BM25 of every sentence for the query terms, idf taken over the sentence pool."""
+    query_terms = sorted(set(terms(query)))
+    if not query_terms or not sentences:
+        return np.zeros(len(sentences), dtype=np.float32)
+    column = {t: j for j, t in enumerate(query_terms)}
+    tf = np.zeros((len(sentences), len(query_terms)), dtype=np.float32)
+    lengths = np.empty(len(sentences), dtype=np.float32)
+    for i, sentence in enumerate(sentences):
+        words = terms(sentence)
+        lengths[i] = len(words)
+        for term, count in Counter(w for w in words if w in column).items():
+            tf[i, column[term]] = count
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((len(sentences) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0))
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def _as_dict(doc) -> Dict[str, Any]:
+    return doc.to_dict() if hasattr(doc, "to_dict") else dict(doc)
+
+
+class ContextCompressor:
+    def __init__(self, token_budget: int = 1000, method: str = "lexical", neighbors: int = 0):
+        self.token_budget = token_budget
+        self.method = method
+        self.neighbors = neighbors
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.compression_token_budget, settings.compression_method, settings.compression_neighbors)
+
+    def score(self, query: str, sentences: List[str], embeddings=None) -> np.ndarray:
+        if self.method == "embedding" and embeddings is not None:
+            # one batched call for all sentences; the query embedding is coalesced with RAGAgent's
+            vectors = np.asarray(embeddings.embed_documents(sentences), dtype=np.float32)
+            query_vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            return vectors @ (query_vector / max(np.linalg.norm(query_vector), 1e-12))
+        return bm25_scores(query, sentences)
+
+    def compress(self, query: str, docs: List[Any], embeddings=None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """(compressed documents, stats). Documents are result dicts or ChunkHits, returned as dicts
+        with the selected sentences of `content`; all other fields (source, page, rank, ...) kept."""
+        start = time.perf_counter()
+        docs = [_as_dict(doc) for doc in docs]
+        tokens_in = sum(estimate_tokens(doc.get("content", "")) for doc in docs)
+        if tokens_in <= self.token_budget:
+            return docs, {"tokens_in": tokens_in, "tokens_out": tokens_in, "sentences_in": None,
+                          "sentences_out": None, "docs_out": len(docs), "seconds": 0.0}
+
+        per_doc = [split_sentences(doc.get("content", "")) for doc in docs]
+        owner = np.array([d for d, sentences in enumerate(per_doc) for _ in sentences], dtype=np.int32)
+        position = np.array([i for sentences in per_doc for i in range(len(sentences))], dtype=np.int32)
+        pool = [s for sentences in per_doc for s in sentences]
+        scores = self.score(query, pool, embeddings)
+        cost = np.array([estimate_tokens(s) + 1 for s in pool], dtype=np.int32)
+
+        # every document's best sentence first (keeps each retrieved source citable), in rank order,
+        # then the remaining sentences by score
+        best_of_doc = [int(np.flatnonzero(owner == d)[np.argmax(scores[owner == d])])
+                       for d in range(len(docs)) if per_doc[d]]
+        firsts = set(best_of_doc)
+        rest = [int(i) for i in np.argsort(-scores, kind="stable") if int(i) not in firsts]
+        selected, used = set(), 0
+        for i in best_of_doc + rest:
+            group = [j for j in range(i - self.neighbors, i + self.neighbors + 1)
+                     if 0 <= j < len(pool) and owner[j] == owner[i] and j not in selected]
+            extra = int(cost[group].sum())
+            if used + extra > self.token_budget:
+                continue
+            selected.update(group)
+            used += extra
+
+        compressed = []
+        for d, doc in enumerate(docs):
+            rows = sorted(int(i) for i in selected if owner[i] == d)
+            if not rows:
+                continue
+            parts, previous = [], None
+            for i in rows:
+                if previous is not None and position[i] != position[previous] + 1:
+                    parts.append(GAP)
+                elif previous is not None:
+                    parts.append(" ")
+                parts.append(pool[i])
+                previous = i
+            compressed.append({**doc, "content": "".join(parts)})
+
+        stats = {
+            "tokens_in": tokens_in,
+            "tokens_out": sum(estimate_tokens(doc["content"]) for doc in compressed),
+            "sentences_in": len(pool),
+            "sentences_out": len(selected),
+            "docs_out": len(compressed),
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+        logger.info(f"Context compressed {stats['tokens_in']} -> {stats['tokens_out']} tokens "
+                    f"({stats['sentences_out']}/{stats['sentences_in']} sentences, {len(compressed)}/{len(docs)} "
+                    f"documents, {self.method}) in {stats['seconds'] * 1e3:.1f} ms")
+        return compressed, stats
@@ -0,0 +1,38 @@
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from rag_nakamo.conversation import Turn, format_history
+from rag_nakamo.deadline import Deadline
+from rag_nakamo.metrics import STAGE_SECONDS
+
+# Everything that belongs to one query. Agents are long-lived and shared across threads:
+# they hold configuration and clients only, per-request state lives here and is dropped
+# with the request.
+
+
+@dataclass
+class RequestContext:
+    query: str
+    conversation_id: Optional[str] = None
+    deadline: Optional[Deadline] = None
+    summary: str = ""  # older turns of the conversation, summarized
+    history: List[Turn] = field(default_factory=list)  # recent turns, snapshot
+    timings: Dict[str, float] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+    @contextmanager
+    def timed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.timings[stage] = round(duration, 4)
+            STAGE_SECONDS.labels(stage).observe(duration)
+
+    def history_text(self) -> str:
+        return format_history(self.summary, self.history)
@@ -0,0 +1,83 @@
+import re
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Tuple
+
+# Bounded multi-turn memory, shared by every request thread:
+# - per conversation, the last `max_turns` turns verbatim (ring buffer)
+# - turns falling out of the buffer are folded into a running summary (capped in chars)
+# - at most `max_conversations` conversations, least recently used evicted first
+# Memory is bounded by max_conversations * (max_turns * turn size + max_summary_chars).
+
+
+@dataclass(frozen=True)
+class Turn:
+    role: str  # "user" | "assistant"
+    content: str
+
+
+def extractive_summary(summary: str, turn: Turn, max_chars: int) -> str:
+    """Default summarizer, no LLM call: first sentence of the evicted turn appended,
+    oldest summary text dropped beyond max_chars."""
+    first = re.split(r"(?<=[.!?])\s", turn.content.strip(), maxsplit=1)[0][:200]
+    summary = f"{summary}\n{turn.role}: {first}".strip()
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:].split("\n", 1)[-1]
+    return summary
+
+
+class _Conversation:
+    __slots__ = ("turns", "summary")
+
+    def __init__(self, max_turns: int):
+        self.turns: Deque[Turn] = deque(maxlen=max_turns)
+        self.summary = ""
+
+
+class ConversationStore:
+    def __init__(self, max_turns: int = 8, max_conversations: int = 1000, max_summary_chars: int = 1500,
+                 max_turn_chars: int = 4000, summarize: Optional[Callable[[str, Turn, int], str]] = None):
+        self.max_turns = max_turns
+        self.max_conversations = max_conversations
+        self.max_summary_chars = max_summary_chars
+        self.max_turn_chars = max_turn_chars
+        self.summarize = summarize or extractive_summary
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"appended": 0, "summarized": 0, "evicted_conversations": 0}
+
+    def get(self, conversation_id: str) -> Tuple[str, List[Turn]]:
+        """(summary of older turns, recent turns) snapshot, safe to use outside the lock."""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                return "", []
+            self._conversations.move_to_end(conversation_id)
+            return conversation.summary, list(conversation.turns)
+
+    def append(self, conversation_id: str, role: str, content: str):
+        turn = Turn(role, content[: self.max_turn_chars])
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                conversation = self._conversations[conversation_id] = _Conversation(self.max_turns)
+                if len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+                    self.stats["evicted_conversations"] += 1
+            else:
+                self._conversations.move_to_end(conversation_id)
+            if len(conversation.turns) == self.max_turns:
+                conversation.summary = self.summarize(conversation.summary, conversation.turns[0], self.max_summary_chars)
+                self.stats["summarized"] += 1
+            conversation.turns.append(turn)
+            self.stats["appended"] += 1
+
+    def __len__(self):
+        return len(self._conversations)
+
+
+def format_history(summary: str, turns: List[Turn]) -> str:
+    parts = [f"(earlier) {summary}"] if summary else []
+    parts += [f"{turn.role}: {turn.content}" for turn in turns]
+    return "\n".join(parts)
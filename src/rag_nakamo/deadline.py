@@ -0,0 +1,61 @@
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from rag_nakamo.metrics import DEGRADATIONS
+
+logger = logging.getLogger(__name__)
+
+# Per-query latency budget. Created once per query (SimpleOrchestrator / serving), handed to
+# each stage, which checks the remaining budget against its Settings threshold and degrades
+# (skip rerank, smaller k, smaller context, fewer output tokens, local guard) instead of
+# running over. Every degradation that fired is recorded on the deadline. The guard does not
+# degrade: its classifier call has its own timeout (guard_timeout_s).
+
+
+def client_budget(value: Any, minimum: float, maximum: float) -> Optional[float]:
+    """A deadline_s sent by a client, clamped to [minimum, maximum] (None: not set).
+    Raises ValueError when it is not a finite number."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"deadline_s must be a number of seconds, got {value!r}")
+    return min(max(float(value), minimum), maximum)
+
+
+class Deadline:
+    def __init__(self, budget_s: float):
+        self.budget = budget_s
+        self.start = time.monotonic()
+        self.expires = self.start + budget_s
+        self.degradations: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_budget(cls, budget_s: Optional[float]) -> Optional["Deadline"]:
+        return cls(budget_s) if budget_s else None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def degrade(self, name: str, below_s: float) -> bool:
+        """True (and recorded) when less than `below_s` seconds are left."""
+        remaining = self.remaining()
+        if remaining >= below_s:
+            return False
+        self.degradations.append({"degradation": name, "remaining_s": round(remaining, 3)})
+        DEGRADATIONS.labels(name).inc()
+        logger.info(f"Deadline: {name} ({remaining:.2f}s of {self.budget:.1f}s left)")
+        return True
+
+    def budget_class(self) -> int:
+        """Remaining budget rounded up to a power of two (log2): queries coalesce within a class
+        only, a short deadline never waits on the work of a long one."""
+        return math.ceil(math.log2(max(self.remaining(), 0.125)))
+
+    @property
+    def fired(self) -> List[str]:
+        return [d["degradation"] for d in self.degradations]
@@ -0,0 +1,106 @@
+import os
+from functools import lru_cache
+from rag_nakamo.settings import get_settings
+
+# Common chat interface for all agents: an object exposing
+# `chat.completions.create(model=..., messages=..., ...)`.
+# openai -> one shared OpenAI client (thread safe, shared connection pool)
+# huggingface / ollama -> LocalChatClient over the per-process LocalBackend
+# Provider SDKs are imported on first call, not at import time.
+# With enable_llm_limits the OpenAI client and embeddings go through process-wide
+# admission control (llm/resilience.py): RPM/TPM buckets, AIMD concurrency, retries, deadlines.
+
+
+def llm_configured() -> bool:
+    """An LLM can be called: OpenAI key present, or a local provider."""
+    settings = get_settings()
+    return bool(settings.openai_api_key) or settings.model_provider != "openai"
+
+
+def _admission_control(name: str, rpm: int, tpm: int):
+    from rag_nakamo.llm.resilience import AdmissionControl
+    settings = get_settings()
+    return AdmissionControl(
+        name, rpm=rpm, tpm=tpm,
+        max_concurrency=settings.llm_max_concurrency,
+        initial_concurrency=settings.llm_initial_concurrency,
+        latency_target_s=settings.llm_latency_target_s,
+        max_retries=settings.llm_max_retries,
+        backoff_base_s=settings.llm_backoff_base_s,
+        backoff_max_s=settings.llm_backoff_max_s,
+        attempt_timeout_s=settings.llm_attempt_timeout_s,
+        deadline_s=settings.llm_deadline_s,
+    )
+
+
+@lru_cache
+def get_llm_client():
+    settings = get_settings()
+    if settings.model_provider == "openai":
+        from openai import OpenAI
+        if not settings.enable_llm_limits:
+            return OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url)
+        from rag_nakamo.llm.resilience import ResilientChatClient
+        client = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url,
+                        max_retries=0, timeout=settings.llm_attempt_timeout_s)
+        return ResilientChatClient(client, _admission_control("llm", settings.llm_rpm, settings.llm_tpm))
+
+    from rag_nakamo.llm.local import LocalChatClient, get_local_backend
+    return LocalChatClient(get_local_backend())
+
+
+@lru_cache
+def get_hedged_llm_client(caller: str):
+    """get_llm_client() with hedging for `caller` (own latency window), when enabled.
+    Only the admission-controlled OpenAI client hedges: duplicating calls into the local
+    batcher would only add load."""
+    settings = get_settings()
+    client = get_llm_client()
+    if not settings.enable_hedging or not hasattr(client, "hedged"):
+        return client
+    from rag_nakamo.llm.hedging import HedgePolicy
+    policy = HedgePolicy(caller, quantile=settings.hedge_quantile, budget=settings.hedge_budget,
+                         min_samples=settings.hedge_min_samples)
+    return client.hedged(policy)
+
+
+@lru_cache
+def get_embeddings():
+    """Shared embeddings client (query side and ingestion)."""
+    from langchain_openai.embeddings import OpenAIEmbeddings
+    settings = get_settings()
+    if not settings.enable_llm_limits:
+        return OpenAIEmbeddings(api_key=settings.openai_api_key, model=settings.embeddings_model,
+                                base_url=settings.openai_base_url)
+    from rag_nakamo.llm.resilience import ResilientEmbeddings
+    embeddings = OpenAIEmbeddings(api_key=settings.openai_api_key, model=settings.embeddings_model,
+                                  base_url=settings.openai_base_url, max_retries=0,
+                                  request_timeout=settings.llm_attempt_timeout_s)
+    return ResilientEmbeddings(embeddings, _admission_control("embeddings", settings.embeddings_rpm, settings.embeddings_tpm))
+
+
+_warmed = set()
+
+
+def warm_up_llm(preload: bool = True, connect: bool = True) -> None:
+    """One-off LLM initialization, idempotent per process.
+    preload: load the local model (fork-safe, shared copy-on-write with forked workers).
+    connect: open the pooled HTTPS connection to the API (per process, not fork-safe).
+    """
+    settings = get_settings()
+    if settings.model_provider != "openai":
+        if preload:
+            get_llm_client()
+        return
+    key = (os.getpid(), "connect")
+    if connect and settings.openai_api_key and key not in _warmed:
+        get_llm_client().models.list()  # TLS handshake + pooled keep-alive connection
+        _warmed.add(key)
+
+
+def reset_llm_client() -> None:
+    """Drop the process-wide client, e.g. in a forked worker (sockets are not shareable).
+    The local backend survives, it restarts its worker thread after fork."""
+    get_llm_client.cache_clear()
+    get_hedged_llm_client.cache_clear()
+    get_embeddings.cache_clear()
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Hedged requests: when a call has not returned after the observed p90 latency of its
+# caller, a duplicate is sent and the first response wins. Extra requests are capped by a
+# budget (hedge credit accrues per call, e.g. 0.05 -> at most ~5% extra requests).
+# The loser is cancelled if it has not been dispatched yet (the winning attempt marks the
+# call settled before it returns, a duplicate picked up by a worker after that is never
+# sent), otherwise its result is dropped when it lands (sync HTTP calls cannot be interrupted mid-flight; its attempt
+# timeout bounds it). Both attempts go through the same admission control.
+
+
+_SKIPPED = object()  # result of an attempt that started after the call was settled
+
+
+def quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class HedgePolicy:
+    def __init__(self, name: str, quantile: float = 0.9, budget: float = 0.05, min_samples: int = 20,
+                 window: int = 500, min_delay_s: float = 0.05, max_credit: float = 10.0):
+        self.name = name
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay_s
+        self.max_credit = max_credit
+        self.attempt_latencies = deque(maxlen=window)  # single attempts, hedging excluded
+        self.call_latencies = deque(maxlen=window)  # what the caller saw
+        self._credit = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "losers_cancelled": 0}
+
+    def record(self, window: deque, latency: float):
+        with self._lock:
+            window.append(latency)
+
+    def delay(self) -> Optional[float]:
+        """Hedge trigger (observed quantile), None until enough samples."""
+        with self._lock:
+            if len(self.attempt_latencies) < self.min_samples:
+                return None
+            samples = list(self.attempt_latencies)
+        return max(self.min_delay, quantile(samples, self.quantile))
+
+    def start_call(self):
+        with self._lock:
+            self.stats["calls"] += 1
+            self._credit = min(self.max_credit, self._credit + self.budget)
+
+    def take_hedge(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            self.stats["hedges"] += 1
+            return True
+
+    def count(self, stat: str, n: int = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self.call_latencies)
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "hedge_rate": stats["hedges"] / stats["calls"] if stats["calls"] else 0.0,
+            "trigger_s": self.delay(),
+            "p50_s": quantile(calls, 0.5),
+            "p99_s": quantile(calls, 0.99),
+        }
+
+
+class HedgedCompletions:
+    """chat.completions facade that hedges non-streaming calls."""
+
+    def __init__(self, completions, policy: HedgePolicy, max_workers: int = 64):
+        self._completions = completions
+        self.policy = policy
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{policy.name}")
+
+    def _attempt(self, kwargs, settled: threading.Event):
+        if settled.is_set():
+            self.policy.count("losers_cancelled")
+            return _SKIPPED
+        start = time.perf_counter()
+        result = self._completions.create(**kwargs)
+        self.policy.record(self.policy.attempt_latencies, time.perf_counter() - start)
+        settled.set()  # before the future completes: the worker may pick up the duplicate next
+        return result
+
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return self._completions.create(**kwargs)
+        delay = self.policy.delay()
+        start = time.perf_counter()
+        self.policy.start_call()
+        settled = threading.Event()
+        primary = self._pool.submit(self._attempt, kwargs, settled)
+        pending = {primary}
+        if delay is not None:
+            done, _ = wait(pending, timeout=delay)
+            if not done and self.policy.take_hedge():
+                pending.add(self._pool.submit(self._attempt, kwargs, settled))
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result() is not _SKIPPED:
+                    if future is not primary:
+                        self.policy.count("hedge_wins")
+                    self.policy.count("losers_cancelled", sum(loser.cancel() for loser in pending))
+                    self.policy.record(self.policy.call_latencies, time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,259 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from rag_nakamo.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Shared local inference backend for the "huggingface" and "ollama" providers.
+# One model load per process; every agent submits through the same queue and a
+# single worker thread groups concurrent requests into batches (up to
+# local_max_batch, waiting at most local_batch_wait_ms for stragglers).
+# A batch only holds requests with the same temperature: a greedy (0.0) guard or
+# classifier call is never sampled because of what else is queued.
+
+Generation = Tuple[str, int, int]  # text, prompt tokens, completion tokens
+
+
+@dataclass
+class LocalRequest:
+    messages: List[Dict[str, str]]
+    max_tokens: int
+    temperature: float
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class HFEngine:
+    """transformers causal LM on CPU, padded batch generation."""
+
+    def __init__(self, model_id: str, device: str = "cpu"):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        self.device = device
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            torch_dtype=torch.bfloat16 if device != "cpu" else torch.float32,
+        ).to(device).eval()
+        # same as the archived agents: no sampling defaults from the hub config
+        self.model.generation_config.top_p = None
+        self.model.generation_config.top_k = None
+        self.model.generation_config.temperature = None
+
+    def generate(self, batch: List[LocalRequest]) -> List[Generation]:
+        texts = [
+            self.tokenizer.apply_chat_template(r.messages, tokenize=False, add_generation_prompt=True)
+            for r in batch
+        ]
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True).to(self.device)
+        input_len = inputs["input_ids"].shape[-1]
+        temperature = batch[0].temperature  # one temperature per batch (LocalBackend._collect)
+        with self.torch.inference_mode():
+            generation = self.model.generate(
+                **inputs,
+                max_new_tokens=max(r.max_tokens for r in batch),
+                do_sample=temperature > 0,
+                temperature=temperature if temperature > 0 else None,
+                pad_token_id=self.tokenizer.pad_token_id,
+            )
+        results = []
+        for i, request in enumerate(batch):
+            new_tokens = generation[i][input_len:][: request.max_tokens]
+            prompt_tokens = int(inputs["attention_mask"][i].sum())
+            completion_tokens = int((new_tokens != self.tokenizer.pad_token_id).sum())
+            results.append((self.tokenizer.decode(new_tokens, skip_special_tokens=True), prompt_tokens, completion_tokens))
+        return results
+
+
+class OllamaEngine:
+    """Ollama server, the batch is sent concurrently (server side OLLAMA_NUM_PARALLEL batching).
+    keep_alive keeps the model and its prefix KV cache loaded between calls. timeout_s bounds each
+    call: a stuck server fails the batch instead of blocking the batching worker."""
+
+    def __init__(self, base_url: str, model: str, max_batch: int, keep_alive: str = "30m", timeout_s: float = 60.0):
+        import httpx
+
+        self.timeout_s = timeout_s
+        self.client = httpx.Client(base_url=base_url, timeout=timeout_s)
+        self.model = model
+        self.keep_alive = keep_alive
+        self.max_batch = max_batch
+        self.pool = ThreadPoolExecutor(max_workers=max_batch, thread_name_prefix="ollama")
+
+    def after_fork(self):
+        import httpx
+
+        self.client = httpx.Client(base_url=str(self.client.base_url), timeout=self.timeout_s)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_batch, thread_name_prefix="ollama")
+
+    def _chat(self, request: LocalRequest) -> Generation:
+        resp = self.client.post("/api/chat", json={
+            "model": self.model,
+            "messages": request.messages,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {"num_predict": request.max_tokens, "temperature": request.temperature},
+        })
+        resp.raise_for_status()
+        data = resp.json()
+        return data["message"]["content"], data.get("prompt_eval_count", 0), data.get("eval_count", 0)
+
+    def generate(self, batch: List[LocalRequest]) -> List[Generation]:
+        return list(self.pool.map(self._chat, batch))
+
+
+class LocalBackend:
+    def __init__(self, engine, max_batch: int = 4, max_new_tokens: int = 1024, batch_wait_ms: float = 20):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_new_tokens = max_new_tokens
+        self.batch_wait = batch_wait_ms / 1000
+        self.queue: "queue.Queue[LocalRequest]" = queue.Queue()
+        self._held: "deque[LocalRequest]" = deque()  # other temperature than the batch being collected
+        self.stats = {"requests": 0, "batches": 0, "max_batch_seen": 0, "queue_wait_s": 0.0}
+        self._stats_lock = threading.Lock()
+        self._start_worker()
+        # threads do not survive fork: pre-forked workers share the model, not the batcher
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start_worker(self):
+        self._worker = threading.Thread(target=self._run, name="local-llm-batcher", daemon=True)
+        self._worker.start()
+
+    def _after_fork(self):
+        self.queue = queue.Queue()
+        self._held = deque()
+        self._stats_lock = threading.Lock()  # may have been held by a parent thread at fork time
+        if hasattr(self.engine, "after_fork"):
+            self.engine.after_fork()
+        self._start_worker()
+
+    def submit(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None, temperature: float = 0.0) -> Future:
+        request = LocalRequest(
+            messages=messages,
+            max_tokens=min(max_tokens or self.max_new_tokens, self.max_new_tokens),
+            temperature=temperature or 0.0,
+        )
+        self.queue.put(request)
+        return request.future
+
+    def _collect(self) -> List[LocalRequest]:
+        """Next batch: the oldest request plus queued ones with the same temperature; the others
+        are held, in order, for the following batches."""
+        held, self._held = self._held, deque()
+        first = held.popleft() if held else self.queue.get()
+        batch = [first]
+        for request in held:
+            if request.temperature == first.temperature and len(batch) < self.max_batch:
+                batch.append(request)
+            else:
+                self._held.append(request)
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request.temperature == first.temperature:
+                batch.append(request)
+            else:
+                self._held.append(request)
+        return batch
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _run(self):
+        while True:
+            # requests whose caller gave up (timeout) are cancelled and skipped
+            batch = [r for r in self._collect() if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            with self._stats_lock:
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+                self.stats["queue_wait_s"] += sum(started - r.enqueued for r in batch)
+            try:
+                results = self.engine.generate(batch)
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                logger.warning(f"Local generation failed for batch of {len(batch)}: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+
+class LocalChatClient:
+    """OpenAI-compatible facade (client.chat.completions.create) over the shared LocalBackend.
+    The `model` argument is ignored, the backend serves one model; function calling is not supported.
+    `timeout` (or `deadline_s`, as on ResilientChatClient) bounds the wait: TimeoutError, and the
+    request is dropped if it has not started yet."""
+
+    def __init__(self, backend: LocalBackend):
+        self.backend = backend
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str = None, messages: List[Dict[str, str]] = None, temperature: float = 0.0,
+                max_tokens: Optional[int] = None, timeout: Optional[float] = None,
+                deadline_s: Optional[float] = None, **kwargs: Any):
+        future = self.backend.submit(messages, max_tokens, temperature)
+        try:
+            text, prompt_tokens, completion_tokens = future.result(timeout=timeout or deadline_s)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"local generation did not finish within {timeout or deadline_s:.1f}s") from None
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(role="assistant", content=text, function_call=None),
+                finish_reason="stop",
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+            ),
+        )
+
+
+@lru_cache
+def get_local_backend() -> LocalBackend:
+    """One backend, hence one model load, per process."""
+    settings = get_settings()
+    if settings.model_provider == "ollama":
+        engine = OllamaEngine(settings.ollama_base_url, settings.ollama_model, settings.local_max_batch,
+                              timeout_s=settings.llm_attempt_timeout_s)
+    else:
+        engine = HFEngine(settings.local_model_id, device=settings.local_device)
+    logger.info(
+        f"Local backend ready: {settings.model_provider}, max_batch={settings.local_max_batch}, "
+        f"max_new_tokens={settings.local_max_new_tokens}"
+    )
+    return LocalBackend(
+        engine,
+        max_batch=settings.local_max_batch,
+        max_new_tokens=settings.local_max_new_tokens,
+        batch_wait_ms=settings.local_batch_wait_ms,
+    )
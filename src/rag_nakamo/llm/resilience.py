@@ -0,0 +1,260 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from rag_nakamo.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Client-side admission control for provider calls, shared by every agent.
+# Each call goes through, in order:
+#   deadline  - absolute time budget for the call including retries and waiting
+#   RPM/TPM   - token buckets refilled continuously (requests and tokens per minute)
+#   AIMD      - adaptive concurrency limit: +1/limit per fast success, halved on 429/timeouts,
+#               x0.9 when latency exceeds the target
+#   retries   - jittered exponential backoff ("full jitter"), honouring Retry-After
+# The provider SDK's own retries must be off (max_retries=0), or attempts multiply.
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "ReadTimeout", "ConnectTimeout", "ConnectError"}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_retryable(error: BaseException) -> bool:
+    return (
+        status_code(error) in RETRYABLE_STATUS
+        or type(error).__name__ in RETRYABLE_ERRORS
+        or isinstance(error, (TimeoutError, ConnectionError))
+    )
+
+
+def is_congestion(error: BaseException) -> bool:
+    """429s and timeouts: the provider (or our share of it) is saturated."""
+    return status_code(error) == 429 or "Timeout" in type(error).__name__ or isinstance(error, TimeoutError)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_call_tokens(messages: Optional[List[Dict[str, Any]]], max_tokens: Optional[int] = None) -> int:
+    """Rough TPM charge: the estimated prompt tokens plus the requested completion
+    (providers count max_tokens against the limit when admitting a request)."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages or [])
+    return chars // CHARS_PER_TOKEN + (max_tokens or 0)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0, deadline: Optional[float] = None) -> float:
+        """Blocks until `amount` is available; returns the time waited."""
+        amount = min(amount, self.capacity)
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return now - start
+                wait = (amount - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise DeadlineExceeded(f"rate limit wait {wait:.1f}s exceeds deadline")
+            time.sleep(min(wait, 0.5))
+
+    def adjust(self, delta: float):
+        """Correct an estimate once the real usage is known (may go negative: debt)."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AIMDLimiter:
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32,
+                 latency_target_s: float = 20.0, cooldown_s: float = 1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target_s
+        self.cooldown = cooldown_s
+        self.inflight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        start = time.monotonic()
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded(f"no concurrency slot (limit {int(self.limit)})")
+                self._cond.wait(remaining)
+            self.inflight += 1
+        return time.monotonic() - start
+
+    def release(self, latency: float, congested: bool = False):
+        with self._cond:
+            self.inflight -= 1
+            now = time.monotonic()
+            if congested or latency > self.latency_target:
+                # one decrease per cooldown: a burst of 429s from the same window counts once
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * (0.5 if congested else 0.9))
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class AdmissionControl:
+    """Rate limits + adaptive concurrency + retries for one provider endpoint."""
+
+    def __init__(self, name: str, rpm: float, tpm: float, max_concurrency: int = 32, initial_concurrency: int = 4,
+                 latency_target_s: float = 20.0, max_retries: int = 4, backoff_base_s: float = 0.5,
+                 backoff_max_s: float = 20.0, attempt_timeout_s: float = 60.0, deadline_s: float = 120.0):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AIMDLimiter(initial_concurrency, 1, max_concurrency, latency_target_s)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base_s
+        self.backoff_max = backoff_max_s
+        self.attempt_timeout = attempt_timeout_s
+        self.deadline_s = deadline_s
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "throttled": 0, "errors": 0,
+                      "deadline_exceeded": 0, "queue_wait_s": 0.0}
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, fn: Callable[..., Any], *args, tokens: int = 0, deadline_s: Optional[float] = None,
+             usage_tokens: Callable[[Any], Optional[int]] = None, **kwargs) -> Any:
+        """fn(*args, timeout=<attempt timeout>, **kwargs) under the limits.
+        usage_tokens(result) -> real token count, used to correct the TPM estimate."""
+        deadline = time.monotonic() + (deadline_s or self.deadline_s)
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            try:
+                waited = self.requests.acquire(1, deadline)
+                waited += self.tokens.acquire(tokens, deadline) if tokens else 0.0
+                waited += self.concurrency.acquire(deadline)
+            except DeadlineExceeded:
+                self.stats["deadline_exceeded"] += 1
+                raise
+            self.stats["queue_wait_s"] += waited
+            self.stats["attempts"] += 1
+            timeout = min(self.attempt_timeout, deadline - time.monotonic())
+            start = time.monotonic()
+            try:
+                result = fn(*args, timeout=timeout, **kwargs)
+            except Exception as e:
+                congested = is_congestion(e)
+                self.concurrency.release(time.monotonic() - start, congested=congested)
+                self.stats["throttled"] += status_code(e) == 429
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self.stats["errors"] += 1
+                    raise
+                delay = max(self.backoff(attempt), retry_after(e) or 0.0)
+                if time.monotonic() + delay >= deadline:
+                    self.stats["deadline_exceeded"] += 1
+                    raise DeadlineExceeded(f"{self.name}: deadline reached after {attempt + 1} attempts") from e
+                logger.debug(f"{self.name}: attempt {attempt + 1} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                self.stats["retries"] += 1
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.concurrency.release(time.monotonic() - start)
+            if usage_tokens is not None and tokens:
+                used = usage_tokens(result)
+                if used is not None:
+                    self.tokens.adjust(used - tokens)
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "concurrency_limit": round(self.concurrency.limit, 2),
+                "inflight": self.concurrency.inflight}
+
+
+def _usage_total(response) -> Optional[int]:
+    return getattr(getattr(response, "usage", None), "total_tokens", None)
+
+
+class _Completions:
+    def __init__(self, inner, control: AdmissionControl):
+        self._inner = inner
+        self._control = control
+
+    def create(self, deadline_s: Optional[float] = None, **kwargs):
+        """Same as chat.completions.create, plus an optional per-call deadline in seconds.
+        A `timeout` argument (OpenAI per-request option) is taken as the deadline."""
+        deadline_s = kwargs.pop("timeout", None) or deadline_s
+        tokens = estimate_call_tokens(kwargs.get("messages"), kwargs.get("max_tokens"))
+        usage = None if kwargs.get("stream") else _usage_total
+        return self._control.call(self._inner.create, tokens=tokens, deadline_s=deadline_s,
+                                  usage_tokens=usage, **kwargs)
+
+
+class ResilientChatClient:
+    """Drop-in for the OpenAI client: `chat.completions.create` is admission-controlled,
+    everything else (models.list, ...) is passed through."""
+
+    def __init__(self, inner, control: AdmissionControl):
+        self._inner = inner
+        self.control = control
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _Completions(inner.chat.completions, control)
+
+    def hedged(self, policy):
+        """View of this client whose non-streaming completions are hedged (llm/hedging.py),
+        sharing the same admission control."""
+        from rag_nakamo.llm.hedging import HedgedCompletions
+        view = ResilientChatClient(self._inner, self.control)
+        view.chat.completions = HedgedCompletions(self.chat.completions, policy)
+        return view
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class ResilientEmbeddings:
+    """Wraps a LangChain Embeddings object (embed_query / embed_documents).
+    The attempt timeout is enforced by the wrapped client's request_timeout."""
+
+    def __init__(self, inner, control: AdmissionControl):
+        self._inner = inner
+        self.control = control
+
+    def _call(self, fn, arg, tokens: int):
+        return self.control.call(lambda a, timeout=None: fn(a), arg, tokens=tokens)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(self._inner.embed_query, text, estimate_tokens(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call(self._inner.embed_documents, texts, sum(len(t) for t in texts) // CHARS_PER_TOKEN)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
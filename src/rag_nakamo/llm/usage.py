@@ -0,0 +1,52 @@
+import threading
+from typing import Any, Dict
+
+from rag_nakamo.metrics import LLM_TOKENS
+
+# Token usage per agent, including provider-side cached input tokens
+# (usage.prompt_tokens_details.cached_tokens on OpenAI compatible APIs).
+
+
+class UsageStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, Dict[str, int]] = {}
+
+    def record(self, agent: str, response: Any) -> None:
+        """Record the usage block of a chat completion response, if any."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+        prompt, completion = getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+        LLM_TOKENS.labels(agent, "prompt").inc(prompt)
+        LLM_TOKENS.labels(agent, "cached").inc(cached)  # cached / prompt: provider prompt cache hit ratio
+        LLM_TOKENS.labels(agent, "completion").inc(completion)
+        with self._lock:
+            stats = self._agents.setdefault(
+                agent, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+            )
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt
+            stats["cached_tokens"] += cached
+            stats["completion_tokens"] += completion
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the counters with the cached input token ratio per agent."""
+        with self._lock:
+            out = {agent: dict(stats) for agent, stats in self._agents.items()}
+        for stats in out.values():
+            stats["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._agents.clear()
+
+
+_usage_stats = UsageStats()
+
+
+def get_usage_stats() -> UsageStats:
+    return _usage_stats
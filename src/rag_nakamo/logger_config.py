@@ -1,8 +1,16 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
 
 class ColorFormatter(logging.Formatter):
     """Custom formatter to add colors to log levels"""
-    
+
     COLORS = {
         'DEBUG': '\033[36m',     # Cyan
         'INFO': '\033[32m',      # Green
@@ -13,21 +21,159 @@ class ColorFormatter(logging.Formatter):
     RESET = '\033[0m'
 
     def format(self, record):
+        # colour a copy: the record is shared with every other handler
+        record = logging.makeLogRecord(record.__dict__)
         level_color = self.COLORS.get(record.levelname, '')
         record.levelname = f"{level_color}{record.levelname}{self.RESET}"
         record.name = f"\033[94m{record.name}{self.RESET}"  # Blue
         return super().format(record)
 
-def setup_logging():
-    formatter = ColorFormatter(
-        fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%H:%M:%S'
-    )
 
-    console_handler = logging.StreamHandler()
+# LogRecord attributes, anything else on a record came from `extra=`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (production, log shippers)."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LazyJson:
+    """Payload serialized only if a handler actually formats the record:
+    logger.debug("Reranked documents: %s", LazyJson(order_changes))"""
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        return json.dumps(self.payload, default=str)
+
+
+# per-query debug sampling: DEBUG records pass only for sampled queries (see sample_query)
+_debug_sampled = contextvars.ContextVar("debug_sampled", default=True)
+_debug_sample_rate = 1.0
+
+
+def sample_query() -> bool:
+    """Called at the start of a query: decides whether its DEBUG detail is kept."""
+    sampled = _debug_sample_rate >= 1.0 or random.random() < _debug_sample_rate
+    _debug_sampled.set(sampled)
+    return sampled
+
+
+class DebugSampler(logging.Filter):
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or _debug_sampled.get()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records are dropped (and counted) when the queue is full.
+    `msg % args` is done here, so a mutable argument changed after the call is logged as it was;
+    records with a LazyJson argument are queued as they are and, like exc_info, formatted by the
+    listener's handler, not in the request thread."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if record.args:
+            args = record.args.values() if isinstance(record.args, dict) else record.args
+            if not any(isinstance(arg, LazyJson) for arg in args):
+                record.msg = record.message = record.getMessage()
+                record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # shutdown: wait for room instead of raising queue.Full
+
+
+_listener = None
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)  # flush queued records on exit
+
+
+def _restart_listener_after_fork():
+    # the listener thread does not survive fork: fresh queue and thread in the child
+    if _listener is not None:
+        q = queue.Queue(maxsize=_listener.queue.maxsize)
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, logging.handlers.QueueHandler):
+                handler.queue = q
+        _listener.queue = q
+        _listener._thread = None  # parent's thread object
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def setup_logging(level=None, fmt=None, use_queue=None, debug_sample_rate=None, stream=None, queue_size=None):
+    """Root logging from Settings (log_level, log_format, log_queue, log_debug_sample_rate),
+    arguments override. log_queue: request threads only enqueue, a listener thread formats
+    and writes."""
+    global _listener, _debug_sample_rate
+    from rag_nakamo.settings import get_settings
+    settings = get_settings()
+    level = level or settings.log_level
+    fmt = fmt or settings.log_format
+    use_queue = settings.log_queue if use_queue is None else use_queue
+    _debug_sample_rate = settings.log_debug_sample_rate if debug_sample_rate is None else debug_sample_rate
+
+    if fmt == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = ColorFormatter(
+            fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%H:%M:%S'
+        )
+
+    console_handler = logging.StreamHandler(stream or sys.stderr)
     console_handler.setFormatter(formatter)
 
+    _stop_listener()
+
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
-    root_logger.addHandler(console_handler)
-    root_logger.setLevel(logging.INFO)
\ No newline at end of file
+    if use_queue:
+        q = queue.Queue(maxsize=queue_size or settings.log_queue_size)
+        handler = DroppingQueueHandler(q)
+        _listener = _Listener(q, console_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = console_handler
+    handler.addFilter(DebugSampler())
+    root_logger.addHandler(handler)
+    root_logger.setLevel(level)
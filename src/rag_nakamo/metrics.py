@@ -0,0 +1,123 @@
+"""
+Prometheus metrics of the query pipeline (prometheus_client), rendered in the text exposition
+format: GET /metrics on rag_nakamo.serving, or a file for batch jobs.
+
+Processes: with PROMETHEUS_MULTIPROC_DIR set (before the first import of this module, it is
+prometheus_client's switch), every process (pre-forked worker, ingestion, watcher) writes its
+samples to mmapped files in that directory and a scrape merges them: counters and histograms
+summed, the in-flight gauge over live processes only. A worker reaped by the serving parent
+and a batch job at exit are marked dead; files of dead processes are removed at server start.
+    python -m rag_nakamo.metrics [--dir DIR] [--out FILE]
+"""
+import argparse
+import atexit
+import glob
+import logging
+import os
+import re
+from typing import Optional
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+# seconds, covers a ~1 ms cache hit to a multi-call LLM request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_DB_PID = re.compile(r"_(\d+)\.db$")
+
+
+def multiprocess_dir() -> Optional[str]:
+    return os.environ.get(MULTIPROC_ENV)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges (in flight) of an exited process; its counters stay in the sums."""
+    directory = multiprocess_dir()
+    if directory:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid, directory)
+
+
+def remove_dead_processes(directory: Optional[str] = None) -> int:
+    """Delete the sample files of processes that are gone (previous server runs, finished batch
+    jobs): they would pile up, and a reused pid would carry on from stale values."""
+    directory = directory or multiprocess_dir()
+    if not directory:
+        return 0
+    removed = 0
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        match = _DB_PID.search(os.path.basename(path))
+        if match and not _pid_alive(int(match.group(1))):
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    if removed:
+        logger.info(f"Removed {removed} metric files of exited processes from {directory}")
+    return removed
+
+
+def exposition(directory: Optional[str] = None) -> bytes:
+    """Text exposition: all processes of the multiprocess directory, else this process."""
+    directory = directory or multiprocess_dir()
+    if not directory:
+        return generate_latest(REGISTRY)
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=directory)
+    return generate_latest(registry)
+
+
+if multiprocess_dir():
+    os.makedirs(multiprocess_dir(), exist_ok=True)
+    # a batch job (or the serving parent) leaves its counters behind, not its live gauges;
+    # pid read at exit: forked workers leave through os._exit and are marked when reaped
+    atexit.register(lambda: mark_process_dead(os.getpid()))
+
+
+# -- the pipeline's metrics ------------------------------------------------------------------------
+
+REQUESTS = Counter("rag_requests", "Queries processed by the orchestrator", ["used_rag", "status"])
+REQUESTS_IN_FLIGHT = Gauge("rag_requests_in_flight", "Queries being processed", multiprocess_mode="livesum")
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Latency per pipeline stage", ["stage"], buckets=LATENCY_BUCKETS)
+CACHE_LOOKUPS = Counter("rag_cache_lookups", "Cache and coalescing lookups", ["cache", "result"])
+GUARD_DECISIONS = Counter("rag_guard_decisions", "PromptGuard decisions", ["decision", "classifier"])
+LLM_SECONDS = Histogram("rag_llm_call_seconds", "Chat completion latency per agent", ["agent"],
+                        buckets=LATENCY_BUCKETS)
+LLM_TOKENS = Counter("rag_llm_tokens", "Provider reported tokens per agent", ["agent", "kind"])
+RETRIEVED = Histogram("rag_retrieved_documents", "Documents returned by RAGAgent", ["path"],
+                      buckets=(0, 1, 2, 3, 5, 8, 10, 20))
+DEGRADATIONS = Counter("rag_degradations", "Deadline degradations", ["step"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the metrics of a multiprocess directory")
+    parser.add_argument("--dir", default=multiprocess_dir())
+    parser.add_argument("--out", default=None, help="file (e.g. for node_exporter's textfile collector), default stdout")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error(f"set {MULTIPROC_ENV} or pass --dir")
+    text = exposition(args.dir).decode()
+    if args.out is None:
+        print(text, end="")
+        return
+    tmp = args.out + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
-from langchain_core.prompts import ChatPromptTemplate
+# Classifier prompt split in a static prefix (system message, identical for every call,
+# so provider-side prompt caching and local KV-cache reuse apply) and a variable suffix.
+# Variable parts are ordered from most to least shared: the retrieved context is the same
+# for the response and guard calls of a query, the draft answer is unique to the call.
 
-CLASSIFIER_PROMPT = ChatPromptTemplate.from_template(
-"""
-You are a strict safety classifier. Output ONLY valid JSON with these keys:
+CLASSIFIER_SYSTEM_PROMPT = """You are a strict, JSON-only safety classifier. Output ONLY valid JSON with these keys:
 prompt_harm_label: one of ["unharmful","harmful"]
 response_refusal_label: one of ["refusal","compliance"]
 response_harm_label: one of ["unharmful","harmful"]
@@ -12,15 +13,16 @@ Rules:
 - If the user encourages hallucination, fabrication, or social-engineering misuse: harmful.
 - Illegal, violent, self-harm, extremist, or clearly abusive intent: harmful.
 - German or English inputs may appear; apply same criteria.
-- Do not explain. Only JSON.
+- Do not explain. Only JSON."""
+
+CLASSIFIER_USER_TEMPLATE = """Context snippet (top retrieved docs):
+{context_snippet}
 
 User Prompt:
 {user_prompt}
 
 Base Model Response (may be empty or partial):
-{model_response}
+{model_response}"""
 
-Context snippet (top retrieved docs):
-{context_snippet}
-"""
-)
\ No newline at end of file
+# precompiled: bound format method, no per call template parsing object
+CLASSIFIER_PROMPT = CLASSIFIER_USER_TEMPLATE.format
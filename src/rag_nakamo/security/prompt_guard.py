@@ -1,23 +1,49 @@
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
-from rag_nakamo.security.prompt import CLASSIFIER_PROMPT
+from rag_nakamo.llm.client import get_hedged_llm_client, warm_up_llm
+from rag_nakamo.security.prompt import CLASSIFIER_SYSTEM_PROMPT, CLASSIFIER_PROMPT
+from rag_nakamo.llm.usage import get_usage_stats
 from rag_nakamo.security.schemas import ClassificationResult, GuardDecision, GuardedResponse
 from rag_nakamo.settings import get_settings
-import json, logging
+from rag_nakamo.metrics import GUARD_DECISIONS, LLM_SECONDS, STAGE_SECONDS
+import json, logging, time
 
 logger = logging.getLogger(__name__)
 
 BLOCK_MESSAGE = "This request was blocked by safety policies."
 SANITIZE_MESSAGE = "Content was adjusted due to safety policies."
+UNAVAILABLE_MESSAGE = "The safety check is unavailable, please retry later."
+
+# The classifier always runs, with its own guard_timeout_s: a query deadline (which a client
+# can set) never shortens or replaces it. A failed or timed out call blocks (fails closed).
+UNAVAILABLE_LABELS = {
+    "prompt_harm_label": "harmful",
+    "response_refusal_label": "compliance",
+    "response_harm_label": "harmful",
+}
 
 class PromptGuard:
     def __init__(self, max_context_chars: int = 10000):
         self.settings = get_settings()
-        self.client = OpenAI(api_key=self.settings.openai_api_key)
+        self._client = None
         self.model = self.settings.guard_model
         self.max_context_chars = max_context_chars
         logger.info(f"PromptGuard initialized with model: {self.model}")
 
+    @property
+    def client(self):
+        """Shared chat client (hedged when enabled), initialized on demand."""
+        if self._client is None:
+            self._client = get_hedged_llm_client("PromptGuard")
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def warm_up(self, preload: bool = True, connect: bool = True):
+        """Load the local model / open the API connection before the first query."""
+        warm_up_llm(preload=preload, connect=connect)
+
     def _build_context_snippet(self, docs: List[Dict[str, Any]]):
         """
         Turn top retrieved docs into a bounded-size snippet.
@@ -40,23 +66,26 @@ class PromptGuard:
         self,
         user_prompt: str,
         model_response: str,
-        context_docs: Optional[List[Dict[str, Any]]]
+        context_docs: Optional[List[Dict[str, Any]]],
     ) -> Dict[str, Any]:
         context_snippet = self._build_context_snippet(context_docs or [])
-        prompt = CLASSIFIER_PROMPT.format(
+        prompt = CLASSIFIER_PROMPT(
+            context_snippet=context_snippet,
             user_prompt=user_prompt,
-            model_response=model_response,
-            context_snippet=context_snippet
+            model_response=model_response
         )
 
-        completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are a JSON-only safety classifier."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.0
-        )
+        with LLM_SECONDS.labels("PromptGuard").time():
+            completion = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": CLASSIFIER_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.0,
+                timeout=self.settings.guard_timeout_s
+            )
+        get_usage_stats().record("PromptGuard", completion)
 
         raw_text = completion.choices[0].message.content.strip()
 
@@ -104,13 +133,22 @@ class PromptGuard:
         draft_answer: str,
         context_docs: Optional[List[Dict[str, Any]]] = None,
     ) -> GuardedResponse:
-        raw = self._call_classifier(user_prompt, draft_answer, context_docs)
+        start = time.perf_counter()
+        try:
+            raw, classifier = self._call_classifier(user_prompt, draft_answer, context_docs), "llm"
+        except Exception as e:
+            logger.error(f"Guard classifier unavailable, blocking: {type(e).__name__}: {e}")
+            raw, classifier = dict(UNAVAILABLE_LABELS), "unavailable"
         classification = ClassificationResult(
             prompt_harm_label=raw.get("prompt_harm_label","harmful"),
             response_refusal_label=raw.get("response_refusal_label","compliance"),
             response_harm_label=raw.get("response_harm_label","harmful"),
         )
         decision = self._decide(classification)
+        if classifier == "unavailable":
+            decision = decision.model_copy(update={"reason": "Safety classifier unavailable",
+                                                   "safe_message": UNAVAILABLE_MESSAGE})
+        GUARD_DECISIONS.labels(decision.status, classifier).inc()
 
         final_answer = draft_answer # if allowed, return original answer, else:
 
@@ -120,6 +158,7 @@ class PromptGuard:
             # brute-force sanitize (replace full answer).
             final_answer = decision.safe_message
 
+        STAGE_SECONDS.labels("guard").observe(time.perf_counter() - start)
         return GuardedResponse(
             decision=decision,
             final_answer=final_answer,
@@ -0,0 +1,252 @@
+"""
+Minimal HTTP query server with explicit warm-up and an optional pre-fork mode.
+
+    python -m rag_nakamo.serving --port 8000                 # one process, threaded
+    python -m rag_nakamo.serving --port 8000 --workers 4     # pre-fork
+
+Pre-fork: the parent builds the pipeline and preloads read-only state (reranker weights,
+local LLM, chunk store mmap, index files in the page cache), freezes the GC so those objects
+stay on shared copy-on-write pages, binds the socket and forks the workers. Each worker then
+opens its own per-process state (Chroma client + HNSW load, HTTPS connections) before
+accepting requests, so no request pays the first-query cost.
+
+GET /metrics: Prometheus text exposition (rag_nakamo/metrics.py). With PROMETHEUS_MULTIPROC_DIR
+set (needed with --workers), any worker answers with the view merged over all workers.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from rag_nakamo.agents.new_orch import SimpleOrchestrator
+from rag_nakamo.agents.rag import RAGAgent
+from rag_nakamo.agents.response import ResponseAgent
+from rag_nakamo.conversation import ConversationStore
+from rag_nakamo.deadline import Deadline, client_budget
+from rag_nakamo.llm.client import reset_llm_client
+from rag_nakamo.logger_config import setup_logging
+from rag_nakamo.metrics import exposition, mark_process_dead, multiprocess_dir, remove_dead_processes
+from rag_nakamo.security.prompt_guard import PromptGuard
+from rag_nakamo.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class Pipeline:
+    """Orchestrator with registered agents plus the guard, as in main2_1.py."""
+
+    def __init__(self):
+        settings = get_settings()
+        conversations = ConversationStore(
+            max_turns=settings.conversation_max_turns,
+            max_conversations=settings.conversation_max_count,
+            max_summary_chars=settings.conversation_summary_chars,
+        ) if settings.enable_conversations else None
+        self.orchestrator = SimpleOrchestrator(conversation_store=conversations)
+        self.rag_agent = RAGAgent(name="RAG Agent", description="RAG Agent")
+        self.response_agent = ResponseAgent(name="Response Agent", description="Response Agent")
+        self.orchestrator.register_agent("rag_agent", self.rag_agent)
+        self.orchestrator.register_agent("response_agent", self.response_agent)
+        self.guard = PromptGuard()
+
+    @property
+    def components(self):
+        return [self.orchestrator, self.rag_agent, self.response_agent, self.guard]
+
+    def warm_up(self, preload: bool = True, connect: bool = True):
+        start = time.perf_counter()
+        for component in self.components:
+            component.warm_up(preload=preload, connect=connect)
+        logger.info(f"Warm-up (preload={preload}, connect={connect}) done in {time.perf_counter() - start:.2f}s")
+
+    def after_fork(self):
+        """Drop per-process state inherited from the parent (clients, sockets)."""
+        reset_llm_client()
+        for component in self.components:
+            component.client = None
+        self.rag_agent.__dict__.pop("embeddings", None)  # cached_property, rebuilt from get_embeddings()
+        self.rag_agent._switching = False  # an index switch thread of the parent does not exist here
+
+    def answer(self, query: str, deadline_s: Optional[float] = None, conversation_id: Optional[str] = None) -> Dict[str, Any]:
+        """deadline_s (from the client) is clamped to [min_deadline_s, max_deadline_s]."""
+        settings = get_settings()
+        budget = client_budget(deadline_s, settings.min_deadline_s, settings.max_deadline_s)
+        deadline = Deadline.from_budget(budget or settings.query_deadline_s)
+        result = self.orchestrator.process_message(query, deadline=deadline, conversation_id=conversation_id,
+                                                   record_turn=False)
+        if result["used_rag"]:
+            guarded = self.guard.classify_and_decide(
+                user_prompt=query,
+                draft_answer=result["response"],
+                context_docs=result.get("context", result["rag_results"]),  # compressed when enabled
+            )
+            result["response"] = guarded.final_answer
+            result["guard"] = guarded.decision.status
+        self.orchestrator.record_turn(conversation_id, query, result["response"])  # guarded answer
+        if deadline is not None:
+            # the answer's own (a coalesced one's are the leader's) plus any taken after the workflow
+            degradations = result.get("degradations", [])
+            result["degradations"] = degradations + [d for d in deadline.degradations if d not in degradations]
+            result["elapsed_s"] = round(deadline.elapsed(), 3)
+        return result
+
+
+def make_handler(pipeline: Pipeline):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload, default=lambda o: o.to_dict() if hasattr(o, "to_dict") else str(o)).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "pid": os.getpid()})
+            elif self.path == "/metrics" and get_settings().enable_metrics:
+                body = exposition()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE_LATEST)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/query":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                query, deadline_s = body.get("query", ""), body.get("deadline_s")
+                conversation_id = body.get("conversation_id")
+            except (ValueError, AttributeError):
+                self._send(400, {"error": "expected JSON body {\"query\": ...}"})
+                return
+            settings = get_settings()
+            try:
+                client_budget(deadline_s, settings.min_deadline_s, settings.max_deadline_s)
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            if not query:
+                self._send(400, {"error": "missing query"})
+                return
+            try:
+                self._send(200, pipeline.answer(query, deadline_s, conversation_id))
+            except Exception as e:
+                logger.exception("Query failed")
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return QueryHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = 0, warm_up: bool = True):
+    pipeline = Pipeline()
+    handler = make_handler(pipeline)
+    remove_dead_processes()  # metric files of previous runs (multiprocess mode)
+
+    if workers <= 0:
+        if warm_up:
+            pipeline.warm_up()
+        server = ThreadingHTTPServer((host, port), handler)
+        logger.info(f"Serving on {host}:{port} (single process)")
+        try:
+            server.serve_forever()
+        finally:
+            pipeline.orchestrator.close()
+        return
+
+    if warm_up:
+        pipeline.warm_up(preload=True, connect=False)
+    if not multiprocess_dir():
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set: /metrics shows only the worker that answers the scrape")
+    gc.collect()
+    gc.freeze()  # preloaded objects move to the permanent generation: no GC writes, pages stay shared
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+
+    def run_worker():
+        pipeline.after_fork()
+        if warm_up:
+            pipeline.warm_up(preload=False, connect=True)
+        server = ThreadingHTTPServer((host, port), handler, bind_and_activate=False)
+        server.socket.close()
+        server.socket = sock
+        logger.info(f"Worker {os.getpid()} ready")
+        server.serve_forever()
+
+    children = {}
+
+    stop_signals = {signal.SIGTERM, signal.SIGINT}
+
+    def spawn():
+        # the parent's shutdown handler (it signals every worker it knows of) must never run in
+        # a worker: blocked across fork, reset to the defaults in the child before unblocking
+        signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                for signum in stop_signals:
+                    signal.signal(signum, signal.SIG_DFL)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+                try:
+                    run_worker()
+                finally:
+                    os._exit(0)
+            children[pid] = time.time()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+
+    def shutdown(signum, frame):
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Serving on {host}:{port} with {workers} pre-forked workers")
+
+    while True:
+        pid, status = os.wait()
+        mark_process_dead(pid)  # its in-flight gauge leaves the merged view
+        if children.pop(pid, None) is not None:
+            logger.warning(f"Worker {pid} exited ({status}), restarting")
+            spawn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG Nakamo query server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=0, help="pre-forked worker processes (0: single process)")
+    parser.add_argument("--no-warm-up", action="store_true")
+    args = parser.parse_args()
+    setup_logging()
+    serve(args.host, args.port, args.workers, warm_up=not args.no_warm_up)
+
+
+if __name__ == "__main__":
+    main()
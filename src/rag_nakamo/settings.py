@@ -1,34 +1,151 @@
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, Field
 from functools import lru_cache
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Settings(BaseSettings):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        print(f"Loading API from .env file: {bool(self.openai_api_key)}")
+        logger.debug(f"Loading API from .env file: {bool(self.openai_api_key)}")
     environment: Literal["dev", "test", "prod"] = "dev"
     log_level: str = "INFO"
+    log_format: Literal["color", "json"] = "color" # json: one object per line
+    log_queue: bool = False # QueueHandler + listener thread, request threads never block on I/O
+    log_queue_size: int = 10000 # records beyond this are dropped, not waited for
+    log_debug_sample_rate: float = 1.0 # share of queries whose DEBUG detail is kept
+    # Prometheus metrics (rag_nakamo/metrics.py). Several processes (pre-fork workers, batch jobs):
+    # set PROMETHEUS_MULTIPROC_DIR in the environment, prometheus_client reads it at import
+    enable_metrics: bool = True # GET /metrics on the query server
 
     # LLM
     openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
+    openai_base_url: Optional[str] = None # e.g. a proxy or a local stub server
     model_provider: Literal["openai", "huggingface", "ollama"] = "openai"
     orchestrator_model: str = "gpt-4o-mini" # now default
     response_model: str = "gpt-4o-mini"
+    # local providers: one shared model per process, dynamic batching
+    local_model_id: str = "google/gemma-3-1b-it"
+    local_device: str = "cpu"
+    ollama_base_url: str = "http://localhost:11434"
+    ollama_model: str = "gemma3:4b"
+    local_max_batch: int = 4
+    local_max_new_tokens: int = 1024
+    local_batch_wait_ms: float = 20
+    # provider admission control (openai): rate limits, adaptive concurrency, retries, deadlines
+    enable_llm_limits: bool = True
+    llm_rpm: int = 500
+    llm_tpm: int = 200000
+    embeddings_rpm: int = 3000
+    embeddings_tpm: int = 1000000
+    llm_max_concurrency: int = 32 # AIMD upper bound, starts at llm_initial_concurrency
+    llm_initial_concurrency: int = 4
+    llm_latency_target_s: float = 20.0 # slower calls shrink the concurrency limit
+    llm_max_retries: int = 4
+    llm_backoff_base_s: float = 0.5
+    llm_backoff_max_s: float = 20.0
+    llm_attempt_timeout_s: float = 60.0
+    llm_deadline_s: float = 120.0 # per call, retries included
+    # hedged requests (response agent, guard): duplicate a call still running after the p90
+    enable_hedging: bool = False
+    hedge_quantile: float = 0.9
+    hedge_budget: float = 0.05 # max share of extra requests
+    hedge_min_samples: int = 20
     # validation_model: str = "gpt-4o-mini"
     # security
     guard_model: str = "gpt-4o-mini"
     sanitize: bool = True #
+    guard_timeout_s: float = 15.0 # classifier call, not shortened by the query deadline; failure blocks
     # DB
     chroma_db_path: str = "chroma_db"
     chroma_collection_name: str = "regulatory_documents"
     embeddings_model: str = "text-embedding-3-large"
+    use_chunk_store: bool = False # texts in a compressed chunk store, not in chroma
+    chunk_store_path: str = "chunk_store"
+    # HNSW graph of new collections (existing ones keep theirs), pick with scripts/tune_hnsw.py
+    hnsw_space: Literal["cosine", "l2", "ip"] = "l2" # Chroma's default; relevance scores are converted per metric
+    hnsw_m: int = 16 # graph degree: recall and memory
+    hnsw_construction_ef: int = 100 # build-time beam: graph quality vs build time
+    hnsw_search_ef: int = 100 # query-time beam: recall vs latency, changeable on a built collection
+    # versioned index snapshots (vectorstore/versions.py): ingestion builds <index_root>/<version>/ and
+    # flips <index_root>/CURRENT after smoke queries, agents switch on their next query. None: paths above
+    index_root: Optional[str] = None
+    index_keep_versions: int = 3 # activated versions kept for rollback, older ones pruned
+    index_smoke_queries: List[str] = [
+        "What are the requirements for medical device software?",
+        "How should risk management be documented?",
+        "What are the validation requirements?",
+    ]
+    index_smoke_min_results: int = 1
+    # ingestion daemon (vectorstore/watcher.py): incremental upserts of new / changed files
+    watch_dir: str = "data/"
+    watch_debounce_s: float = 5.0 # a file is indexed once quiet for this long
+    watch_poll_s: float = 10.0 # scan interval without inotify (watchdog missing, network file systems)
+    watch_use_polling: bool = False
+    watch_metrics_path: Optional[str] = None # JSON metrics (throughput, queue depth, freshness) after each batch
+    # first-stage search on truncated / quantized vectors, full-precision rescoring (queries without filters)
+    vector_index: Literal["chroma", "quantized"] = "chroma"
+    quantized_index_path: str = "quantized_index"
+    quantized_dims: int = 512 # Matryoshka truncation, 0: full 3072
+    quantization: Literal["none", "int8", "binary"] = "int8"
+    rescore_oversample: int = 4 # candidates rescored = k * oversample
+    # parent-child retrieval (vectorstore/parents.py): small child spans are indexed for matching, the
+    # parents they belong to (pages or heading-delimited sections) are the context. Re-ingest after changing
+    enable_parent_retrieval: bool = False
+    parent_unit: Literal["page", "section"] = "page" # scripts/bench_parent_child.py
+    parent_max_chars: int = 6000 # longer parents are split
+    child_chars: int = 400 # sentences packed into child spans up to this size
+    parent_store_path: str = "parent_store"
+    parent_fetch_k: int = 30 # children retrieved, then grouped by parent (MMR does not apply)
+    parent_token_budget: int = 3000 # parents returned best first up to this (tokens.py estimate), at most retrieval_top_k
+    # PDF text extraction (vectorstore/extractors.py)
+    pdf_backend: Literal["auto", "pypdf", "pdfminer", "pypdfium2"] = "pypdf"
+    pdf_backend_overrides: Dict[str, str] = {} # file name glob -> backend, e.g. {"WHO_*.pdf": "pdfminer"}
+    page_cache_path: Optional[str] = None # extracted pages by file hash + backend, e.g. "data/page_cache"; None: off
+    # ingestion cleanup before embedding (vectorstore/dedup.py), off by default: it changes the indexed
+    # chunks, re-ingest after enabling (scripts/bench_dedup.py shows what a corpus loses)
+    strip_page_furniture: bool = False # repeated page headers / footers / page numbers
+    furniture_min_fraction: float = 0.1 # edge line on >= this fraction of a document's pages
+    dedup_chunks: Literal["off", "drop", "merge"] = "off" # merge: kept chunk records its duplicates
+    dedup_threshold: float = 0.85 # estimated Jaccard on word 5-gram shingles
+    minhash_perms: int = 128
     max_context_tokens: int = 10000 # limit ?
+    # extractive compression of the retrieved context (rag_nakamo/compression.py), response agent and guard
+    enable_compression: bool = False
+    compression_method: Literal["lexical", "embedding"] = "lexical" # embedding: one embeddings call per query
+    compression_token_budget: int = 1000 # context tokens kept (tokens.py estimate)
+    compression_neighbors: int = 0 # sentences kept on each side of a selected one
     retrieval_top_k: int = 5
+    enable_metadata_filters: bool = False # focus areas -> chroma where clause, needs an index ingested with the metadata
     # if we use ensemble retrieval, we will rerank the top k results
     enable_rerank: bool = False
     rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
     rerank_top_k: int = 3
+    # diversify candidates before rerank: (source, page) dedup, then MMR down to retrieval_top_k
+    enable_mmr: bool = False
+    mmr_fetch_k: int = 20 # candidates retrieved (with embeddings) for dedup + MMR
+    mmr_lambda: float = 0.5 # 1: relevance only, 0: diversity only
+    max_chunks_per_page: int = 1 # 0: off
+    max_chunks_per_source: int = 0 # 0: off
+    enable_singleflight: bool = True # coalesce identical in-flight queries
+    # per-query latency budget (None: off), stages degrade when less than *_below_s is left
+    query_deadline_s: Optional[float] = None
+    min_deadline_s: float = 2.0 # client deadline_s (POST /query) is clamped to [min, max]
+    max_deadline_s: float = 120.0
+    degrade_rerank_below_s: float = 10.0 # skip rerank
+    degrade_top_k_below_s: float = 8.0 # retrieve degraded_top_k instead of retrieval_top_k
+    degraded_top_k: int = 3
+    degrade_context_below_s: float = 6.0 # at most degraded_context_chars of documents
+    degraded_context_chars: int = 4000
+    degrade_max_tokens_below_s: float = 6.0 # answer capped to degraded_max_tokens
+    degraded_max_tokens: int = 800
+    # multi-turn memory: last turns verbatim, older ones summarized, LRU over conversations
+    enable_conversations: bool = False
+    conversation_max_turns: int = 8
+    conversation_max_count: int = 1000
+    conversation_summary_chars: int = 1500
 
     # WEB
     google_api_key: Optional[str] = Field(default=None, env="GOOGLE_API_KEY")
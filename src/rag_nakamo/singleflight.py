@@ -0,0 +1,73 @@
+import copy
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from rag_nakamo.metrics import CACHE_LOOKUPS
+
+# Single-flight request coalescing: concurrent calls with the same key share one
+# execution. The first caller (leader) runs the function, callers arriving while it
+# is in flight (followers) wait for and reuse its result (or its exception).
+# Nothing is cached: once the leader finishes, the next call runs again.
+# Results are mutable (dicts, Documents, ChunkHits whose rank is set downstream): when
+# a call had followers, every caller, the leader included, gets its own deep copy.
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation insensitive key for user questions."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "followers")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+        # a follower is a hit: served by another call's execution
+        self._hit = CACHE_LOOKUPS.labels(f"singleflight_{name}", "hit")
+        self._miss = CACHE_LOOKUPS.labels(f"singleflight_{name}", "miss")
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["leaders"] += 1
+            else:
+                call.followers += 1
+                self.stats["followers"] += 1
+
+        (self._miss if leader else self._hit).inc()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]  # no follower joins after this, call.followers is final
+            call.event.set()
+        return copy.deepcopy(call.result) if call.followers else call.result
+
+    def coalescing_ratio(self) -> float:
+        """Share of calls served by another call's execution."""
+        total = self.stats["leaders"] + self.stats["followers"]
+        return self.stats["followers"] / total if total else 0.0
@@ -0,0 +1,10 @@
+# Token estimate used everywhere a count is needed without a tokenizer: provider rate limits
+# (llm/resilience.py), context budgets (compression.py, vectorstore/parents.py) and ingestion
+# reports (vectorstore/dedup.py). ~4 characters per token for English prose with OpenAI's
+# tokenizers; what matters is that budgets and limits use the same estimate.
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
@@ -1,5 +1,54 @@
-import chromadb
-from langchain_chroma import Chroma
+import os
+
+# chromadb / langchain_chroma are imported inside the functions (slow imports)
+
+HNSW_SPACES = ("cosine", "l2", "ip")
+
+
+def hnsw_metadata(settings=None):
+    """ Collection metadata with the HNSW parameters from Settings, applied when a collection is created """
+    if settings is None:
+        from rag_nakamo.settings import get_settings
+        settings = get_settings()
+    return {
+        "hnsw:space": settings.hnsw_space,
+        "hnsw:M": settings.hnsw_m,
+        "hnsw:construction_ef": settings.hnsw_construction_ef,
+        "hnsw:search_ef": settings.hnsw_search_ef,
+    }
+
+
+def collection_space(collection):
+    """ Distance metric a collection was built with (Chroma's default is l2) """
+    space = (collection.metadata or {}).get("hnsw:space")
+    if space is None:
+        space = ((getattr(collection, "configuration_json", None) or {}).get("hnsw") or {}).get("space")
+    return space or "l2"
+
+
+def relevance_score(distance, space):
+    """ Chroma distance -> similarity, higher is more relevant. For unit-length embeddings (OpenAI's)
+    every metric gives the cosine similarity, the score the quantized index reports. """
+    if space == "l2":
+        return 1.0 - distance / 2.0  # Chroma's l2 is squared: |a - b|^2 = 2 - 2 cos
+    return 1.0 - distance  # cosine: 1 - cos, ip: 1 - dot
+
+
+def set_search_ef(collection, search_ef):
+    """ The query-time beam is the one HNSW parameter a built collection can change. Persisted, and
+    used by clients opened afterwards: processes that already loaded the index keep the old value. """
+    collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+
+
+def close_persistent_client(chroma_db_path):
+    """ chromadb keeps one system (and the HNSW segments it loaded) per persist directory for the
+    life of the process: stop and forget the one of `chroma_db_path`. Clients of that path opened
+    before are unusable afterwards, a new PersistentClient starts a fresh system. """
+    from chromadb.api.shared_system_client import SharedSystemClient
+    system = SharedSystemClient._identifier_to_system.pop(str(chroma_db_path), None)
+    if system is not None:
+        system.stop()
+
 
 # Old vector store manager code
 
@@ -7,15 +56,19 @@ def create_and_populate_vector_store(
     chunks, 
     embeddings,
     chroma_db_path="./chroma_db",
-    collection_name="regulatory_documents"
+    collection_name="regulatory_documents",
+    collection_metadata=None
 ):
+    import chromadb
+    from langchain_chroma import Chroma
     persistent_client = chromadb.PersistentClient(path=chroma_db_path)
 
     vector_store = Chroma.from_documents(
         documents=chunks,
         embedding=embeddings,
         client=persistent_client,
-        collection_name=collection_name
+        collection_name=collection_name,
+        collection_metadata=collection_metadata or hnsw_metadata()
     )
 
     print(f"Vector store created and populated with {len(chunks)} document chunks.")
@@ -30,6 +83,8 @@ def get_vector_store_retriever(
     # if search_kwargs is None:
     #     search_kwargs = {"k": 5}
 
+    import chromadb
+    from langchain_chroma import Chroma
     persistent_client = chromadb.PersistentClient(path=chroma_db_path)
 
     vector_store = Chroma(
@@ -38,4 +93,70 @@ def get_vector_store_retriever(
         embedding_function=embeddings,
     )
 
-    return vector_store.as_retriever(search_kwargs=search_kwargs)
\ No newline at end of file
+    return vector_store.as_retriever(search_kwargs=search_kwargs)
+
+def create_and_populate_compact_store(
+    chunks,
+    embeddings,
+    chunk_store,
+    chroma_db_path="./chroma_db",
+    collection_name="regulatory_documents",
+    batch_size=256,
+    collection_metadata=None
+):
+    """ Chunk texts go to the ChunkStore, Chroma only gets ids, embeddings and metadata
+    (with the `chunk_id` content address). Identical texts are stored once. """
+    import chromadb
+    persistent_client = chromadb.PersistentClient(path=chroma_db_path)
+    collection = persistent_client.get_or_create_collection(collection_name,
+                                                            metadata=collection_metadata or hnsw_metadata())
+
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        texts = [chunk.page_content for chunk in batch]
+        chunk_ids = chunk_store.add_many(texts)
+        vectors = embeddings.embed_documents(texts)
+        metadatas = []
+        ids = []
+        for i, (chunk, cid) in enumerate(zip(batch, chunk_ids)):
+            metadatas.append({**chunk.metadata, "chunk_id": cid})
+            ids.append(f"{cid}-{start + i}") # one record per occurrence, text shared
+        collection.upsert(ids=ids, embeddings=vectors, metadatas=metadatas)
+
+    print(f"Compact store populated with {len(chunks)} chunks ({chunk_store.stats()}).")
+    return collection
+
+
+def upsert_chunks(collection, chunks, embeddings, ids, chunk_store=None, batch_size=256):
+    """ Embed and upsert chunks under the given ids, in batches. With a chunk store the
+    texts go there and Chroma gets `chunk_id` instead of the document. Returns vectors written. """
+    written = 0
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        texts = [chunk.page_content for chunk in batch]
+        vectors = embeddings.embed_documents(texts)
+        metadatas = [dict(chunk.metadata) for chunk in batch]
+        if chunk_store is not None:
+            for metadata, cid in zip(metadatas, chunk_store.add_many(texts)):
+                metadata["chunk_id"] = cid
+            collection.upsert(ids=ids[start:start + batch_size], embeddings=vectors, metadatas=metadatas)
+        else:
+            collection.upsert(ids=ids[start:start + batch_size], embeddings=vectors, metadatas=metadatas,
+                              documents=texts)
+        written += len(batch)
+    return written
+
+
+def prefetch_index_files(chroma_db_path="./chroma_db", block_size=1 << 20):
+    """ Read the index files once so they sit in the OS page cache, shared by all
+    worker processes. Does not open a Chroma client (not fork-safe). Returns bytes read. """
+    total = 0
+    for root, _, files in os.walk(chroma_db_path):
+        for name in files:
+            with open(os.path.join(root, name), "rb") as f:
+                while True:
+                    block = f.read(block_size)
+                    if not block:
+                        break
+                    total += len(block)
+    return total
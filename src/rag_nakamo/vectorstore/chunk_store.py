@@ -0,0 +1,204 @@
+import copy
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import zstandard as zstd
+
+# Content-addressed chunk text store, kept out of the vector index.
+# Layout of a store directory:
+#   chunks.bin   concatenated zstd frames, one per unique chunk text
+#   chunks.idx   fixed size records: 16 byte chunk id | u64 offset | u32 length
+#   chunks.dict  optional zstd dictionary trained on the first batch of chunks
+# Chroma only keeps ids, embeddings and small metadata (with `chunk_id`), so the
+# index stays small and the text is read (mmapped, decompressed) only when needed.
+
+INDEX_RECORD = struct.Struct("<16sQI")
+DICT_MIN_SAMPLES = 64
+DICT_SIZE = 64 * 1024
+
+
+def chunk_id(text: str) -> str:
+    """Content address of a chunk text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ChunkStore:
+    def __init__(self, path: str, compression_level: int = 9):
+        self.path = path
+        self.compression_level = compression_level
+        self.bin_path = os.path.join(path, "chunks.bin")
+        self.idx_path = os.path.join(path, "chunks.idx")
+        self.dict_path = os.path.join(path, "chunks.dict")
+        self._index: Dict[bytes, tuple] = {}
+        self._dict: Optional[zstd.ZstdCompressionDict] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # zstd (de)compressors are not thread safe
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.dict_path):
+            with open(self.dict_path, "rb") as f:
+                self._dict = zstd.ZstdCompressionDict(f.read())
+        if os.path.exists(self.idx_path):
+            with open(self.idx_path, "rb") as f:
+                raw = f.read()
+            for key, offset, length in INDEX_RECORD.iter_unpack(raw[: len(raw) - len(raw) % INDEX_RECORD.size]):
+                self._index[key] = (offset, length)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, cid: str):
+        return bytes.fromhex(cid) in self._index
+
+    def _decompressor(self):
+        if getattr(self._local, "dctx", None) is None:
+            self._local.dctx = zstd.ZstdDecompressor(dict_data=self._dict) if self._dict else zstd.ZstdDecompressor()
+        return self._local.dctx
+
+    def add_many(self, texts: Iterable[str]) -> List[str]:
+        """Append texts not already stored, return their chunk ids (in input order)."""
+        texts = list(texts)
+        ids = [chunk_id(t) for t in texts]
+        new = {}
+        for cid, text in zip(ids, texts):
+            key = bytes.fromhex(cid)
+            if key not in self._index and key not in new:
+                new[key] = text.encode("utf-8")
+        if not new:
+            return ids
+
+        with self._lock:
+            # filtered again: another thread may have written some of them since the check above
+            new = {key: raw for key, raw in new.items() if key not in self._index}
+            if not new:
+                return ids
+            os.makedirs(self.path, exist_ok=True)
+            if self._dict is None and not os.path.exists(self.bin_path) and len(new) >= DICT_MIN_SAMPLES:
+                try:
+                    self._dict = zstd.train_dictionary(DICT_SIZE, list(new.values()))
+                    with open(self.dict_path, "wb") as f:
+                        f.write(self._dict.as_bytes())
+                except zstd.ZstdError:
+                    self._dict = None  # too little data to train, plain frames are fine
+            cctx = zstd.ZstdCompressor(level=self.compression_level, dict_data=self._dict) \
+                if self._dict else zstd.ZstdCompressor(level=self.compression_level)
+
+            with open(self.bin_path, "ab") as bin_f, open(self.idx_path, "ab") as idx_f:
+                offset = bin_f.tell()
+                for key, raw in new.items():
+                    frame = cctx.compress(raw)
+                    bin_f.write(frame)
+                    idx_f.write(INDEX_RECORD.pack(key, offset, len(frame)))
+                    self._index[key] = (offset, len(frame))
+                    offset += len(frame)
+            self._local.dctx = None
+        return ids
+
+    def add(self, text: str) -> str:
+        return self.add_many([text])[0]
+
+    def _view(self, offset: int, length: int):
+        mapped = self._mmap
+        if mapped is None or offset + length > len(mapped):
+            with self._lock:
+                mapped = self._mmap
+                if mapped is None or offset + length > len(mapped):
+                    # remap after appends; the old map is not closed, threads still slicing it
+                    # hold a reference and it is unmapped when the last one lets go
+                    with open(self.bin_path, "rb") as f:
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._mmap = mapped
+        return mapped[offset: offset + length]
+
+    def get(self, cid: str) -> str:
+        """Return the text of a chunk, KeyError if unknown."""
+        offset, length = self._index[bytes.fromhex(cid)]
+        return self._decompressor().decompress(self._view(offset, length)).decode("utf-8")
+
+    def get_many(self, cids: Iterable[str]) -> List[str]:
+        return [self.get(cid) for cid in cids]
+
+    def prefetch(self) -> None:
+        """Map the blob file and ask the kernel to read it ahead (shared by forked workers)."""
+        if not os.path.exists(self.bin_path) or os.path.getsize(self.bin_path) == 0:
+            return
+        self._view(0, 0)
+        if hasattr(self._mmap, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            self._mmap.madvise(mmap.MADV_WILLNEED)
+
+    def stats(self) -> Dict[str, Any]:
+        size = os.path.getsize(self.bin_path) if os.path.exists(self.bin_path) else 0
+        return {"chunks": len(self._index), "compressed_bytes": size, "dictionary": self._dict is not None}
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+
+class ChunkHit:
+    """Lightweight retrieval hit: ids, score and small metadata.
+    The text is only read from the ChunkStore on first access of `page_content`.
+    Supports the result-dict interface (`hit["content"]`, `hit.get("source")`) used downstream.
+    """
+    __slots__ = ("chunk_id", "score", "rank", "metadata", "_store", "_content")
+
+    def __init__(self, chunk_id: str, score: float, metadata: Dict[str, Any], store: ChunkStore, rank: int = 0):
+        self.chunk_id = chunk_id
+        self.score = score
+        self.rank = rank
+        self.metadata = metadata
+        self._store = store
+        self._content = None
+
+    @property
+    def page_content(self) -> str:
+        if self._content is None:
+            self._content = self._store.get(self.chunk_id)
+        return self._content
+
+    def _field(self, key: str):
+        if key == "content":
+            return self.page_content
+        if key == "relevance_score":
+            return self.score
+        if key == "rank":
+            return self.rank
+        if key == "chunk_id":
+            return self.chunk_id
+        if key == "section":
+            return self.metadata.get("section_heading", "")
+        if key in ("source", "page"):
+            return self.metadata.get(key, "Unknown")
+        return self.metadata[key]
+
+    def __getitem__(self, key: str):
+        return self._field(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self._field(key)
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ("rank", "content", "source", "page", "section", "relevance_score", "chunk_id")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self._field(key) for key in self.keys()}
+
+    def __deepcopy__(self, memo):
+        """Own metadata and rank, shared store (coalesced callers get copies, see singleflight.py)."""
+        hit = ChunkHit(self.chunk_id, self.score, copy.deepcopy(self.metadata, memo), self._store, self.rank)
+        hit._content = self._content
+        return hit
+
+    def __repr__(self):
+        return repr(self.to_dict())
@@ -0,0 +1,141 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag_nakamo.tokens import CHARS_PER_TOKEN
+
+# Ingestion cleanup before anything is embedded:
+#   strip_page_furniture : running headers / footers / page numbers, i.e. lines at the top or
+#                          bottom of a page repeated on many pages of the same document
+#   dedup_chunks         : near-duplicate chunks (boilerplate, disclaimers, repeated passages)
+#                          found with MinHash signatures over word shingles and an LSH index,
+#                          candidates verified on the estimated Jaccard similarity
+# Both work on langchain Documents (page_content, metadata) and keep the input order.
+
+EDGE_LINES = 3  # lines at the top and at the bottom of a page that can be furniture
+PAGE_NUMBER = re.compile(r"^(?:page\s+)?(?:\d{1,4}|[ivxlc]{1,7})(?:\s+of\s+\d{1,4})?$", re.IGNORECASE)
+# "CHAPTER 3" on each chapter's first page collides with the others once digits are normalized
+STRUCTURAL_LABEL = re.compile(r"^(?:chapter|section|part|annex|appendix)\s+[\w.#]{1,6}$", re.IGNORECASE)
+MERSENNE_PRIME = (1 << 31) - 1
+SHINGLE_WORDS = 5
+
+
+def _normalize_line(line: str) -> str:
+    """Same furniture line on every page modulo page numbers and dates: digits -> #."""
+    return re.sub(r"\d+", "#", re.sub(r"\s+", " ", line.strip().lower()))
+
+
+def _edge_lines(lines: List[str]):
+    candidates = [i for i, line in enumerate(lines) if line.strip()]
+    return set(candidates[:EDGE_LINES] + candidates[-EDGE_LINES:])
+
+
+def strip_page_furniture(pages, min_fraction: float = 0.1, min_pages: int = 3) -> Dict[str, int]:
+    """Remove, in place, edge lines repeated on >= max(min_pages, min_fraction * pages) pages of
+    a document, and bare page numbers. Returns counts for the report."""
+    by_source = defaultdict(list)
+    for page in pages:
+        by_source[page.metadata.get("source", "")].append(page)
+    stats = {"furniture_lines": 0, "furniture_chars": 0, "furniture_patterns": 0}
+    for doc_pages in by_source.values():
+        counts = Counter()
+        for page in doc_pages:
+            lines = page.page_content.splitlines()
+            counts.update({_normalize_line(lines[i]) for i in _edge_lines(lines)})
+        threshold = max(min_pages, min_fraction * len(doc_pages))
+        furniture = {line for line, n in counts.items() if n >= threshold and line and not STRUCTURAL_LABEL.match(line)}
+        stats["furniture_patterns"] += len(furniture)
+        for page in doc_pages:
+            lines = page.page_content.splitlines()
+            drop = {i for i in _edge_lines(lines)
+                    if _normalize_line(lines[i]) in furniture or PAGE_NUMBER.match(lines[i].strip())}
+            if drop:
+                stats["furniture_lines"] += len(drop)
+                stats["furniture_chars"] += sum(len(lines[i]) + 1 for i in drop)
+                page.page_content = "\n".join(line for i, line in enumerate(lines) if i not in drop)
+    return stats
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` universal hashes (a * x + b) mod (2^31 - 1),
+    computed for all shingles of a text at once."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)[:, None]
+
+    @staticmethod
+    def shingles(text: str) -> np.ndarray:
+        words = re.findall(r"\w+", text.lower())
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+        return np.fromiter((zlib.crc32(g.encode()) % MERSENNE_PRIME for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        x = self.shingles(text)
+        if x.size == 0:
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        return ((self.a * x[None, :] + self.b) % MERSENNE_PRIME).min(axis=1)  # a, x < 2^31: no overflow
+
+
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows == num_perm and the LSH S-curve midpoint
+    (1 / bands) ** (1 / rows) closest to 0.8 * threshold: candidates are verified on the
+    signatures, so a lower midpoint buys recall near the threshold for a few extra checks."""
+    target = 0.8 * threshold
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - target))
+
+
+def find_near_duplicates(texts: List[str], threshold: float = 0.85, num_perm: int = 128) -> List[Optional[int]]:
+    """For each text, the index of the earlier text it duplicates (estimated Jaccard on word
+    shingles >= threshold), or None for texts that are kept."""
+    hasher = MinHasher(num_perm)
+    bands, rows = lsh_params(num_perm, threshold)
+    buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    duplicate_of: List[Optional[int]] = []
+    for i, text in enumerate(texts):
+        signatures[i] = signature = hasher.signature(text)
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+        candidates = {j for band, key in enumerate(keys) for j in buckets[band].get(key, ())}
+        match = None
+        if candidates:
+            candidates = np.fromiter(sorted(candidates), dtype=np.int64)
+            similarity = (signatures[candidates] == signature).mean(axis=1)
+            if similarity.max() >= threshold:
+                match = int(candidates[np.argmax(similarity)])
+        duplicate_of.append(match)
+        if match is None:  # only kept texts are indexed, duplicates resolve to a kept chunk
+            for band, key in enumerate(keys):
+                buckets[band][key].append(i)
+    return duplicate_of
+
+
+def dedup_chunks(chunks, threshold: float = 0.85, num_perm: int = 128, merge: bool = True):
+    """Kept chunks (input order) and counts. With merge, a kept chunk records how many
+    duplicates it absorbed and where they were (`duplicates`, `duplicate_pages`)."""
+    duplicate_of = find_near_duplicates([chunk.page_content for chunk in chunks], threshold, num_perm)
+    kept = [chunk for chunk, match in zip(chunks, duplicate_of) if match is None]
+    removed = [(chunk, chunks[match]) for chunk, match in zip(chunks, duplicate_of) if match is not None]
+    if merge:
+        for chunk, target in removed:
+            target.metadata["duplicates"] = target.metadata.get("duplicates", 0) + 1
+            location = f"{chunk.metadata.get('source', '')}:{chunk.metadata.get('page', '')}"
+            pages = target.metadata.get("duplicate_pages", "")
+            if len(pages) < 500:  # Chroma metadata is scalar, keep a bounded string
+                target.metadata["duplicate_pages"] = f"{pages};{location}" if pages else location
+    return kept, {"chunks_removed": len(removed), "removed_chars": sum(len(c.page_content) for c, _ in removed)}
+
+
+def cleanup_report(chunks_before: int, chunks_after: int, furniture: Dict[str, int], removed_chars: int) -> str:
+    furniture_chars = furniture.get('furniture_chars', 0)
+    return (f"Ingestion cleanup: {furniture.get('furniture_lines', 0)} furniture lines stripped "
+            f"({furniture.get('furniture_patterns', 0)} patterns, ~{furniture_chars // CHARS_PER_TOKEN} tokens), "
+            f"{chunks_before - chunks_after} near-duplicate chunks removed of {chunks_before} "
+            f"(~{removed_chars // CHARS_PER_TOKEN} tokens), ~{(furniture_chars + removed_chars) // CHARS_PER_TOKEN} "
+            f"embedding tokens saved")
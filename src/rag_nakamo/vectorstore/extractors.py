@@ -0,0 +1,132 @@
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import zstandard as zstd
+
+from rag_nakamo.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# PDF text extraction, one string per page, behind a small registry of backends:
+#   pypdf      pure python, the parser behind LangChain's PyPDFLoader
+#   pdfminer   pdfminer.six, slower, better reading order on multi-column layouts
+#   pypdfium2  PDFium bindings, fastest, good on OCRed scans with a text layer
+# Backends are imported on first use; `available_backends()` lists the installed ones.
+# PageCache stores extracted pages keyed by (file content hash, backend), so re-running
+# ingestion or chunking experiments skips parsing.
+
+CACHE_VERSION = 1  # bump when an extractor's output changes
+AUTO_ORDER = ("pypdfium2", "pypdf", "pdfminer")
+
+
+def _pypdf(path: str) -> List[str]:
+    from pypdf import PdfReader
+    return [page.extract_text() or "" for page in PdfReader(path).pages]
+
+
+def _pdfminer(path: str) -> List[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    return ["".join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+            for page in extract_pages(path)]
+
+
+def _pypdfium2(path: str) -> List[str]:
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(path)
+    try:
+        pages = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range().replace("\r\n", "\n"))
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+EXTRACTORS: Dict[str, Callable[[str], List[str]]] = {
+    "pypdf": _pypdf,
+    "pdfminer": _pdfminer,
+    "pypdfium2": _pypdfium2,
+}
+
+
+def available_backends() -> List[str]:
+    import importlib.util
+    return [name for name in EXTRACTORS if importlib.util.find_spec(name) is not None]  # backend name = module
+
+
+def choose_backend(file_path: str, default: str = "pypdf", overrides: Optional[Dict[str, str]] = None) -> str:
+    """Per-file override (first matching glob on the file name), else the default;
+    "auto" picks the first installed backend of AUTO_ORDER."""
+    name = os.path.basename(file_path)
+    backend = next((b for pattern, b in (overrides or {}).items() if fnmatch.fnmatch(name, pattern)), default)
+    if backend == "auto":
+        installed = available_backends()
+        backend = next((b for b in AUTO_ORDER if b in installed), "pypdf")
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Unknown PDF backend {backend!r}, expected one of {sorted(EXTRACTORS)} or 'auto'")
+    return backend
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PageCache:
+    """Extracted pages as zstd-compressed JSON, one file per (content hash, backend)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _file(self, digest: str, backend: str) -> str:
+        return os.path.join(self.path, f"{digest}-{backend}-v{CACHE_VERSION}.json.zst")
+
+    def get(self, digest: str, backend: str) -> Optional[List[str]]:
+        try:
+            with open(self._file(digest, backend), "rb") as f:
+                pages = json.loads(zstd.ZstdDecompressor().decompress(f.read()))
+        except (OSError, ValueError, zstd.ZstdError):
+            self.stats["misses"] += 1
+            CACHE_LOOKUPS.labels("page", "miss").inc()
+            return None
+        self.stats["hits"] += 1
+        CACHE_LOOKUPS.labels("page", "hit").inc()
+        return pages
+
+    def put(self, digest: str, backend: str, pages: List[str]):
+        os.makedirs(self.path, exist_ok=True)
+        data = zstd.ZstdCompressor(level=9).compress(json.dumps(pages).encode("utf-8"))
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._file(digest, backend))  # atomic, concurrent runs never read a partial file
+
+
+def extract_pages(file_path: str, backend: str = "pypdf", cache: Optional[PageCache] = None,
+                  digest: Optional[str] = None) -> List[str]:
+    """Page texts of a PDF with the given backend, from the cache when the file is unchanged."""
+    if cache is not None:
+        digest = digest or file_hash(file_path)
+        pages = cache.get(digest, backend)
+        if pages is not None:
+            return pages
+    start = time.perf_counter()
+    pages = EXTRACTORS[backend](file_path)
+    logger.debug(f"Extracted {len(pages)} pages from {file_path} with {backend} in {time.perf_counter() - start:.2f}s")
+    if cache is not None:
+        cache.put(digest, backend, pages)
+    return pages
@@ -1,47 +1,100 @@
 import re
 from glob import glob
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain_openai.embeddings import OpenAIEmbeddings
 from rag_nakamo.settings import get_settings
-from rag_nakamo.vectorstore.chroma_manager import create_and_populate_vector_store, get_vector_store_retriever
+from rag_nakamo.vectorstore.chroma_manager import create_and_populate_vector_store, create_and_populate_compact_store, get_vector_store_retriever
+from rag_nakamo.vectorstore.metadata import extract_document_metadata, find_headings
+from rag_nakamo.vectorstore.dedup import cleanup_report, dedup_chunks, strip_page_furniture
+from rag_nakamo.vectorstore.extractors import PageCache, choose_backend, extract_pages, file_hash
+from rag_nakamo.vectorstore.parents import build_parent_child
+from rag_nakamo.vectorstore.versions import IndexVersions, chroma_smoke_check
 
 def load_pdfs(data_dir):
-    """Load all PDFs from a directory"""
+    """Load all PDFs from a directory, backend per file (settings.pdf_backend, pdf_backend_overrides),
+    pages from the parsed-page cache when the file is unchanged"""
     # print(data_dir)
+    settings = get_settings()
+    cache = PageCache(settings.page_cache_path) if settings.page_cache_path else None
     pdf_files = glob(data_dir + "*.pdf")
     documents = []
     for pdf_file in pdf_files:
-        print(f"Processing {pdf_file}...")
-        pages = load_pdf(pdf_file)
+        backend = choose_backend(pdf_file, settings.pdf_backend, settings.pdf_backend_overrides)
+        print(f"Processing {pdf_file} ({backend})...")
+        pages = load_pdf(pdf_file, backend=backend, cache=cache)
         documents.extend(pages)
         print(f"Added {len(pages)} pages")
+    if cache is not None:
+        print(f"Page cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses")
 
     return documents
 
-def load_pdf(file_path):
-    """Load a single PDF file"""
-    loader = PyPDFLoader(file_path)
-    pages = loader.load()
+def load_pdf(file_path, backend="pypdf", cache=None):
+    """Load a single PDF file, with document level metadata (authority, type, year)
+    and the section heading in effect at the start of each page."""
+    from langchain_core.documents import Document
+    digest = file_hash(file_path) # stored with every chunk, the watcher compares it to skip unchanged files
+    texts = extract_pages(file_path, backend=backend, cache=cache, digest=digest)
+    pages = [
+        Document(page_content=text, metadata={"page": i, "total_pages": len(texts), "pdf_backend": backend,
+                                              "file_hash": digest})
+        for i, text in enumerate(texts)
+    ]
+    doc_metadata = extract_document_metadata(file_path, (page.page_content for page in pages))
+    heading = ""
     for i, page in enumerate(pages):
         page.metadata.update({
             "source": file_path,
             "file_path": str(file_path),
-            "page_number": i
+            "page_number": i,
+            "section_heading": heading,
+            **doc_metadata,
         })
+        page_headings = find_headings(page.page_content)
+        if page_headings:
+            heading = page_headings[-1]
     return pages
 
 def chunk_documents(documents, chunker):
-    """Split documents now using semantic chunking"""
+    """Split documents now using semantic chunking.
+    Each chunk gets the section heading in effect where it starts."""
     chunks = []
     for doc in documents:
         doc_chunks = chunker.create_documents([doc.page_content])
+        heading = doc.metadata.get("section_heading", "")
         for chunk in doc_chunks:
             chunk.metadata = doc.metadata.copy()
+            chunk_headings = find_headings(chunk.page_content)
+            # a chunk opening with a heading belongs to that section
+            if chunk_headings and chunk.page_content.lstrip().startswith(chunk_headings[0].split(" ")[0]):
+                heading = chunk_headings[0]
+            chunk.metadata["section_heading"] = heading
+            if chunk_headings:
+                heading = chunk_headings[-1]
         chunks.extend(doc_chunks)
 
     return chunks
 
+def clean_and_chunk(documents, chunker, settings, parent_store=None):
+    """Chunked; page furniture stripped and near-duplicates removed if enabled (strip_page_furniture,
+    dedup_chunks, vectorstore/dedup.py).
+    With parent retrieval the chunks are child spans, their parents go to parent_store."""
+    furniture = {}
+    if settings.strip_page_furniture:
+        # before chunking: the semantic chunker embeds every sentence too
+        furniture = strip_page_furniture(documents, settings.furniture_min_fraction)
+    if settings.enable_parent_retrieval:
+        if parent_store is None:
+            raise ValueError("enable_parent_retrieval needs a parent store")
+        chunks = build_parent_child(documents, parent_store, settings)
+    else:
+        chunks = chunk_documents(documents, chunker)
+    chunks_before, removed_chars = len(chunks), 0
+    if settings.dedup_chunks != "off":
+        chunks, dedup_stats = dedup_chunks(chunks, settings.dedup_threshold, settings.minhash_perms,
+                                           merge=settings.dedup_chunks == "merge")
+        removed_chars = dedup_stats["removed_chars"]
+    print(cleanup_report(chunks_before, len(chunks), furniture, removed_chars))
+    return chunks
+
 def analyze_chunks(chunks):
     """Basic chunk analysis"""
     word_counts = [len(chunk.page_content.split()) for chunk in chunks]
@@ -52,6 +105,8 @@ def analyze_chunks(chunks):
     print(f"Min words: {min(word_counts)}")
     print(f"Max words: {max(word_counts)}")
     print(f"Sources: {len(set(chunk.metadata['source'] for chunk in chunks))}")
+    print(f"Authorities: {sorted(set(chunk.metadata.get('authority', 'Unknown') for chunk in chunks))}")
+    print(f"Sections: {len(set(chunk.metadata.get('section_heading', '') for chunk in chunks))}")
     
 def test_retrieval(embeddings, chroma_db_path):
     """Test document retrieval"""
@@ -74,15 +129,34 @@ def test_retrieval(embeddings, chroma_db_path):
 
 def main(data_dir="data/", chroma_db_path="./chroma_db"):
     print("Starting document processing...")
+    # heavy imports only when actually ingesting
+    from langchain_experimental.text_splitter import SemanticChunker
+    from rag_nakamo.llm.client import get_embeddings
+    from rag_nakamo.vectorstore.chunk_store import ChunkStore
     settings = get_settings()
-    embeddings = OpenAIEmbeddings(api_key=settings.openai_api_key, model="text-embedding-3-large")
+    embeddings = get_embeddings() # rate limited + retried, the chunker embeds every sentence
     # semantic chunker
     chunker = SemanticChunker(embeddings, breakpoint_threshold_type="percentile") #
 
     # Load and chunk pdfs
     documents = load_pdfs(data_dir)
     print(f"Loaded total of {len(documents)} pages from {data_dir}")
-    chunks = chunk_documents(documents, chunker)
+    versions = version = None
+    chunk_store_path, quantized_index_path = settings.chunk_store_path, settings.quantized_index_path
+    parent_store_path = settings.parent_store_path
+    if settings.index_root:
+        # build a new snapshot next to the live one, serving agents keep reading CURRENT
+        versions = IndexVersions(settings.index_root, keep=settings.index_keep_versions)
+        version = versions.create(data_dir=data_dir, pages=len(documents))
+        paths = versions.paths(version)
+        chroma_db_path, chunk_store_path, quantized_index_path, parent_store_path = (
+            paths["chroma_db_path"], paths["chunk_store_path"], paths["quantized_index_path"],
+            paths["parent_store_path"])
+        print(f"\nBuilding index version {version} in {versions.path(version)}")
+
+    # parent-child retrieval: parents (pages / sections) go to their own store, the chunks are children
+    parent_store = ChunkStore(parent_store_path) if settings.enable_parent_retrieval else None
+    chunks = clean_and_chunk(documents, chunker, settings, parent_store)
     
     # Show results
     analyze_chunks(chunks)
@@ -91,12 +165,38 @@ def main(data_dir="data/", chroma_db_path="./chroma_db"):
     print(chunks[0].page_content[:200] + "...")
 
     print("\n=== 1. Creating and populating vector store ===")
-    # vector store
-    vector_store = create_and_populate_vector_store(
-        chunks=chunks,
-        embeddings=embeddings,
-        chroma_db_path=chroma_db_path
-    )
+    if settings.use_chunk_store:
+        # compact: texts in the chunk store, chroma without documents
+        create_and_populate_compact_store(
+            chunks=chunks,
+            embeddings=embeddings,
+            chunk_store=ChunkStore(chunk_store_path),
+            chroma_db_path=chroma_db_path
+        )
+    else:
+        # vector store
+        vector_store = create_and_populate_vector_store(
+            chunks=chunks,
+            embeddings=embeddings,
+            chroma_db_path=chroma_db_path
+        )
+    if settings.vector_index == "quantized":
+        from rag_nakamo.vectorstore.quantized_index import build_from_chroma
+        build_from_chroma(chroma_db_path, settings.chroma_collection_name, quantized_index_path,
+                          settings.quantized_dims, settings.quantization)
+
+    if versions is not None:
+        print("\n=== Validating and activating ===")
+        check, count = chroma_smoke_check(chroma_db_path, settings.chroma_collection_name, embeddings.embed_query)
+        # raises (CURRENT untouched) when a smoke query comes back short or vectors are missing
+        manifest = versions.validate(version, check, settings.index_smoke_queries,
+                                     settings.index_smoke_min_results, expected_count=len(chunks), count=count)
+        print(f"Smoke queries: {manifest['smoke_queries']}")
+        versions.activate(version)
+        print(f"Active index version: {version}, pruned: {versions.prune()}")
+        return
+    if settings.use_chunk_store:
+        return
 
     # Test retrieval
     print("\n=== Testing retrieval ===")
@@ -0,0 +1,127 @@
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# Structured metadata extracted at ingestion, stored alongside each chunk in Chroma
+# so that RAGAgent can push filters down into the index query (`where` clause).
+
+UNKNOWN = "Unknown"
+
+# acronyms are case sensitive ("who" is an English word), full names are not
+AUTHORITY_PATTERNS = {
+    "FDA": re.compile(r"\bFDA\b|(?i:food and drug administration)"),
+    "WHO": re.compile(r"\bWHO\b|(?i:world health organi[sz]ation)"),
+}
+
+DOCUMENT_TYPES = {
+    "guidance": re.compile(r"\bguidance\b", re.IGNORECASE),
+    "policy": re.compile(r"\bpolicy\b", re.IGNORECASE),
+    "regulation": re.compile(r"\bregulations?\b", re.IGNORECASE),
+    "standard": re.compile(r"\bstandards?\b", re.IGNORECASE),
+}
+
+MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+ISSUED_DATE = re.compile(rf"issued on\s+(?:{MONTHS})\s+\d{{1,2}},\s+((?:19|20)\d{{2}})", re.IGNORECASE)
+FULL_DATE = re.compile(rf"\b(?:{MONTHS})\s+\d{{1,2}},\s+((?:19|20)\d{{2}})\b")
+COPYRIGHT_YEAR = re.compile(r"(?:©|\(c\)|copyright)\s*(?:[A-Za-z ]+)?((?:19|20)\d{2})", re.IGNORECASE)
+
+HEADING_PATTERNS = [
+    re.compile(r"^(?:SECTION|CHAPTER)\s+[A-Z0-9]+[.:]?\s+\S.{2,80}$"),  # SECTION C.  DESIGN INPUT
+    re.compile(r"^[IVX]{1,5}\.\s+[A-Z][^.]{2,80}$"),                     # II. Background
+    re.compile(r"^\d{1,2}(?:\.\d{1,2}){0,2}\.?\s+[A-Z][^.,;]{2,60}$"),  # 3.4 Regulatory tools
+]
+
+
+def detect_authority(file_path: str, text: str = "") -> str:
+    """Authority from the file name first (FDA_*.pdf, WHO_*.pdf), then from the text."""
+    name = os.path.basename(file_path)
+    for authority, pattern in AUTHORITY_PATTERNS.items():
+        if name.upper().startswith(authority + "_") or pattern.search(name):
+            return authority
+    counts = {a: len(p.findall(text)) for a, p in AUTHORITY_PATTERNS.items()}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else UNKNOWN
+
+
+def detect_document_type(file_path: str, text: str = "") -> str:
+    """Document type from the file name first, then from the first page text."""
+    name = os.path.basename(file_path).replace("_", " ")
+    for source in (name, text):
+        for doc_type, pattern in DOCUMENT_TYPES.items():
+            if pattern.search(source):
+                return doc_type
+    return UNKNOWN
+
+
+def detect_publication_year(text: str) -> int:
+    """Best effort publication year, 0 if none found."""
+    for pattern in (ISSUED_DATE, FULL_DATE, COPYRIGHT_YEAR):
+        match = pattern.search(text)
+        if match:
+            return int(match.group(1))
+    return 0
+
+
+def find_headings(text: str) -> List[str]:
+    """Return heading-like lines of a page or chunk, in order."""
+    headings = []
+    for line in text.splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        if any(pattern.match(line) for pattern in HEADING_PATTERNS):
+            headings.append(line)
+    return headings
+
+
+def extract_document_metadata(file_path: str, pages_text: Iterable[str]) -> Dict[str, Any]:
+    """Document level metadata from the first pages of a PDF."""
+    head = "\n".join(list(pages_text)[:3])
+    return {
+        "authority": detect_authority(file_path, head),
+        "document_type": detect_document_type(file_path, head),
+        "publication_year": detect_publication_year(head),
+    }
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Translate simple filters into a Chroma `where` clause.
+
+    Supported keys: authority, document_type, section_heading, source (str or list),
+    publication_year (int or list), year_min / year_max (range on publication_year).
+    Raw Chroma operators ($and, $or, ...) are passed through unchanged.
+    """
+    if not filters:
+        return None
+    if any(key.startswith("$") for key in filters):
+        return filters
+
+    clauses = []
+    for key, value in filters.items():
+        if value is None or value == []:
+            continue
+        if key == "year_min":
+            clauses.append({"publication_year": {"$gte": int(value)}})
+        elif key == "year_max":
+            clauses.append({"publication_year": {"$lte": int(value)}})
+        elif isinstance(value, (list, tuple, set)):
+            clauses.append({key: {"$in": list(value)}})
+        else:
+            clauses.append({key: value})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def filters_from_focus_areas(focus_areas: Optional[List[str]]) -> Dict[str, Any]:
+    """Map orchestrator focus areas (e.g. 'FDA', 'WHO') to metadata filters.
+    Topical focus areas (e.g. 'software') are left to the similarity search.
+    """
+    authorities = []
+    for area in focus_areas or []:
+        for authority, pattern in AUTHORITY_PATTERNS.items():
+            if pattern.search(area.upper()) and authority not in authorities:
+                authorities.append(authority)
+    # both authorities is the same as no filter
+    if not authorities or len(authorities) == len(AUTHORITY_PATTERNS):
+        return {}
+    return {"authority": authorities}
@@ -0,0 +1,54 @@
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Diversification of the retrieved candidates, before rerank / the response prompt:
+#   dedup_indices : at most N chunks per (source, page) and per source
+#   mmr_select    : maximal marginal relevance on the candidate embedding matrix,
+#                   argmax over  lambda * sim(query, d) - (1 - lambda) * max sim(d, selected)
+# The greedy loop runs k times, each step is one matrix-vector product over all candidates
+# (no per-pair Python loop, no n x n similarity matrix).
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mmr_select(query_embedding, embeddings, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Indices of `k` rows of `embeddings` in MMR order (first: most similar to the query)."""
+    candidates = _normalize(np.asarray(embeddings, dtype=np.float32))
+    n = candidates.shape[0]
+    if n == 0 or k <= 0:
+        return []
+    query_sim = candidates @ _normalize(np.asarray(query_embedding, dtype=np.float32))
+    redundancy = np.full(n, -np.inf, dtype=np.float32)  # max similarity to the selected set
+    available = np.ones(n, dtype=bool)
+    selected = [int(np.argmax(query_sim))]
+    for _ in range(min(k, n) - 1):
+        last = selected[-1]
+        available[last] = False
+        np.maximum(redundancy, candidates @ candidates[last], out=redundancy)  # one matvec per pick, not n x n
+        score = lambda_mult * query_sim - (1.0 - lambda_mult) * redundancy
+        score[~available] = -np.inf
+        selected.append(int(np.argmax(score)))
+    return selected
+
+
+def dedup_indices(metadatas: Sequence[Dict[str, Any]], max_per_page: int = 1, max_per_source: int = 0) -> List[int]:
+    """Indices kept, in input order (best first): at most max_per_page chunks per (source, page)
+    and max_per_source per source, 0 disables a limit."""
+    per_page: Dict[tuple, int] = {}
+    per_source: Dict[Any, int] = {}
+    kept = []
+    for i, metadata in enumerate(metadatas):
+        source = metadata.get("source")
+        page = (source, metadata.get("page"))
+        if max_per_page and page[1] is not None and per_page.get(page, 0) >= max_per_page:
+            continue
+        if max_per_source and per_source.get(source, 0) >= max_per_source:
+            continue
+        per_page[page] = per_page.get(page, 0) + 1
+        per_source[source] = per_source.get(source, 0) + 1
+        kept.append(i)
+    return kept
@@ -0,0 +1,143 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from rag_nakamo.compression import split_sentences
+from rag_nakamo.tokens import estimate_tokens
+from rag_nakamo.vectorstore.metadata import HEADING_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Parent-child ("small to big") retrieval. The retrieval unit and the context unit are split:
+#   parents   pages, or sections delimited by headings (find_headings patterns), stored in a
+#             ChunkStore of their own (content addressed, parent_id = chunk_id of the text)
+#   children  a few sentences (~child_chars) of one parent, embedded and indexed in Chroma with
+#             the parent's metadata plus parent_id / parent_tokens
+# RAGAgent matches the query against children, groups the hits by parent_id (a parent scores as
+# its best child) and returns the parents, best first, within parent_token_budget.
+
+MIN_PARENT_CHARS = 500  # a heading closes the current section only once it has this much text
+
+
+def _is_heading(line: str) -> bool:
+    line = re.sub(r"\s+", " ", line).strip()
+    return any(pattern.match(line) for pattern in HEADING_PATTERNS)
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Line-aligned pieces of at most max_chars (a single longer line is cut)."""
+    pieces, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        pieces.append(current)
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+def build_parents(pages, unit: str = "page", max_chars: int = 6000,
+                  min_chars: int = MIN_PARENT_CHARS):
+    """Parent Documents of loaded (and cleaned) pages. `page`: one parent per page, `section`:
+    text between headings, across pages of the same file. Parents longer than max_chars are
+    split; each keeps the metadata of the page it starts on, plus `page_end`."""
+    from langchain_core.documents import Document
+    spans: List[Tuple[str, Dict[str, Any], int]] = []  # (text, metadata of the first page, last page)
+    if unit == "page":
+        spans = [(page.page_content, page.metadata, page.metadata.get("page", 0)) for page in pages]
+    else:
+        lines: List[str] = []
+        first = None
+        last_page, source, heading = 0, None, ""
+
+        def close():
+            if first is not None and "".join(lines).strip():
+                spans.append(("".join(lines), {**first, "section_heading": heading}, last_page))
+
+        size = 0
+        for page in pages:
+            if page.metadata.get("source") != source:  # sections never cross files
+                close()
+                lines, size = [], 0
+                source, heading = page.metadata.get("source"), page.metadata.get("section_heading", "")
+            for line in page.page_content.splitlines(keepends=True):
+                if _is_heading(line):
+                    if size >= min_chars:
+                        close()
+                        lines, size = [], 0
+                    if not size:  # short sections (a table of contents) run on under the first heading
+                        heading = re.sub(r"\s+", " ", line).strip()
+                if not lines:
+                    first = page.metadata
+                lines.append(line if line.endswith("\n") else line + "\n")
+                size += len(line.strip())
+                last_page = page.metadata.get("page", 0)
+        close()
+
+    parents = []
+    for text, metadata, page_end in spans:
+        for piece in _split_long(text, max_chars):
+            parents.append(Document(page_content=piece, metadata={**metadata, "page_end": page_end}))
+    return parents
+
+
+def build_children(parents, parent_ids: List[str], child_chars: int = 400):
+    """Child Documents: sentences of each parent packed up to child_chars, with the parent's
+    metadata, `parent_id` and `parent_tokens` (what the parent costs in the context)."""
+    from langchain_core.documents import Document
+    children = []
+    for parent, parent_id in zip(parents, parent_ids):
+        metadata = {**parent.metadata, "parent_id": parent_id,
+                    "parent_tokens": estimate_tokens(parent.page_content)}
+        current = ""
+        for sentence in split_sentences(parent.page_content):
+            if current and len(current) + len(sentence) + 1 > child_chars:
+                children.append(Document(page_content=current, metadata=dict(metadata)))
+                current = ""
+            current += (" " if current else "") + sentence
+        if current:
+            children.append(Document(page_content=current, metadata=dict(metadata)))
+    return children
+
+
+def build_parent_child(pages, parent_store, settings):
+    """Parents written to parent_store, children (to be embedded) returned."""
+    parents = build_parents(pages, settings.parent_unit, settings.parent_max_chars)
+    parent_ids = parent_store.add_many(parent.page_content for parent in parents)
+    children = build_children(parents, parent_ids, settings.child_chars)
+    logger.info(f"{len(pages)} pages -> {len(parents)} parents ({settings.parent_unit}) -> {len(children)} children")
+    return children
+
+
+def select_parents(metadatas: List[Dict[str, Any]], scores: List[float], k: int,
+                   token_budget: Optional[int] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+    """(parent_id, score, metadata) of child hits in score order: one entry per parent, scored
+    by its best child (`matched_children` counts the hits), best first, at most k parents and
+    token_budget tokens. A parent that does not fit is skipped for smaller ones; the best
+    parent is always returned."""
+    grouped: Dict[str, list] = {}
+    for metadata, score in zip(metadatas, scores):
+        parent_id = metadata.get("parent_id")
+        if parent_id is None:
+            continue
+        if parent_id in grouped:
+            grouped[parent_id][2]["matched_children"] += 1
+            continue
+        grouped[parent_id] = [parent_id, score, {**metadata, "matched_children": 1}]
+    selected, used = [], 0
+    for parent_id, score, metadata in grouped.values():  # first hit of a parent is its best
+        if len(selected) >= k:
+            break
+        tokens = metadata.get("parent_tokens", 0)
+        if selected and token_budget is not None and used + tokens > token_budget:
+            continue
+        selected.append((parent_id, score, metadata))
+        used += tokens
+    return selected
@@ -0,0 +1,342 @@
+"""
+Portable export / import of a collection, so a new environment gets a built index without
+re-embedding anything.
+
+    <dir>/
+      records.parquet   id, document, metadata (JSON), one row group per export batch
+      embeddings.npy    float32 (n, dims), same row order, np.load(mmap_mode="r") reads it in place
+      manifest.json     collection, count, dims, embeddings model, collection metadata, HNSW configuration,
+                        checksums
+
+Two checksums: `files` (blake2b of both files, checked before importing a copied export) and
+`content` (order independent digest of id, text and metadata of every record, recomputed from the
+store after the import). Vectors are compared with the export instead, within VECTOR_TOLERANCE:
+Chroma normalizes the vectors of a cosine collection again on upsert, off by float32 round-off
+from the exported ones. In compact mode (use_chunk_store) texts are resolved from the
+chunk store on export and written back to it on import.
+
+    python -m rag_nakamo.vectorstore.portable export <dir>
+    python -m rag_nakamo.vectorstore.portable import <dir> [--replace]
+    python -m rag_nakamo.vectorstore.portable verify <dir>
+With INDEX_ROOT set, import goes into a new index version that is validated and activated.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2  # 1: vectors were part of the content checksum
+RECORDS = "records.parquet"
+EMBEDDINGS = "embeddings.npy"
+MANIFEST = "manifest.json"
+VECTOR_TOLERANCE = 1e-5  # max abs difference per component after an import
+
+
+class ImportVerificationError(RuntimeError):
+    pass
+
+
+def _record_digest(id_: str, text: Optional[str], metadata: Optional[Dict[str, Any]]) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    metadata = {k: v for k, v in (metadata or {}).items() if k != "chunk_id"}  # storage detail of compact mode
+    for part in (id_, text or "", json.dumps(metadata, sort_keys=True)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.digest()
+
+
+def content_checksum(digests: Dict[str, bytes]) -> str:
+    """Digest of all records, independent of the order the store returns them in."""
+    h = hashlib.blake2b(digest_size=16)
+    for id_ in sorted(digests):
+        h.update(id_.encode("utf-8"))
+        h.update(digests[id_])
+    return h.hexdigest()
+
+
+def file_checksum(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return h.hexdigest()
+            h.update(block)
+
+
+def _texts(documents, metadatas, chunk_store) -> List[Optional[str]]:
+    """Chroma documents, or the chunk store texts of compact records (documents are None there)."""
+    texts = list(documents or [None] * len(metadatas))
+    missing = [i for i, (t, m) in enumerate(zip(texts, metadatas)) if t is None and m and m.get("chunk_id")]
+    if missing and chunk_store is not None:
+        for i, text in zip(missing, chunk_store.get_many([metadatas[i]["chunk_id"] for i in missing])):
+            texts[i] = text
+    return texts
+
+
+def _iter_collection(collection, batch_size: int):
+    for offset in range(0, collection.count(), batch_size):
+        yield collection.get(limit=batch_size, offset=offset, include=["embeddings", "documents", "metadatas"])
+
+
+def export_collection(chroma_db_path: str, collection_name: str, out_dir: str, chunk_store=None,
+                      batch_size: int = 5000, embeddings_model: Optional[str] = None) -> Dict[str, Any]:
+    """Write records.parquet + embeddings.npy + manifest.json for a collection. Returns the manifest."""
+    import chromadb
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    collection = chromadb.PersistentClient(path=chroma_db_path).get_collection(collection_name)
+    total = collection.count()
+    os.makedirs(out_dir, exist_ok=True)
+    schema = pa.schema([("id", pa.string()), ("document", pa.string()), ("metadata", pa.string())])
+    digests: Dict[str, bytes] = {}
+    matrix = None
+    row = 0
+    with pq.ParquetWriter(os.path.join(out_dir, RECORDS), schema, compression="zstd") as writer:
+        for batch in _iter_collection(collection, batch_size):
+            vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(os.path.join(out_dir, EMBEDDINGS), mode="w+",
+                                                   dtype=np.float32, shape=(total, vectors.shape[1]))
+            matrix[row:row + len(vectors)] = vectors
+            texts = _texts(batch["documents"], batch["metadatas"], chunk_store)
+            for id_, text, metadata in zip(batch["ids"], texts, batch["metadatas"]):
+                digests[id_] = _record_digest(id_, text, metadata)
+            writer.write_table(pa.table({
+                "id": batch["ids"], "document": texts,
+                "metadata": [json.dumps(m or {}, sort_keys=True) for m in batch["metadatas"]],
+            }, schema=schema))
+            row += len(vectors)
+    if matrix is None:  # empty collection
+        matrix = np.lib.format.open_memmap(os.path.join(out_dir, EMBEDDINGS), mode="w+", dtype=np.float32,
+                                           shape=(0, 0))
+    matrix.flush()
+    dims = matrix.shape[1]
+    del matrix
+    if row != total:
+        raise RuntimeError(f"Collection changed during export: {row} records read, {total} expected")
+
+    # the effective HNSW parameters: the hnsw:* metadata keep their creation-time values, a search_ef
+    # changed afterwards (set_search_ef) is only in the configuration
+    hnsw = (getattr(collection, "configuration_json", None) or {}).get("hnsw")
+    metadata = {k: v for k, v in (collection.metadata or {}).items() if not (hnsw and k.startswith("hnsw:"))}
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "collection": collection_name,
+        "collection_metadata": metadata,
+        "hnsw": hnsw,
+        "embeddings_model": embeddings_model,
+        "count": total,
+        "dims": dims,
+        "exported": time.time(),
+        "checksums": {
+            "content": content_checksum(digests),
+            "files": {name: file_checksum(os.path.join(out_dir, name)) for name in (RECORDS, EMBEDDINGS)},
+        },
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Exported {total} records x {dims} dims from {collection_name} to {out_dir} "
+                f"in {time.perf_counter() - start:.1f}s")
+    return manifest
+
+
+def read_manifest(export_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(export_dir, MANIFEST)) as f:
+        return json.load(f)
+
+
+def verify_files(export_dir: str) -> Dict[str, Any]:
+    """Check the export files against the manifest (a truncated or corrupted copy)."""
+    manifest = read_manifest(export_dir)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ImportVerificationError(f"Unsupported export format {manifest.get('format_version')}")
+    for name, expected in manifest["checksums"]["files"].items():
+        actual = file_checksum(os.path.join(export_dir, name))
+        if actual != expected:
+            raise ImportVerificationError(f"{name}: checksum {actual}, manifest has {expected}")
+    return manifest
+
+
+def load_export(export_dir: str):
+    """(table, embeddings) without copying: the Parquet file is memory mapped, the matrix mmapped."""
+    import pyarrow.parquet as pq
+    table = pq.read_table(os.path.join(export_dir, RECORDS), memory_map=True)
+    embeddings = np.load(os.path.join(export_dir, EMBEDDINGS), mmap_mode="r")
+    return table, embeddings
+
+
+def store_checksum(collection, chunk_store=None, batch_size: int = 5000) -> str:
+    """content checksum recomputed from a collection (after an import)."""
+    digests: Dict[str, bytes] = {}
+    for offset in range(0, collection.count(), batch_size):
+        batch = collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+        texts = _texts(batch["documents"], batch["metadatas"], chunk_store)
+        for id_, text, metadata in zip(batch["ids"], texts, batch["metadatas"]):
+            digests[id_] = _record_digest(id_, text, metadata)
+    return content_checksum(digests)
+
+
+def max_vector_error(collection, ids: List[str], embeddings, batch_size: int = 5000) -> float:
+    """Largest difference between the stored vectors and the exported ones (rows in `ids` order)."""
+    error = 0.0
+    for lo in range(0, len(ids), batch_size):
+        batch = collection.get(ids=ids[lo:lo + batch_size], include=["embeddings"])
+        rows = {id_: i for i, id_ in enumerate(batch["ids"])}
+        if len(rows) != len(ids[lo:lo + batch_size]):
+            return float("inf")  # missing records
+        stored = np.asarray(batch["embeddings"], dtype=np.float32)[[rows[id_] for id_ in ids[lo:lo + batch_size]]]
+        error = max(error, float(np.abs(stored - np.asarray(embeddings[lo:lo + batch_size], dtype=np.float32)).max(
+            initial=0.0)))
+    return error
+
+
+def import_collection(export_dir: str, chroma_db_path: str, collection_name: Optional[str] = None,
+                      chunk_store=None, batch_size: int = 5000, replace: bool = False,
+                      verify: bool = True) -> Dict[str, Any]:
+    """Bulk upsert an export into a fresh collection, then check count, content checksum and vectors.
+    With a chunk store the texts go there and Chroma gets `chunk_id` (compact mode)."""
+    import chromadb
+
+    start = time.perf_counter()
+    manifest = verify_files(export_dir) if verify else read_manifest(export_dir)
+    table, embeddings = load_export(export_dir)
+    if table.num_rows != manifest["count"] or len(embeddings) != manifest["count"]:
+        raise ImportVerificationError(f"Export has {table.num_rows} records / {len(embeddings)} vectors, "
+                                      f"manifest says {manifest['count']}")
+    name = collection_name or manifest["collection"]
+    client = chromadb.PersistentClient(path=chroma_db_path)
+    if replace:
+        try:
+            client.delete_collection(name)
+        except Exception:  # did not exist
+            pass
+    from rag_nakamo.vectorstore.chroma_manager import hnsw_metadata
+    # the HNSW parameters of the exported collection; exports without any get the configured ones
+    if manifest.get("hnsw"):
+        collection = client.get_or_create_collection(name, metadata=manifest["collection_metadata"] or None,
+                                                     configuration={"hnsw": manifest["hnsw"]})
+    else:  # exported before the configuration was recorded: HNSW parameters in the metadata
+        collection = client.get_or_create_collection(name, metadata=manifest["collection_metadata"] or hnsw_metadata())
+    if collection.count():
+        raise ImportVerificationError(f"Collection {name} in {chroma_db_path} is not empty (use replace)")
+
+    batch_size = min(batch_size, client.get_max_batch_size())
+    ids = table.column("id").to_pylist()
+    documents = table.column("document").to_pylist()
+    metadatas = [json.loads(m) for m in table.column("metadata").to_pylist()]
+    for lo in range(0, len(ids), batch_size):
+        hi = lo + batch_size
+        batch_meta = metadatas[lo:hi]
+        vectors = np.asarray(embeddings[lo:hi], dtype=np.float32)  # reads just this slice of the file
+        if chunk_store is not None:
+            texts = documents[lo:hi]
+            cids = iter(chunk_store.add_many([t for t in texts if t is not None]))
+            for metadata, text in zip(batch_meta, texts):
+                if text is not None:
+                    metadata["chunk_id"] = next(cids)  # content address, the same on every machine
+            collection.upsert(ids=ids[lo:hi], embeddings=vectors, metadatas=batch_meta)
+        else:
+            collection.upsert(ids=ids[lo:hi], embeddings=vectors, metadatas=batch_meta, documents=documents[lo:hi])
+
+    count = collection.count()
+    result = {"count": count, "seconds": round(time.perf_counter() - start, 2), "checksum": None,
+              "max_vector_error": None}
+    if count != manifest["count"]:
+        raise ImportVerificationError(f"Imported {count} records, manifest says {manifest['count']}")
+    if verify:
+        result["checksum"] = store_checksum(collection, chunk_store, batch_size)
+        if result["checksum"] != manifest["checksums"]["content"]:
+            raise ImportVerificationError(f"Content checksum {result['checksum']} after import, "
+                                          f"export has {manifest['checksums']['content']}")
+        result["max_vector_error"] = max_vector_error(collection, ids, embeddings, batch_size)
+        if result["max_vector_error"] > VECTOR_TOLERANCE:
+            raise ImportVerificationError(f"Vectors differ from the export by up to {result['max_vector_error']}")
+    logger.info(f"Imported {count} records into {name} at {chroma_db_path} in {time.perf_counter() - start:.1f}s")
+    return result
+
+
+def self_retrieval_check(chroma_db_path: str, collection_name: str, export_dir: str, samples: int = 5):
+    """(check, queries) for IndexVersions.validate without an embeddings API: exported vectors
+    are used as queries and must come back at distance ~0 (their own record, or an identical one)."""
+    import chromadb
+    collection = chromadb.PersistentClient(path=chroma_db_path).get_collection(collection_name)
+    table, embeddings = load_export(export_dir)
+    ids = table.column("id").to_pylist()
+    rows = {ids[i]: i for i in np.linspace(0, len(ids) - 1, min(samples, len(ids)), dtype=int)} if ids else {}
+
+    def check(id_: str) -> int:
+        res = collection.query(query_embeddings=[np.asarray(embeddings[rows[id_]], dtype=np.float32)], n_results=1,
+                               include=["distances"])
+        return int(bool(res["distances"][0]) and abs(res["distances"][0][0]) < 1e-3)
+
+    return check, list(rows)
+
+
+def main():
+    from rag_nakamo.settings import get_settings
+    from rag_nakamo.vectorstore.chunk_store import ChunkStore
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Export / import a collection with its embeddings")
+    parser.add_argument("command", choices=["export", "import", "verify"])
+    parser.add_argument("dir")
+    parser.add_argument("--chroma-db-path", help="default: CURRENT index version, else CHROMA_DB_PATH")
+    parser.add_argument("--collection", default=settings.chroma_collection_name)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--replace", action="store_true", help="import over an existing collection")
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.log_level)
+
+    from rag_nakamo.vectorstore.versions import IndexVersions
+    versions = IndexVersions(settings.index_root, keep=settings.index_keep_versions) if settings.index_root else None
+    chroma_db_path, chunk_store_path = settings.chroma_db_path, settings.chunk_store_path
+    if args.command == "verify":
+        manifest = verify_files(args.dir)
+        print(f"OK: {manifest['count']} records x {manifest['dims']} dims, model {manifest['embeddings_model']}")
+        return
+    if args.command == "export":
+        if versions is not None and versions.current() and not args.chroma_db_path:
+            paths = versions.paths(versions.current())
+            chroma_db_path, chunk_store_path = paths["chroma_db_path"], paths["chunk_store_path"]
+        store = ChunkStore(chunk_store_path) if settings.use_chunk_store else None
+        manifest = export_collection(args.chroma_db_path or chroma_db_path, args.collection, args.dir,
+                                     chunk_store=store, batch_size=args.batch_size,
+                                     embeddings_model=settings.embeddings_model)
+        print(f"Exported {manifest['count']} records, content checksum {manifest['checksums']['content']}")
+        return
+
+    manifest = read_manifest(args.dir)
+    if manifest.get("embeddings_model") not in (None, settings.embeddings_model):
+        logger.warning(f"Export was embedded with {manifest['embeddings_model']}, queries will use "
+                       f"{settings.embeddings_model}")
+    version = None
+    if versions is not None and not args.chroma_db_path:
+        version = versions.create(source="import", export=os.path.abspath(args.dir))
+        paths = versions.paths(version)
+        chroma_db_path, chunk_store_path = paths["chroma_db_path"], paths["chunk_store_path"]
+    store = ChunkStore(chunk_store_path) if settings.use_chunk_store else None
+    result = import_collection(args.dir, args.chroma_db_path or chroma_db_path, args.collection, chunk_store=store,
+                               batch_size=args.batch_size, replace=args.replace)
+    print(f"Imported {result['count']} records in {result['seconds']}s, checksum {result['checksum']} OK")
+    if version is not None:
+        if settings.vector_index == "quantized":
+            from rag_nakamo.vectorstore.quantized_index import build_from_chroma
+            build_from_chroma(chroma_db_path, args.collection, paths["quantized_index_path"],
+                              settings.quantized_dims, settings.quantization)
+        check, queries = self_retrieval_check(chroma_db_path, args.collection, args.dir)
+        versions.validate(version, check, queries, expected_count=manifest["count"], count=result["count"])
+        versions.activate(version)
+        print(f"Active index version: {version}, pruned: {versions.prune()}")
+
+
+if __name__ == "__main__":
+    main()
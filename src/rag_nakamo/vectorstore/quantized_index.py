@@ -0,0 +1,160 @@
+"""
+Compact first-stage vector index with full-precision rescoring.
+
+    first stage : embeddings truncated to `dims` (Matryoshka: text-embedding-3 vectors keep
+                  most of their information in the leading dimensions), renormalized, and
+                  stored as float32, int8 (per-dimension scale) or binary (sign bits),
+                  searched exhaustively in memory
+    rescoring   : the top `k * oversample` candidates are rescored with the full-precision
+                  vectors, memory-mapped from disk (only those rows are read)
+
+Files in `path`: first_stage.npy, full.npy (float32, normalized), scale.npy (int8 only),
+meta.json (ids, metadatas, config). No chunk texts: hits carry the Chroma ids, texts are read
+from the chunk store or from Chroma for the returned hits only.
+Build from the Chroma collection:
+    python -m rag_nakamo.vectorstore.quantized_index build --dims 512 --quantization int8
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ("none", "int8", "binary")
+BLOCK_ROWS = 16384  # int8 rows upcast per matmul block, bounds the temporary
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_rows(bits: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[bits].sum(axis=1, dtype=np.int32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class QuantizedIndex:
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.ids: List[str] = meta["ids"]
+        self.metadatas: List[Dict[str, Any]] = meta["metadatas"]
+        self.dims: int = meta["dims"]
+        self.quantization: str = meta["quantization"]
+        self.first_stage = np.load(os.path.join(path, "first_stage.npy"))
+        self.full = np.load(os.path.join(path, "full.npy"), mmap_mode="r")
+        self.scale = np.load(os.path.join(path, "scale.npy")) if self.quantization == "int8" else None
+
+    @staticmethod
+    def build(path: str, ids: Sequence[str], embeddings, metadatas: Sequence[Dict[str, Any]],
+              dims: int = 512, quantization: str = "int8") -> "QuantizedIndex":
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {QUANTIZATIONS}")
+        os.makedirs(path, exist_ok=True)
+        full = np.asarray(embeddings, dtype=np.float32)
+        if full.size == 0:  # empty collection: an empty index, searches return no hits
+            full = full.reshape(0, full.shape[1] if full.ndim == 2 else max(dims, 0))
+        full = _normalize(full)
+        dims = dims if 0 < dims < full.shape[1] else full.shape[1]
+        truncated = _normalize(full[:, :dims])
+        if quantization == "int8":
+            scale = np.maximum(np.abs(truncated).max(axis=0, initial=0.0), 1e-12) / 127.0
+            first_stage = np.round(truncated / scale).astype(np.int8)
+            np.save(os.path.join(path, "scale.npy"), scale.astype(np.float32))
+        elif quantization == "binary":
+            first_stage = np.packbits(truncated > 0, axis=1)
+        else:
+            first_stage = truncated
+        np.save(os.path.join(path, "first_stage.npy"), first_stage)
+        np.save(os.path.join(path, "full.npy"), full)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "ids": list(ids),
+                "metadatas": [dict(m or {}) for m in metadatas],
+                "dims": dims,
+                "quantization": quantization,
+            }, f)
+        logger.info(f"Quantized index: {len(ids)} vectors, {dims} dims, {quantization} -> {path}")
+        return QuantizedIndex(path)
+
+    def _first_stage_scores(self, query: np.ndarray) -> np.ndarray:
+        q = _normalize(query[: self.dims])
+        if self.quantization == "binary":
+            # hamming similarity: matching sign bits
+            q_bits = np.packbits(q > 0)
+            return -_popcount_rows(np.bitwise_xor(self.first_stage, q_bits)).astype(np.float32)
+        if self.quantization == "int8":
+            # dequantize into the query instead of the matrix: int8 matrix x (scale * q)
+            qs = (q * self.scale).astype(np.float32)
+            return np.concatenate([
+                self.first_stage[i:i + BLOCK_ROWS].astype(np.float32) @ qs
+                for i in range(0, self.first_stage.shape[0], BLOCK_ROWS)
+            ])
+        return self.first_stage @ q
+
+    def search(self, query_embedding, k: int = 5, oversample: int = 4):
+        """Top-k (index, cosine score) pairs, best first."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        n = self.first_stage.shape[0]
+        if n == 0 or k <= 0:
+            return []
+        candidates = min(n, max(k, k * oversample))
+        scores = self._first_stage_scores(query)
+        top = np.argpartition(-scores, candidates - 1)[:candidates] if candidates < n else np.arange(n)
+        top.sort()  # ascending rows: sequential reads from the memory-mapped full vectors
+        exact = np.asarray(self.full[top]) @ _normalize(query)
+        order = np.argsort(-exact)[:k]
+        return [(int(top[i]), float(exact[i])) for i in order]
+
+    def nbytes(self) -> Dict[str, int]:
+        sizes = {name: os.path.getsize(os.path.join(self.path, name))
+                 for name in ("first_stage.npy", "full.npy", "scale.npy", "meta.json")
+                 if os.path.exists(os.path.join(self.path, name))}
+        sizes["in_memory"] = self.first_stage.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+        return sizes
+
+
+def build_from_chroma(chroma_db_path: str, collection_name: str, path: str, dims: int, quantization: str,
+                      batch_size: int = 1000) -> QuantizedIndex:
+    """Export the collection (ids, embeddings, metadatas) into a QuantizedIndex."""
+    import chromadb
+    collection = chromadb.PersistentClient(path=chroma_db_path).get_collection(collection_name)
+    ids, embeddings, metadatas = [], [], []
+    total = collection.count()
+    for offset in range(0, total, batch_size):
+        batch = collection.get(limit=batch_size, offset=offset, include=["embeddings", "metadatas"])
+        ids += batch["ids"]
+        embeddings.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        metadatas += batch["metadatas"]
+    if not embeddings:
+        logger.warning(f"Collection {collection_name} is empty, the quantized index will return no hits")
+    return QuantizedIndex.build(path, ids, np.concatenate(embeddings) if embeddings else np.zeros((0, dims)),
+                                metadatas, dims=dims, quantization=quantization)
+
+
+def main():
+    from rag_nakamo.settings import get_settings
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Build the quantized first-stage index from Chroma")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--dims", type=int, default=settings.quantized_dims)
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=settings.quantization)
+    parser.add_argument("--path", default=settings.quantized_index_path)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    index = build_from_chroma(settings.chroma_db_path, settings.chroma_collection_name, args.path,
+                              args.dims, args.quantization)
+    print(f"Built {len(index.ids)} vectors in {time.perf_counter() - start:.1f}s: {index.nbytes()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Versioned index snapshots with an atomic pointer.
+
+    <root>/
+      CURRENT            name of the active version (replaced atomically, never edited in place)
+      HISTORY            activations, one per line, oldest first; "<version> rollback" for a
+                         rollback, which undoes the activation it rolls back (rollback, retention)
+      v20250101-120000-ab12/
+        chroma_db/  chunk_store/  quantized_index/  parent_store/  manifest.json
+
+Ingestion builds a new version directory, validates it with smoke queries and only then
+flips CURRENT; running RAGAgents notice the new pointer on their next query and switch
+after opening the new version in the background. Queries never see a half-built index,
+and the previous versions stay on disk for rollback until pruned.
+Activate / roll back / prune from the command line:
+    python -m rag_nakamo.vectorstore.versions list|activate <version>|rollback|prune
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+POINTER = "CURRENT"
+HISTORY = "HISTORY"
+ROLLBACK = "rollback"  # marker of a HISTORY line written by rollback()
+MANIFEST = "manifest.json"
+
+
+class IndexValidationError(RuntimeError):
+    pass
+
+
+class IndexVersions:
+    def __init__(self, root: str, keep: int = 3):
+        self.root = root
+        self.keep = keep
+
+    def path(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def paths(self, version: str) -> Dict[str, str]:
+        base = self.path(version)
+        return {
+            "chroma_db_path": os.path.join(base, "chroma_db"),
+            "chunk_store_path": os.path.join(base, "chunk_store"),
+            "quantized_index_path": os.path.join(base, "quantized_index"),
+            "parent_store_path": os.path.join(base, "parent_store"),
+        }
+
+    def current(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def pointer_stamp(self):
+        """Cheap change detection for readers: (inode, mtime) of the pointer file."""
+        try:
+            st = os.stat(os.path.join(self.root, POINTER))
+            return st.st_ino, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isfile(os.path.join(self.root, d, MANIFEST)))
+
+    def _history_entries(self) -> List[List[str]]:
+        try:
+            with open(os.path.join(self.root, HISTORY)) as f:
+                return [line.split() for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def history(self) -> List[str]:
+        """Activated versions, oldest first, rollbacks included."""
+        return [entry[0] for entry in self._history_entries()]
+
+    def stack(self) -> List[str]:
+        """Versions a rollback walks back through, current last: activations push, a rollback
+        pops back to its target, so repeated rollbacks keep going back."""
+        stack: List[str] = []
+        for entry in self._history_entries():
+            version = entry[0]
+            if ROLLBACK in entry[1:]:
+                stack = stack[:-1]
+                while stack and stack[-1] != version:
+                    stack.pop()
+                if not stack:
+                    stack.append(version)
+            else:
+                stack.append(version)
+        return stack
+
+    def manifest(self, version: str) -> Dict[str, Any]:
+        with open(os.path.join(self.path(version), MANIFEST)) as f:
+            return json.load(f)
+
+    def _write_manifest(self, version: str, manifest: Dict[str, Any]):
+        self._atomic_write(os.path.join(self.path(version), MANIFEST), json.dumps(manifest, indent=2))
+
+    def create(self, **info) -> str:
+        """New empty version directory, named so that versions sort by creation time."""
+        version = f"v{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:4]}"
+        os.makedirs(self.path(version))
+        self._write_manifest(version, {"version": version, "created": time.time(), "status": "building", **info})
+        return version
+
+    def validate(self, version: str, check: Callable[[str], int], queries: List[str], min_results: int = 1,
+                 expected_count: Optional[int] = None, count: Optional[int] = None) -> Dict[str, Any]:
+        """Run smoke queries (`check(query)` -> number of results) against a built version.
+        Raises IndexValidationError, and marks the version failed, when a query comes back short
+        or the collection size is not the expected one."""
+        manifest = self.manifest(version)
+        results = {query: check(query) for query in queries}
+        problems = [f"{query!r}: {n} results" for query, n in results.items() if n < min_results]
+        if expected_count is not None and count != expected_count:
+            problems.append(f"collection has {count} vectors, expected {expected_count}")
+        manifest.update({"smoke_queries": results, "count": count,
+                         "status": "failed" if problems else "validated", "problems": problems})
+        self._write_manifest(version, manifest)
+        if problems:
+            raise IndexValidationError(f"Index version {version} failed validation: {'; '.join(problems)}")
+        return manifest
+
+    def activate(self, version: str, force: bool = False, rollback: bool = False):
+        """Atomically point CURRENT at a validated version."""
+        manifest = self.manifest(version)
+        if manifest.get("status") not in ("validated", "active") and not force:
+            raise IndexValidationError(f"Index version {version} is {manifest.get('status')}, not validated")
+        previous = self.current()
+        self._atomic_write(os.path.join(self.root, POINTER), version)
+        with open(os.path.join(self.root, HISTORY), "a") as f:
+            f.write(f"{version} {ROLLBACK}\n" if rollback else version + "\n")
+        manifest.update({"status": "active", "activated": time.time()})
+        self._write_manifest(version, manifest)
+        logger.info(f"Index version {previous} -> {version}")
+
+    def rollback(self) -> str:
+        """Re-activate the version active before the current one (still on disk); called again,
+        the one before that."""
+        current, available = self.current(), set(self.versions())
+        previous = [v for v in self.stack()[:-1] if v != current and v in available]
+        if not previous:
+            raise IndexValidationError("No previous index version to roll back to")
+        self.activate(previous[-1], force=True, rollback=True)
+        return previous[-1]
+
+    def prune(self, min_age_s: float = 300.0) -> List[str]:
+        """Delete versions outside the retention policy: the current one and the last `keep`
+        activated versions stay, as does anything younger than min_age_s (a build in progress,
+        or a version agents may still be switching away from)."""
+        current = self.current()
+        recent = []
+        for version in reversed(self.history()):
+            if version not in recent:
+                recent.append(version)
+        retained = set(recent[: self.keep]) | set(self.stack()[-self.keep:]) | {current}  # rollback targets
+        removed = []
+        for version in self.versions():
+            if version in retained:
+                continue
+            if time.time() - os.path.getmtime(os.path.join(self.path(version), MANIFEST)) < min_age_s:
+                continue
+            shutil.rmtree(self.path(version), ignore_errors=True)
+            removed.append(version)
+        if removed:
+            logger.info(f"Pruned index versions: {removed}")
+        return removed
+
+    def _atomic_write(self, path: str, text: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)  # readers see the old or the new file, never a partial one
+
+
+def chroma_smoke_check(chroma_db_path: str, collection_name: str, embed_query: Callable[[str], List[float]],
+                       k: int = 3):
+    """(check function for IndexVersions.validate, collection count) on a built Chroma directory."""
+    import chromadb
+    collection = chromadb.PersistentClient(path=chroma_db_path).get_collection(collection_name)
+
+    def check(query: str) -> int:
+        res = collection.query(query_embeddings=[embed_query(query)], n_results=k, include=["distances"])
+        return len(res["ids"][0])
+
+    return check, collection.count()
+
+
+def main():
+    from rag_nakamo.settings import get_settings
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Manage versioned index snapshots")
+    parser.add_argument("command", choices=["list", "activate", "rollback", "prune"])
+    parser.add_argument("version", nargs="?")
+    parser.add_argument("--root", default=settings.index_root)
+    parser.add_argument("--force", action="store_true", help="activate a version that was not validated")
+    args = parser.parse_args()
+    if not args.root:
+        parser.error("set INDEX_ROOT or pass --root")
+    versions = IndexVersions(args.root, keep=settings.index_keep_versions)
+    if args.command == "list":
+        current = versions.current()
+        for version in versions.versions():
+            manifest = versions.manifest(version)
+            print(f"{'*' if version == current else ' '} {version} {manifest.get('status')} count={manifest.get('count')}")
+    elif args.command == "activate":
+        if not args.version:
+            parser.error("activate needs a version (see list)")
+        versions.activate(args.version, force=args.force)
+    elif args.command == "rollback":
+        print(f"Active: {versions.rollback()}")
+    else:
+        print(f"Removed: {versions.prune()}")
+
+
+if __name__ == "__main__":
+    main()
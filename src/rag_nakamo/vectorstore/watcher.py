@@ -0,0 +1,401 @@
+"""
+Ingestion daemon: watches the document directory and re-indexes only what changed.
+
+    events    : watchdog (inotify on Linux) when installed, else a polling scan of the directory
+    debounce  : a file is processed once it has been quiet for watch_debounce_s (copies, bursts of saves)
+    indexing  : files whose content hash changed are loaded, cleaned, chunked and embedded; their old
+                records are deleted and the new ones upserted under ids <file hash>-<n>; removed
+                files are deleted from the collection
+    publish   : with index_root (vectorstore/versions.py) the daemon keeps a staging copy of the index,
+                applies each batch there, then copies it into a new version, smoke-tests it and flips
+                CURRENT, so serving agents switch on their next query. Chroma keeps its index in the
+                memory of each process, writes from another process are not seen by a running agent.
+                Without index_root the collection at chroma_db_path is updated in place, and with
+                vector_index="quantized" the quantized index is rebuilt after each batch (single
+                process setups; running agents elsewhere need a restart).
+
+Run:  python -m rag_nakamo.vectorstore.watcher [--dir data/] [--once]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from rag_nakamo.settings import get_settings
+from rag_nakamo.vectorstore.extractors import file_hash
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "ingest_state.json"
+EXTENSIONS = (".pdf",)
+# watchdog also reports opened / closed_no_write, which the indexer's own reads would trigger
+CHANGE_EVENTS = {"created", "modified", "moved", "deleted", "closed"}
+
+
+class DocumentWatcher:
+    def __init__(self, directory: str, indexer: "IncrementalIndexer", debounce_s: float = 5.0,
+                 poll_s: float = 10.0, use_polling: bool = False):
+        self.directory = directory
+        self.indexer = indexer
+        self.debounce_s = debounce_s
+        self.poll_s = poll_s
+        self.use_polling = use_polling
+        self._pending: Dict[str, float] = {}  # path -> time of the last event
+        self._first_event: Dict[str, float] = {}  # path -> time of the first event since it was indexed
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._observer = None
+        self.mode = None
+
+    def path(self, name: str) -> str:
+        # same form as load_pdfs' glob(data_dir + "*.pdf"), i.e. the `file_path` stored with the chunks
+        return os.path.join(self.directory, os.path.basename(name))
+
+    def touch(self, path: str):
+        if not path.lower().endswith(EXTENSIONS):
+            return
+        path = self.path(path)
+        now = time.monotonic()
+        with self._lock:
+            self._pending[path] = now
+            self._first_event.setdefault(path, now)
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def scan(self):
+        """Queue every file whose content differs from the indexed state, and deleted files."""
+        current = {self.path(name) for name in os.listdir(self.directory) if name.lower().endswith(EXTENSIONS)}
+        for path in current | set(self.indexer.files):
+            if path not in current or self.indexer.is_changed(path):
+                self.touch(path)
+
+    def start(self):
+        try:
+            if self.use_polling:
+                raise ImportError("polling requested")
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+
+            watcher = self
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    if event.is_directory or event.event_type not in CHANGE_EVENTS:
+                        return
+                    watcher.touch(event.src_path)
+                    if getattr(event, "dest_path", None):  # moved / renamed into the directory
+                        watcher.touch(event.dest_path)
+
+            self._observer = Observer()
+            self._observer.schedule(Handler(), self.directory, recursive=False)
+            self._observer.start()
+            self.mode = "inotify"
+        except (ImportError, OSError) as e:  # no watchdog, inotify limits, network file systems
+            self.mode = "polling"
+            threading.Thread(target=self._poll, name="watch-poll", daemon=True).start()
+            logger.info(f"Watching {self.directory} by polling every {self.poll_s}s ({e})")
+        else:
+            logger.info(f"Watching {self.directory} with {type(self._observer).__name__}")
+        self.scan()  # files changed while the daemon was down
+
+    def _snapshot(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for name in os.listdir(self.directory):
+            if name.lower().endswith(EXTENSIONS):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                snapshot[self.path(name)] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _poll(self):
+        seen = self._snapshot()  # the startup scan covers what happened before
+        while not self._stop.wait(self.poll_s):
+            current = self._snapshot()
+            for path in set(seen) | set(current):
+                if seen.get(path) != current.get(path):
+                    self.touch(path)
+            seen = current
+
+    def ready(self) -> List[str]:
+        """Paths quiet for debounce_s, removed from the pending set."""
+        now = time.monotonic()
+        with self._lock:
+            paths = [p for p, t in self._pending.items() if now - t >= self.debounce_s]
+            for path in paths:
+                del self._pending[path]
+        return paths
+
+    def run(self, once: bool = False, tick_s: float = 0.5):
+        self.start()
+        while not self._stop.is_set():
+            paths = self.ready()
+            if paths:
+                with self._lock:
+                    first = {p: self._first_event.pop(p, time.monotonic()) for p in paths}
+                self.indexer.process(paths, first_event=min(first.values()), queue_depth=self.queue_depth())
+            elif once and not self.queue_depth():
+                break
+            self._stop.wait(tick_s)
+        self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+
+class IncrementalIndexer:
+    """Applies file changes to a collection and publishes them. `files` maps each indexed
+    path to its content hash and chunk count."""
+
+    def __init__(self, embeddings, chunker, settings=None):
+        from rag_nakamo.vectorstore.versions import IndexVersions
+        self.settings = settings or get_settings()
+        self.embeddings = embeddings
+        self.chunker = chunker
+        self.versions = None
+        if self.settings.index_root:
+            self.versions = IndexVersions(self.settings.index_root, keep=self.settings.index_keep_versions)
+            self.workdir = os.path.join(self.settings.index_root, "staging")
+            self.chroma_db_path = os.path.join(self.workdir, "chroma_db")
+            self.chunk_store_path = os.path.join(self.workdir, "chunk_store")
+            self.parent_store_path = os.path.join(self.workdir, "parent_store")
+        else:
+            self.workdir = os.path.dirname(os.path.abspath(self.settings.chroma_db_path))
+            self.chroma_db_path = self.settings.chroma_db_path
+            self.chunk_store_path = self.settings.chunk_store_path
+            self.parent_store_path = self.settings.parent_store_path
+        self.state_path = os.path.join(self.workdir, STATE_FILE)
+        self.metrics: Dict[str, Any] = {
+            "batches": 0, "files_indexed": 0, "files_deleted": 0, "files_unchanged": 0, "files_failed": 0,
+            "chunks_upserted": 0, "chunks_deleted": 0, "pages": 0, "queue_depth": 0,
+            "index_seconds": 0.0, "publish_seconds": 0.0, "last_freshness_s": None, "published_version": None,
+        }
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._open: Dict[tuple, Any] = {}  # (kind, path) -> collection / store, reused across batches
+        self._prepare()
+
+    # -- state -----------------------------------------------------------------------------------
+
+    def _prepare(self):
+        """Load the state; with versions, (re)seed staging from CURRENT when someone else
+        (a full ingestion run, a rollback) activated a version since the last publish."""
+        state = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+        current = self.versions.current() if self.versions else None
+        if self.versions is None and state is None:  # in place, first run over an existing collection
+            state = {"published_version": None, "files": self._files_from_collection()}
+            self._save(state)
+        if self.versions and (state is None or not os.path.isdir(self.chroma_db_path)
+                              or state.get("published_version") != current):
+            self.close()  # nothing may keep the files about to be replaced open
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            os.makedirs(self.workdir)
+            if current:
+                paths = self.versions.paths(current)
+                shutil.copytree(paths["chroma_db_path"], self.chroma_db_path)
+                for store in ("chunk_store_path", "parent_store_path"):
+                    if os.path.isdir(paths[store]):
+                        shutil.copytree(paths[store], getattr(self, store))
+                logger.info(f"Staging seeded from index version {current}")
+            state = {"published_version": current, "files": self._files_from_collection()}
+            self._save(state)
+        self.files = state.get("files", {})
+        self.metrics["published_version"] = state.get("published_version")
+
+    def _files_from_collection(self) -> Dict[str, Dict[str, Any]]:
+        """Indexed files and hashes from the chunk metadata, so a seeded index is not re-embedded."""
+        files: Dict[str, Dict[str, Any]] = {}
+        collection = self.collection
+        total = collection.count()
+        for offset in range(0, total, 5000):
+            for metadata in collection.get(limit=5000, offset=offset, include=["metadatas"])["metadatas"]:
+                path = metadata.get("file_path")
+                if path:
+                    entry = files.setdefault(path, {"hash": metadata.get("file_hash"), "chunks": 0})
+                    entry["chunks"] += 1
+        return files
+
+    def _save(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {"published_version": self.metrics["published_version"], "files": self.files}
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def is_changed(self, path: str) -> bool:
+        entry = self.files.get(path)
+        return entry is None or entry.get("hash") != file_hash(path)
+
+    # -- indexing --------------------------------------------------------------------------------
+
+    def _opened(self, kind: str, path: str, factory):
+        key = (kind, path)
+        if key not in self._open:
+            self._open[key] = factory()
+        return self._open[key]
+
+    @property
+    def collection(self):
+        import chromadb
+        from rag_nakamo.vectorstore.chroma_manager import hnsw_metadata
+        return self._opened("collection", self.chroma_db_path, lambda: chromadb.PersistentClient(
+            path=self.chroma_db_path).get_or_create_collection(self.settings.chroma_collection_name,
+                                                               metadata=hnsw_metadata(self.settings)))
+
+    @property
+    def chunk_store(self):
+        if not self.settings.use_chunk_store:
+            return None
+        from rag_nakamo.vectorstore.chunk_store import ChunkStore
+        return self._opened("store", self.chunk_store_path, lambda: ChunkStore(self.chunk_store_path))
+
+    @property
+    def parent_store(self):
+        if not self.settings.enable_parent_retrieval:
+            return None
+        from rag_nakamo.vectorstore.chunk_store import ChunkStore
+        return self._opened("store", self.parent_store_path, lambda: ChunkStore(self.parent_store_path))
+
+    def close(self):
+        """Close the collection's Chroma system and the stores (reopened on next use)."""
+        from rag_nakamo.vectorstore.chroma_manager import close_persistent_client
+        for (kind, path), opened in self._open.items():
+            if kind == "collection":
+                close_persistent_client(path)
+            else:
+                opened.close()
+        self._open.clear()
+
+    def process(self, paths: List[str], first_event: Optional[float] = None, queue_depth: int = 0):
+        from rag_nakamo.vectorstore.chroma_manager import upsert_chunks
+        from rag_nakamo.vectorstore.ingestion import clean_and_chunk, load_pdf
+        from rag_nakamo.vectorstore.extractors import PageCache, choose_backend
+        start = time.perf_counter()
+        collection, chunk_store, parent_store = self.collection, self.chunk_store, self.parent_store
+        cache = PageCache(self.settings.page_cache_path) if self.settings.page_cache_path else None
+        changed = 0
+        for path in sorted(paths):
+            try:
+                if not os.path.exists(path):
+                    if path in self.files:
+                        collection.delete(where={"file_path": path})
+                        self.metrics["chunks_deleted"] += self.files.pop(path)["chunks"]
+                        self.metrics["files_deleted"] += 1
+                        changed += 1
+                    continue
+                digest = file_hash(path)
+                if self.files.get(path, {}).get("hash") == digest:
+                    self.metrics["files_unchanged"] += 1
+                    continue
+                backend = choose_backend(path, self.settings.pdf_backend, self.settings.pdf_backend_overrides)
+                pages = load_pdf(path, backend=backend, cache=cache)
+                chunks = clean_and_chunk(pages, self.chunker, self.settings, parent_store)
+                ids = [f"{digest}-{i}" for i in range(len(chunks))]
+                collection.delete(where={"file_path": path})  # old version of the file, any chunk count
+                upsert_chunks(collection, chunks, self.embeddings, ids, chunk_store=chunk_store)
+                self.metrics["chunks_deleted"] += self.files.get(path, {}).get("chunks", 0)
+                self.files[path] = {"hash": digest, "chunks": len(chunks)}
+                self.metrics["chunks_upserted"] += len(chunks)
+                self.metrics["pages"] += len(pages)
+                self.metrics["files_indexed"] += 1
+                changed += 1
+                logger.info(f"Indexed {path}: {len(pages)} pages, {len(chunks)} chunks")
+            except Exception as e:  # one bad file must not stop the daemon, retried when it changes again
+                self.metrics["files_failed"] += 1
+                logger.error(f"Indexing {path} failed: {e}")
+        self.metrics["index_seconds"] += time.perf_counter() - start
+        if changed:
+            self._save()
+            self.publish(collection.count())
+        if first_event is not None:
+            self.metrics["last_freshness_s"] = round(time.monotonic() - first_event, 2)
+        self.metrics["batches"] += 1
+        self.metrics["queue_depth"] = queue_depth
+        self._write_metrics()
+        logger.info(f"Batch of {len(paths)} files in {time.perf_counter() - start:.1f}s, {changed} changed, "
+                    f"freshness {self.metrics['last_freshness_s']}s, queue {queue_depth}")
+
+    def publish(self, count: int):
+        """Staging -> new validated version -> CURRENT. In place: only the quantized index is rebuilt,
+        unfiltered searches would not see the batch otherwise."""
+        if self.versions is None:
+            if self.settings.vector_index == "quantized":
+                from rag_nakamo.vectorstore.quantized_index import build_from_chroma
+                build_from_chroma(self.chroma_db_path, self.settings.chroma_collection_name,
+                                  self.settings.quantized_index_path, self.settings.quantized_dims,
+                                  self.settings.quantization)
+            return
+        from rag_nakamo.vectorstore.versions import chroma_smoke_check
+        start = time.perf_counter()
+        version = self.versions.create(source="watcher", base=self.metrics["published_version"])
+        paths = self.versions.paths(version)
+        shutil.copytree(self.chroma_db_path, paths["chroma_db_path"])  # files only, nothing re-embedded
+        for store in ("chunk_store_path", "parent_store_path"):
+            if os.path.isdir(getattr(self, store)):
+                shutil.copytree(getattr(self, store), paths[store])
+        if self.settings.vector_index == "quantized":
+            from rag_nakamo.vectorstore.quantized_index import build_from_chroma
+            build_from_chroma(paths["chroma_db_path"], self.settings.chroma_collection_name,
+                              paths["quantized_index_path"], self.settings.quantized_dims, self.settings.quantization)
+        check, copied = chroma_smoke_check(paths["chroma_db_path"], self.settings.chroma_collection_name,
+                                           self.embeddings.embed_query)
+        self.versions.validate(version, check, self.settings.index_smoke_queries,
+                               self.settings.index_smoke_min_results, expected_count=count, count=copied)
+        self.versions.activate(version)
+        self.versions.prune()
+        self.metrics["published_version"] = version
+        self.metrics["publish_seconds"] += time.perf_counter() - start
+        self._save()
+
+    def _write_metrics(self):
+        path = self.settings.watch_metrics_path
+        if not path:
+            return
+        metrics = {**self.metrics, "time": time.time(),
+                   "chunks_per_s": round(self.metrics["chunks_upserted"] / max(self.metrics["index_seconds"], 1e-9), 2)}
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(metrics, f)
+        os.replace(tmp, path)
+
+
+def main():
+    from rag_nakamo.logger_config import setup_logging
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Watch the document directory and index changes incrementally")
+    parser.add_argument("--dir", default=settings.watch_dir)
+    parser.add_argument("--once", action="store_true", help="index pending changes and exit")
+    parser.add_argument("--polling", action="store_true", default=settings.watch_use_polling)
+    args = parser.parse_args()
+    setup_logging()
+    from langchain_experimental.text_splitter import SemanticChunker
+    from rag_nakamo.llm.client import get_embeddings
+    embeddings = get_embeddings()
+    indexer = IncrementalIndexer(embeddings, SemanticChunker(embeddings, breakpoint_threshold_type="percentile"))
+    watcher = DocumentWatcher(args.dir, indexer, settings.watch_debounce_s, settings.watch_poll_s, args.polling)
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        watcher.stop()
+    finally:
+        indexer.close()
+
+
+if __name__ == "__main__":
+    main()
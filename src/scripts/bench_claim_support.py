@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: claim support checking, legacy per-claim substring scan versus the
+indexed ClaimVerifier (lexical) and the one-matmul embedding mode.
+
+Uses page text of the PDFs in data/ as context docs, and answers built from sentences
+of those docs mixed with made-up ones. No API calls (random vectors stand in for
+embeddings, only the scoring cost is measured). Run from src/:
+    python -m scripts.bench_claim_support --docs 24 --claims 50 200 800
+"""
+import argparse
+import random
+import re
+import time
+from glob import glob
+
+import numpy as np
+
+from rag_nakamo.agents.claim_verifier import ClaimVerifier
+
+
+def legacy_check_support(claims, docs):
+    """The original resp_with_claims.ResponseAgent._check_support."""
+    doc_texts = [doc.get("content", "").lower() for doc in docs]
+    supported, unsupported = [], []
+    for claim in claims:
+        tokens = [t for t in re.findall(r"\w+", claim.lower())
+                  if len(t) > 3 and t not in {"medical", "device", "regulation", "requirement", "guidance"}][:7]
+        if not tokens:
+            unsupported.append(claim)
+            continue
+        support_count = 0
+        for token in tokens:
+            if any(token in doc_text for doc_text in doc_texts):
+                support_count += 1
+        if support_count >= max(1, len(tokens) * 0.3):
+            supported.append(claim)
+        else:
+            unsupported.append(claim)
+    return supported, unsupported
+
+
+def load_docs(n_docs):
+    from pypdf import PdfReader
+
+    pages = []
+    for pdf in sorted(glob("data/*.pdf")):
+        pages.extend(p.extract_text() or "" for p in PdfReader(pdf).pages)
+    pages = [p for p in pages if len(p) > 500]
+    random.Random(0).shuffle(pages)
+    return [{"content": p, "source": f"doc{i}"} for i, p in enumerate(pages[:n_docs])]
+
+
+def make_claims(docs, n_claims):
+    rng = random.Random(1)
+    sentences = [s for d in docs for s in re.split(r"(?<=[.!?])\s+", d["content"]) if len(s.split()) >= 6]
+    fake = ["Quantum blockchain certification replaces premarket notification for wearable implants.",
+            "Manufacturers must submit holographic dossiers to the interstellar harmonization board."]
+    return [rng.choice(sentences) if rng.random() < 0.8 else rng.choice(fake) for _ in range(n_claims)]
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=24)
+    parser.add_argument("--claims", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--dim", type=int, default=3072)
+    args = parser.parse_args()
+
+    docs = load_docs(args.docs)
+    print(f"{len(docs)} context docs, {sum(len(d['content']) for d in docs)} chars")
+    lexical = ClaimVerifier("lexical")
+    pool = np.random.default_rng(0).standard_normal((max(args.claims) + len(docs), args.dim), dtype=np.float32)
+    embedding = ClaimVerifier("embedding", embed_fn=lambda texts: pool[: len(texts)].copy())
+
+    print(f"{'claims':>7} | {'legacy ms':>10} | {'indexed ms':>10} | {'speedup':>7} | {'same result':>11} | {'embedding score ms':>18}")
+    for n_claims in args.claims:
+        claims = make_claims(docs, n_claims)
+        legacy_ms, legacy = best_of(lambda: legacy_check_support(claims, docs))
+        indexed_ms, indexed = best_of(lambda: lexical.check(claims, docs))
+        embed_ms, _ = best_of(lambda: embedding.check(claims, docs))
+        print(f"{n_claims:>7} | {legacy_ms:>10.2f} | {indexed_ms:>10.2f} | {legacy_ms / indexed_ms:>6.1f}x | "
+              f"{str(legacy == indexed):>11} | {embed_ms:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Extractive context compression (rag_nakamo/compression.py) on the eval questions, end to end
+through rag_nakamo.serving.Pipeline (SimpleOrchestrator, ResponseAgent, PromptGuard).
+
+Retrieval: the data/ PDFs split into ~1200 character chunks, the top 5 per question by BM25
+(no embeddings API). The LLM is the local stub with a fixed latency plus a prefill time per
+prompt token, so latency follows the prompt size. Reported per budget: prompt tokens of the
+response and guard calls (usage stats), compression time, end-to-end latency, and what the
+context keeps: retrieved pages still cited, question terms still present.
+Run from src/:
+    python -m scripts.bench_compression --budgets 0 2000 1000 500
+"""
+import argparse
+import logging
+import os
+import statistics
+import time
+from glob import glob
+
+QUESTIONS = [
+    "What are FDA software validation requirements?",
+    "What does the FDA guidance say about design controls?",
+    "How does WHO define medical device regulation?",
+    "Which standards apply to medical device software?",
+    "What are the requirements for design validation?",
+    "Is a mobile medical application a regulated medical device?",
+    "What is the FDA policy on device software functions?",
+    "How should design reviews be documented under FDA guidance?",
+    "What is the role of risk management in FDA design input?",
+    "How does FDA regulate clinical decision support software?",
+    "What must the design history file contain under FDA guidance?",
+    "How should medical device manufacturers handle design changes?",
+]
+
+
+def load_chunks(data_dir, size=1200):
+    from rag_nakamo.compression import split_sentences
+    from rag_nakamo.vectorstore.ingestion import load_pdf
+    chunks = []
+    for path in sorted(glob(os.path.join(data_dir, "*.pdf"))):
+        for page in load_pdf(path):
+            current = ""
+            for sentence in split_sentences(page.page_content):
+                if current and len(current) + len(sentence) > size:
+                    chunks.append((current, page.metadata))
+                    current = ""
+                current += (" " if current else "") + sentence
+            if current:
+                chunks.append((current, page.metadata))
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="../data/")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 2000, 1000, 500], help="0: off")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=150.0, help="stub prefill time per 1k prompt tokens")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    from scripts.stub_llm_server import start_stub
+    server, stub, url = start_stub(latency_s=0.3, per_input_token_s=args.prefill_ms_per_1k / 1e6)
+    os.environ.update(OPENAI_API_KEY="sk-stub", OPENAI_BASE_URL=url, MODEL_PROVIDER="openai",
+                      ENABLE_SINGLEFLIGHT="false", ENABLE_RERANK="false", ANONYMIZED_TELEMETRY="False")
+    import numpy as np
+    from langchain_core.documents import Document
+    from rag_nakamo.agents.rag import RAGAgent
+    from rag_nakamo.compression import bm25_scores, terms
+    from rag_nakamo.llm.usage import get_usage_stats
+    from rag_nakamo.settings import get_settings
+    from rag_nakamo.tokens import estimate_tokens
+
+    chunks = load_chunks(args.data)
+    texts = [text for text, _ in chunks]
+
+    class LexicalRAG(RAGAgent):
+        def search_documents(self, query, filters=None, k=None):
+            top = np.argsort(-bm25_scores(query, texts))[: k or args.k]
+            return [Document(page_content=texts[i], metadata={**chunks[i][1], "score": 0.5}) for i in top]
+
+    print(f"{len(chunks)} chunks from {args.data}, top {args.k} per question, {len(QUESTIONS)} questions, "
+          f"stub prefill {args.prefill_ms_per_1k:.0f} ms / 1k tokens\n")
+    print(f"{'budget':>6} {'ctx tok':>7} {'resp tok':>8} {'guard tok':>9} {'compress ms':>11} {'p50 s':>6} "
+          f"{'mean s':>6} {'pages kept':>10} {'terms kept':>10}")
+    baseline = None
+    for budget in args.budgets:
+        os.environ.update(ENABLE_COMPRESSION=str(bool(budget)).lower(), COMPRESSION_TOKEN_BUDGET=str(budget or 1))
+        get_settings.cache_clear()
+        from rag_nakamo.serving import Pipeline
+        pipeline = Pipeline()
+        pipeline.rag_agent = LexicalRAG(name="RAG Agent", description="RAG Agent")
+        pipeline.orchestrator.register_agent("rag_agent", pipeline.rag_agent)
+        pipeline.answer(QUESTIONS[0])  # connections
+        get_usage_stats().reset()
+
+        latencies, context_tokens, compress_ms, pages_kept, terms_kept = [], [], [], [], []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            result = pipeline.answer(question)
+            latencies.append(time.perf_counter() - start)
+            context = result["context"]
+            context_tokens.append(sum(estimate_tokens(d["content"]) for d in context))
+            compress_ms.append(result["timings"].get("compress", 0.0) * 1e3)
+            retrieved = {(d["source"], d["page"]) for d in result["rag_results"]}
+            pages_kept.append(len({(d["source"], d["page"]) for d in context} & retrieved) / len(retrieved))
+            full = set(terms(" ".join(d["content"] for d in result["rag_results"]))) & set(terms(question))
+            kept = set(terms(" ".join(d["content"] for d in context))) & full
+            terms_kept.append(len(kept) / len(full) if full else 1.0)
+        usage = get_usage_stats().snapshot()
+        n = len(QUESTIONS)
+        row = (statistics.mean(context_tokens), usage["Response Agent"]["prompt_tokens"] / n,
+               usage["PromptGuard"]["prompt_tokens"] / n, statistics.median(latencies), statistics.mean(latencies))
+        baseline = baseline or row
+        print(f"{budget or 'off':>6} {row[0]:7.0f} {row[1]:8.0f} {row[2]:9.0f} {statistics.mean(compress_ms):11.2f} "
+              f"{row[3]:6.2f} {row[4]:6.2f} {statistics.mean(pages_kept):10.0%} {statistics.mean(terms_kept):10.0%}")
+        if budget:
+            print(f"{'':>6} input tokens response {1 - row[1] / baseline[1]:.0%} fewer, guard {1 - row[2] / baseline[2]:.0%} "
+                  f"fewer, mean latency {row[4] - baseline[4]:+.2f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
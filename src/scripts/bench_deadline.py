@@ -0,0 +1,58 @@
+"""
+Deadline-aware degradation: the SimpleOrchestrator + ResponseAgent + PromptGuard pipeline
+(rag_nakamo.serving.Pipeline) under shrinking per-query budgets. The LLM is the local stub
+(decode time proportional to max_tokens), retrieval and rerank are synthetic sleeps.
+Reports elapsed time and the degradations that fired. Run from src/:
+    python -m scripts.bench_deadline --budgets 0 20 10 6 2
+"""
+import argparse
+import os
+import time
+
+from scripts.stub_llm_server import start_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0, 20, 10, 6, 2], help="0: no deadline")
+    parser.add_argument("--search-s", type=float, default=0.3)
+    parser.add_argument("--rerank-s", type=float, default=2.0)
+    parser.add_argument("--per-token-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server, stub, url = start_stub(latency_s=0.2, per_token_s=args.per_token_ms / 1000)
+    os.environ.update(OPENAI_API_KEY="sk-stub", OPENAI_BASE_URL=url, MODEL_PROVIDER="openai",
+                      ENABLE_RERANK="true", ENABLE_SINGLEFLIGHT="false")
+    from langchain_core.documents import Document
+    from rag_nakamo.agents.rag import RAGAgent
+    from rag_nakamo.serving import Pipeline
+
+    class SyntheticRAG(RAGAgent):
+        def search_documents(self, query, filters=None, k=None):
+            k = k or self.settings.retrieval_top_k
+            time.sleep(args.search_s * k / self.settings.retrieval_top_k)
+            return [Document(page_content="Design validation shall ensure devices conform. " * 40,
+                             metadata={"source": f"doc{i}.pdf", "page": i, "score": 0.5}) for i in range(k)]
+
+        def rerank_documents(self, query, documents):
+            time.sleep(args.rerank_s)
+            return documents[:self.settings.rerank_top_k]
+
+    pipeline = Pipeline()
+    pipeline.rag_agent = SyntheticRAG(name="RAG Agent", description="RAG Agent")
+    pipeline.orchestrator.register_agent("rag_agent", pipeline.rag_agent)
+
+    query = "What are FDA design validation requirements?"
+    for budget in args.budgets:
+        start = time.perf_counter()
+        result = pipeline.answer(query, deadline_s=budget or None)
+        elapsed = time.perf_counter() - start
+        fired = [d["degradation"] for d in result.get("degradations", [])]
+        label = f"{budget:.0f}s" if budget else "none"
+        print(f"budget {label:>5}: elapsed {elapsed:5.2f}s, sources {len(result['rag_results'])}, "
+              f"guard {result.get('guard')}, degradations {fired or '-'}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Hedged requests against a long-tailed stub: lognormal latency (median --latency-s) plus
+rare very slow responses. Same load with and without hedging through the shared client;
+reports hedge rate, extra requests and p50/p99. No API key needed. Run from src/:
+    python -m scripts.bench_hedging --requests 600 --threads 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.stub_llm_server import start_stub
+
+
+def run(enable_hedging, args):
+    server, stub, url = start_stub(latency_s=args.latency_s, lognormal_sigma=args.sigma,
+                                   slow_rate=args.slow_rate, slow_s=args.slow_s, seed=0)
+    os.environ.update(OPENAI_API_KEY="sk-stub", OPENAI_BASE_URL=url, MODEL_PROVIDER="openai",
+                      ENABLE_HEDGING=str(enable_hedging), HEDGE_BUDGET=str(args.budget),
+                      LLM_MAX_CONCURRENCY="64", LLM_INITIAL_CONCURRENCY="32",
+                      LLM_RPM="100000", LLM_TPM="100000000")  # measure the tail, not our own limits
+    from rag_nakamo.llm.client import get_hedged_llm_client, reset_llm_client
+    from rag_nakamo.llm.hedging import quantile
+    from rag_nakamo.settings import get_settings
+    get_settings.cache_clear()
+    reset_llm_client()
+    client = get_hedged_llm_client("Response Agent")
+    messages = [{"role": "user", "content": "What are FDA software validation requirements?"}]
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        client.chat.completions.create(model="stub", messages=messages, max_tokens=50)
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(one, range(args.requests)))
+    server.shutdown()
+    label = "hedged" if enable_hedging else "baseline"
+    line = (f"{label:>8}: p50 {quantile(latencies, 0.5):.3f}s, p90 {quantile(latencies, 0.9):.3f}s, "
+            f"p99 {quantile(latencies, 0.99):.3f}s, upstream requests {stub.stats['requests']} "
+            f"(+{stub.stats['requests'] / args.requests - 1:.1%})")
+    if enable_hedging:
+        snapshot = client.chat.completions.policy.snapshot()
+        line += (f"\n{'':>10}hedge rate {snapshot['hedge_rate']:.1%}, hedge wins {snapshot['hedge_wins']}, "
+                 f"losers cancelled before dispatch {snapshot['losers_cancelled']}, trigger {snapshot['trigger_s']:.3f}s")
+    print(line)
+    return quantile(latencies, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency-s", type=float, default=0.05)
+    parser.add_argument("--sigma", type=float, default=0.6, help="lognormal sigma of the latency")
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-s", type=float, default=1.5)
+    parser.add_argument("--budget", type=float, default=0.15)
+    args = parser.parse_args()
+    base = run(False, args)
+    hedged = run(True, args)
+    print(f"p99 improvement: {1 - hedged / base:.0%}")
+
+
+if __name__ == "__main__":
+    main()
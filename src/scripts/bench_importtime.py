@@ -0,0 +1,81 @@
+"""
+Cold start benchmark: `python -X importtime` for the entry points, plus time-to-ready
+of a worker (settings + agents constructed, no reranking, no query). Run from src/:
+    python -m scripts.bench_importtime --repeat 3
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = {
+    "main.py": "import main",
+    "main2_1.py": "import main2_1",
+    "ingestion": "import rag_nakamo.vectorstore.ingestion",
+}
+
+READY = """
+import time
+start = time.perf_counter()
+from rag_nakamo.agents.new_orch import SimpleOrchestrator
+from rag_nakamo.agents.rag import RAGAgent
+from rag_nakamo.agents.response import ResponseAgent
+from rag_nakamo.security.prompt_guard import PromptGuard
+orchestrator = SimpleOrchestrator()
+orchestrator.register_agent("rag_agent", RAGAgent(name="RAG Agent", description="RAG Agent"))
+orchestrator.register_agent("response_agent", ResponseAgent(name="Response Agent", description="Response Agent"))
+guard = PromptGuard()
+print(time.perf_counter() - start)
+"""
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def importtime(statement, env):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            modules.append((int(match.group(2)), depth, match.group(4)))
+    total = sum(cumulative for cumulative, depth, _ in modules if depth == 0)
+    top = sorted((m for m in modules if m[1] == 1), reverse=True)[:5]  # heaviest direct imports
+    return total / 1e6, top
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    env = dict(os.environ, ENABLE_RERANK="false", OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-bench"))
+
+    for label, statement in ENTRY_POINTS.items():
+        try:
+            runs = [importtime(statement, env) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{label:>10}: import failed ({e})")
+            continue
+        total = statistics.median(r[0] for r in runs)
+        print(f"{label:>10}: import {total:.3f}s (median of {args.repeat})")
+        for cumulative, _, module in runs[-1][1]:
+            print(f"{'':>12}{cumulative / 1e6:.3f}s  {module}")
+
+    ready = []
+    for _ in range(args.repeat):
+        proc = subprocess.run([sys.executable, "-c", READY], capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            print(f"time-to-ready failed: {proc.stderr.strip().splitlines()[-1]}")
+            return
+        wall = float(proc.stdout.strip().splitlines()[-1])
+        ready.append(wall)
+    print(f"worker time-to-ready (no rerank): {statistics.median(ready):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
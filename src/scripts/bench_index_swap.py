@@ -0,0 +1,163 @@
+"""
+Serving during index rebuilds (vectorstore/versions.py + RAGAgent index handles), no API calls.
+
+8 threads query one RAGAgent (real Chroma, fake 64-dim embeddings) while the index is rebuilt:
+  in-place   : the old way, the collection the agent has open is dropped and re-filled in batches
+  versioned  : each rebuild goes to a new version directory, is smoke-tested, CURRENT is flipped,
+               the agent opens the new version in the background and swaps; old versions pruned
+Reported: query latency (steady / during rebuilds), errors, short result lists, results that mix
+two index builds, and how long the agent took to serve the new build after each flip.
+Run from src/:
+    python -m scripts.bench_index_swap --docs 20000 --rebuilds 3
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import zlib
+
+import numpy as np
+
+DIM = 64
+QUERIES = [f"query {i} about design controls" for i in range(50)]
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(DIM).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def fill(collection, docs, build, batch=2000, pause_s=0.0):
+    rng = np.random.default_rng(build)
+    for start in range(0, docs, batch):
+        n = min(batch, docs - start)
+        collection.add(ids=[f"{build}-{start + i}" for i in range(n)],
+                       embeddings=rng.standard_normal((n, DIM)).astype(np.float32),
+                       documents=[f"chunk {start + i} of build {build}" for i in range(n)],
+                       metadatas=[{"source": f"doc{(start + i) % 30}.pdf", "page": (start + i) % 200, "build": build}
+                                  for i in range(n)])
+        time.sleep(pause_s)
+
+
+def build(root, mode, docs, number, name):
+    import chromadb
+    from rag_nakamo.vectorstore.versions import IndexVersions, chroma_smoke_check
+    if mode == "in-place":  # into the directory the agent has open
+        client = chromadb.PersistentClient(path=os.path.join(root, "chroma_db"))
+        try:
+            client.delete_collection(name)
+        except Exception:
+            pass
+        fill(client.create_collection(name), docs, number, pause_s=0.05)
+        return
+    versions = IndexVersions(root, keep=2)
+    version = versions.create()
+    path = versions.paths(version)["chroma_db_path"]
+    fill(chromadb.PersistentClient(path=path).create_collection(name), docs, number, pause_s=0.05)
+    check, count = chroma_smoke_check(path, name, FakeEmbeddings().embed_query)
+    versions.validate(version, check, QUERIES[:3], expected_count=docs, count=count)
+    versions.activate(version)
+    versions.prune(min_age_s=0)
+
+
+def p(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] * 1e3 if len(values) > 2 else float("nan")
+
+
+def run(mode, docs, rebuilds, threads, k):
+    root = tempfile.mkdtemp()
+    os.environ.update({"OPENAI_API_KEY": "sk-bench", "ENABLE_SINGLEFLIGHT": "false", "RETRIEVAL_TOP_K": str(k)})
+    from rag_nakamo.settings import get_settings
+    get_settings.cache_clear()
+    name = get_settings().chroma_collection_name
+    if mode == "versioned":
+        os.environ["INDEX_ROOT"] = root
+    else:
+        os.environ.pop("INDEX_ROOT", None)
+        os.environ["CHROMA_DB_PATH"] = os.path.join(root, "chroma_db")
+    get_settings.cache_clear()
+
+    build(root, mode, docs, 0, name)
+    from rag_nakamo.agents.rag import RAGAgent
+    agent = RAGAgent("rag", "bench")
+    agent.__dict__["embeddings"] = FakeEmbeddings()
+    agent.process_message({"original_question": QUERIES[0]})
+
+    state = {"phase": "steady", "build": 0, "flipped_at": None}
+    samples, lock, stop = [], threading.Lock(), threading.Event()
+    switch_delays = []
+
+    def worker(i):
+        n = 0
+        while not stop.is_set():
+            q = QUERIES[(i * 7 + n) % len(QUERIES)]
+            n += 1
+            start = time.perf_counter()
+            error, builds, count = None, set(), 0
+            try:
+                results = agent.process_message({"original_question": q})
+                builds = {int(r["content"].rsplit(" ", 1)[1]) for r in results}
+                count = len(results)
+            except Exception as e:
+                error = type(e).__name__
+            latency = time.perf_counter() - start
+            with lock:
+                samples.append((state["phase"], latency, error, count, builds))
+                if state["flipped_at"] and builds == {state["build"]}:
+                    switch_delays.append(time.perf_counter() - state["flipped_at"])
+                    state["flipped_at"] = None
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    time.sleep(2)
+    for number in range(1, rebuilds + 1):
+        state["phase"] = "rebuild"
+        # ingestion runs in its own process, as python -m rag_nakamo.vectorstore.ingestion does
+        process = multiprocessing.get_context("spawn").Process(target=build, args=(root, mode, docs, number, name))
+        process.start()
+        process.join()
+        with lock:
+            state.update(phase="steady", build=number, flipped_at=time.perf_counter())
+        time.sleep(2)
+    stop.set()
+    for t in pool:
+        t.join()
+    shutil.rmtree(root, ignore_errors=True)
+
+    for phase in ("steady", "rebuild"):
+        rows = [s for s in samples if s[0] == phase]
+        ok = [s[1] for s in rows if s[2] is None]
+        errors = sum(s[2] is not None for s in rows)
+        short = sum(s[2] is None and s[3] < k for s in rows)
+        mixed = sum(len(s[4]) > 1 for s in rows)
+        print(f"{mode:>9} {phase:>8} {len(rows):7d} {p(ok, 50):7.2f} {p(ok, 99):7.2f} {errors:7d} {short:6d} {mixed:6d}")
+    if switch_delays:
+        print(f"{'':>9} new build served {statistics.mean(switch_delays) * 1e3:.0f} ms after the flip (mean of {len(switch_delays)})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--rebuilds", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--mode", choices=["in-place", "versioned"])
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(f"{args.docs} docs x {DIM} dims, {args.rebuilds} rebuilds, {args.threads} query threads, k={args.k}")
+    print(f"{'mode':>9} {'phase':>8} {'queries':>7} {'p50 ms':>7} {'p99 ms':>7} {'errors':>7} {'short':>6} {'mixed':>6}")
+    for mode in [args.mode] if args.mode else ["in-place", "versioned"]:
+        run(mode, args.docs, args.rebuilds, args.threads, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Logging overhead per query, measured in the request threads. Each synthetic query emits
+the INFO lines of a RAG request plus the rerank order payload, which used to be
+json.dumps(indent=2) at INFO on every query and is now lazy DEBUG.
+The sink is a file, optionally slowed down to mimic a blocked terminal or pipe.
+Run from src/:
+    python -m scripts.bench_logging --queries 2000 --threads 8 --sink-us 50
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rag_nakamo import logger_config
+from rag_nakamo.logger_config import LazyJson, sample_query, setup_logging
+
+logger = logging.getLogger("rag_nakamo.bench")
+
+
+class SlowFile:
+    """File sink with a fixed per-write delay (terminal / pipe back-pressure)."""
+
+    def __init__(self, path, delay_us):
+        self.f = open(path, "w")
+        self.delay = delay_us / 1e6
+
+    def write(self, s):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.f.write(s)
+
+    def flush(self):
+        self.f.flush()
+
+
+def query_before(i, changes):
+    logger.info(f"Orchestrating query: What are FDA software validation requirements? #{i}")
+    logger.info("Executing RAG search for: What are FDA software validation requirements?")
+    logger.info(f"Reranked documents: {json.dumps(changes, indent=2)}")
+    for line in ("RAG completed in 0.31s", "RAG search found 5 sources",
+                 "Generating response for: What are FDA software validation requirements?",
+                 "Formatted answer using LLM regulatory prompt", "Response generated in 2.10s"):
+        logger.info(line)
+
+
+def query_after(i, changes):
+    sample_query()
+    logger.info(f"Orchestrating query: What are FDA software validation requirements? #{i}")
+    logger.info("Executing RAG search for: What are FDA software validation requirements?")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Reranked documents: %s", LazyJson(changes))
+    for line in ("RAG completed in 0.31s", "RAG search found 5 sources",
+                 "Generating response for: What are FDA software validation requirements?",
+                 "Formatted answer using LLM regulatory prompt", "Response generated in 2.10s"):
+        logger.info(line)
+
+
+def measure(label, query_fn, args, **setup):
+    path = os.path.join(tempfile.mkdtemp(), "bench.log")
+    sink = SlowFile(path, args.sink_us)
+    setup_logging(stream=sink, queue_size=args.queue_size, **setup)
+    changes = [{"change": f"{i} -> {(i * 7) % args.docs} ({0.9 - i / 100:.4f})"} for i in range(args.docs)]
+    per_query = []
+    lock = threading.Lock()
+
+    def one(i):
+        start = time.perf_counter()
+        query_fn(i, changes)
+        with lock:
+            per_query.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(one, range(args.queries)))
+    in_threads = time.perf_counter() - start
+    dropped = getattr(logging.getLogger().handlers[0], "dropped", 0)
+    logger_config._stop_listener()  # drain the queue before reading the file
+    drained = time.perf_counter() - start
+    sink.flush()
+    per_query.sort()
+    mean = sum(per_query) / len(per_query)
+    print(f"{label:>34}: {mean * 1e6:8.1f} us/query mean, p50 {per_query[len(per_query) // 2] * 1e6:7.1f} us, "
+          f"p99 {per_query[int(0.99 * len(per_query))] * 1e6:8.1f} us, "
+          f"request threads done {in_threads:.2f}s, all written {drained:.2f}s, {os.path.getsize(path) / 1e3:.0f} kB, "
+          f"dropped {dropped}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--docs", type=int, default=20, help="candidates in the rerank payload")
+    parser.add_argument("--sink-us", type=float, default=50, help="delay per write")
+    parser.add_argument("--queue-size", type=int, default=100000, help="the burst fits: overhead, not drops")
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+    measure("before: sync color, eager rerank", query_before, args, level="INFO", fmt="color", use_queue=False)
+    measure("sync color, lazy rerank", query_after, args, level="INFO", fmt="color", use_queue=False)
+    measure("queue color, lazy rerank", query_after, args, level="INFO", fmt="color", use_queue=True)
+    measure("queue json, lazy rerank", query_after, args, level="INFO", fmt="json", use_queue=True)
+    measure("queue json, DEBUG sampled 1%", query_after, args, level="DEBUG", fmt="json", use_queue=True,
+            debug_sample_rate=0.01)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: metadata filtering pushed into the Chroma query (`where`) versus
+post-hoc filtering in Python (old `_filter_by_focus_areas` style).
+
+Synthetic collection, no API calls. Run from src/:
+    python -m scripts.bench_metadata_filters --docs 20000 --dim 256
+"""
+import argparse
+import statistics
+import time
+
+import chromadb
+import numpy as np
+
+from rag_nakamo.vectorstore.metadata import build_where
+
+AUTHORITIES = ["FDA", "WHO"]
+DOC_TYPES = ["guidance", "policy", "regulation"]
+
+
+def build_collection(n_docs: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection("bench_filters", metadata={"hnsw:space": "cosine"})
+    embeddings = rng.standard_normal((n_docs, dim), dtype=np.float32)
+    # publication_year uniform over 100 years -> year_min controls the selectivity
+    years = rng.integers(1925, 2025, size=n_docs)
+    batch = 5000
+    for start in range(0, n_docs, batch):
+        end = min(start + batch, n_docs)
+        collection.add(
+            ids=[f"chunk-{i}" for i in range(start, end)],
+            embeddings=embeddings[start:end].tolist(),
+            metadatas=[
+                {
+                    "authority": AUTHORITIES[i % len(AUTHORITIES)],
+                    "document_type": DOC_TYPES[i % len(DOC_TYPES)],
+                    "publication_year": int(years[i]),
+                }
+                for i in range(start, end)
+            ],
+        )
+    return collection, rng
+
+
+def timed_queries(fn, queries):
+    latencies, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        n = fn(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(n)
+    return statistics.median(latencies), np.percentile(latencies, 95), statistics.mean(found)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--overfetch", type=int, default=10, help="post-filter fetches k * overfetch")
+    args = parser.parse_args()
+
+    collection, rng = build_collection(args.docs, args.dim)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32).tolist()
+    k = args.k
+
+    print(f"{args.docs} docs, dim {args.dim}, k={k}, post-filter overfetch x{args.overfetch}")
+    print(f"{'selectivity':>11} | {'where p50/p95 ms':>17} {'hits':>5} | {'post p50/p95 ms':>16} {'hits':>5}")
+    for selectivity in (1.0, 0.5, 0.1, 0.02, 0.005):
+        year_min = 2025 - max(1, int(round(100 * selectivity)))
+        filters = {"year_min": year_min} if selectivity < 1.0 else {}
+        where = build_where(filters)
+
+        def pushdown(q):
+            res = collection.query(query_embeddings=[q], n_results=k, where=where, include=["metadatas", "distances"])
+            return len(res["ids"][0])
+
+        def post_filter(q):
+            res = collection.query(query_embeddings=[q], n_results=k * args.overfetch, include=["metadatas", "distances"])
+            kept = [m for m in res["metadatas"][0] if m["publication_year"] >= year_min]
+            return len(kept[:k])
+
+        p50_w, p95_w, hits_w = timed_queries(pushdown, queries)
+        p50_p, p95_p, hits_p = timed_queries(post_filter, queries)
+        print(f"{selectivity:>11.3f} | {p50_w:>8.2f}/{p95_w:<8.2f} {hits_w:>5.1f} | {p50_p:>7.2f}/{p95_p:<8.2f} {hits_p:>5.1f}")
+
+
+if __name__ == "__main__":
+    main()
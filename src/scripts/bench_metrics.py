@@ -0,0 +1,191 @@
+"""
+Cost of the pipeline metrics (rag_nakamo/metrics.py, prometheus_client), no API calls.
+
+1. per operation: counter inc, labels() + inc, histogram observe, time() block,
+   against a dict counter behind one shared threading.Lock
+2. contention: --threads threads incrementing one counter
+3. per request: serving.Pipeline (SimpleOrchestrator, RAGAgent, ResponseAgent, PromptGuard) with
+   in-process fakes for the search, the embeddings and the chat completions, so the request
+   itself takes a few hundred microseconds; metrics vs no-op metrics, overhead in µs per request
+4. scrape: exposition() after the requests
+--multiprocess runs it all in prometheus_client's multiprocess mode (mmapped files in a
+temporary PROMETHEUS_MULTIPROC_DIR, as pre-forked workers do). Run from src/:
+    python -m scripts.bench_metrics --requests 20000 --threads 8 [--multiprocess]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+INSTRUMENTED = {  # module -> metric names it imported
+    "rag_nakamo.context": ["STAGE_SECONDS"],
+    "rag_nakamo.deadline": ["DEGRADATIONS"],
+    "rag_nakamo.singleflight": ["CACHE_LOOKUPS"],
+    "rag_nakamo.llm.usage": ["LLM_TOKENS"],
+    "rag_nakamo.agents.new_orch": ["REQUESTS", "REQUESTS_IN_FLIGHT"],
+    "rag_nakamo.agents.rag": ["RETRIEVED", "STAGE_SECONDS"],
+    "rag_nakamo.agents.response": ["LLM_SECONDS"],
+    "rag_nakamo.security.prompt_guard": ["GUARD_DECISIONS", "LLM_SECONDS", "STAGE_SECONDS"],
+}
+
+
+def per_op_ns(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+class NoOpMetric:
+    """labels / inc / dec / observe / time that do nothing: the pipeline without metrics."""
+
+    def labels(self, *values):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    dec = observe = inc
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def swap_metrics(noop):
+    import importlib
+    from rag_nakamo import metrics
+    for module_name, names in INSTRUMENTED.items():
+        module = importlib.import_module(module_name)
+        for name in names:
+            setattr(module, name, NoOpMetric() if noop else getattr(metrics, name))
+
+
+class FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+
+    def create(self, **kwargs):
+        usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=150,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))], usage=usage)
+
+
+def fake_client(content):
+    return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(content)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--multiprocess", action="store_true", help="prometheus_client multiprocess mode")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    work = tempfile.mkdtemp() if args.multiprocess else None
+    if work:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = work  # before prometheus_client is imported
+    os.environ.update(OPENAI_API_KEY="sk-bench", ENABLE_RERANK="false")
+    from prometheus_client import CollectorRegistry, Counter, Histogram
+    from rag_nakamo.metrics import exposition
+
+    print(f"1. per operation (single thread, {'multiprocess' if work else 'single process'} mode)")
+    bench = CollectorRegistry()
+    counter = Counter("bench", "", ["kind"], registry=bench)
+    child = counter.labels("a")
+    histogram = Histogram("bench_seconds", "", ["stage"], registry=bench).labels("a")
+    lock, locked = threading.Lock(), {}
+
+    def locked_inc():
+        with lock:
+            locked["a"] = locked.get("a", 0) + 1
+
+    def timed_block():
+        with histogram.time():
+            pass
+
+    rows = [("counter inc (bound child)", child.inc), ("labels('a').inc()", lambda: counter.labels("a").inc()),
+            ("histogram observe", lambda: histogram.observe(0.042)), ("histogram time() block", timed_block),
+            ("locked dict counter", locked_inc)]
+    for name, fn in rows:
+        print(f"  {name:>28} {per_op_ns(fn, args.ops):7.0f} ns")
+
+    print(f"\n2. contention: {args.threads} threads x {args.ops // args.threads} increments")
+    for name, fn in (("prometheus_client counter", child.inc), ("locked dict counter", locked_inc)):
+        threads = [threading.Thread(target=lambda: [fn() for _ in range(args.ops // args.threads)])
+                   for _ in range(args.threads)]
+        start = time.perf_counter()
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        elapsed = time.perf_counter() - start
+        print(f"  {name:>28} {args.ops / elapsed / 1e6:6.2f} M incs/s")
+
+    from langchain_core.documents import Document
+    from rag_nakamo.agents.rag import RAGAgent
+    from rag_nakamo.serving import Pipeline
+    docs = [Document(page_content=f"Design validation requirement {i}.", metadata={"source": "FDA.pdf", "page": i})
+            for i in range(5)]
+
+    class FakeRAG(RAGAgent):
+        def embed_query(self, query):
+            return [0.0] * 8
+
+        def _search_docs(self, query_embedding, where, k):
+            return [Document(page_content=d.page_content, metadata={**d.metadata, "score": 0.8}) for d in docs[:k]]
+
+    pipeline = Pipeline()
+    pipeline.rag_agent = FakeRAG(name="RAG Agent", description="RAG Agent")
+    pipeline.orchestrator.register_agent("rag_agent", pipeline.rag_agent)
+    pipeline.response_agent.client = fake_client("Design validation is required [FDA.pdf, p. 1].")
+    pipeline.guard.client = fake_client(json.dumps({"prompt_harm_label": "unharmful",
+                                                    "response_refusal_label": "compliance",
+                                                    "response_harm_label": "unharmful"}))
+    questions = [f"What are the FDA design validation requirements, case {i}?" for i in range(64)]
+    for question in questions:
+        pipeline.answer(question)  # warm: imports, label children
+
+    def run(noop):
+        swap_metrics(noop)
+        samples = []
+        for i in range(args.requests):
+            start = time.perf_counter()
+            pipeline.answer(questions[i % len(questions)])
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    print(f"\n3. per request: Pipeline.answer with in-process fakes, {args.requests} requests, alternating runs")
+    off, on = [], []
+    for _ in range(3):
+        off += run(True)
+        on += run(False)
+    off_us, on_us = statistics.median(off) * 1e6, statistics.median(on) * 1e6
+    print(f"  {'no-op metrics':>28} {off_us:8.1f} µs median, {statistics.mean(off) * 1e6:8.1f} µs mean")
+    print(f"  {'metrics':>28} {on_us:8.1f} µs median, {statistics.mean(on) * 1e6:8.1f} µs mean")
+    print(f"  {'overhead':>28} {on_us - off_us:8.1f} µs per request ({(on_us - off_us) / off_us:.1%} of this "
+          f"in-process request; real requests take 0.5-5 s)")
+
+    start = time.perf_counter()
+    text = exposition().decode()
+    print(f"\n4. scrape: {len(text.splitlines())} lines in {(time.perf_counter() - start) * 1e3:.2f} ms")
+    for line in text.splitlines():
+        if line.startswith(("rag_requests_total", "rag_guard_decisions_total", "rag_cache_lookups_total",
+                            'rag_llm_tokens_total{agent="PromptGuard"', 'rag_stage_seconds_count')):
+            print(f"  {line}")
+    if work:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Diversification of the retrieved context (vectorstore/mmr.py), no API calls.
+
+1. Context: synthetic corpus where semantic chunking leaves several near-identical chunks per
+   page (neighbouring spans of one passage). Top-k by similarity versus page dedup + MMR:
+   distinct pages in the context, redundant chunks, prompt tokens, mean query similarity.
+2. Speed: vectorized mmr_select versus a per-pair Python loop (same selections).
+Run from src/:
+    python -m scripts.bench_mmr --queries 200 --k 5
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from rag_nakamo.vectorstore.mmr import dedup_indices, mmr_select
+
+CHUNK_TOKENS = 350  # typical semantic chunk
+
+
+def corpus(pages, chunks_per_page, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((pages // 10, dim)).astype(np.float32)
+    page_vecs = topics[np.arange(pages) % len(topics)] + 0.7 * rng.standard_normal((pages, dim)).astype(np.float32)
+    page_of = np.repeat(np.arange(pages), chunks_per_page)
+    chunks = page_vecs[page_of] + 0.25 * rng.standard_normal((len(page_of), dim)).astype(np.float32)
+    chunks /= np.linalg.norm(chunks, axis=1, keepdims=True)
+    metadatas = [{"source": f"doc{p // 40}.pdf", "page": int(p % 40)} for p in page_of]
+    return chunks, metadatas, page_of, topics
+
+
+def mmr_loop(query, embeddings, k, lambda_mult):
+    """Reference: greedy MMR with per-pair similarity computations."""
+    vectors = [np.asarray(e, dtype=np.float64) / np.linalg.norm(e) for e in embeddings]
+    q = np.asarray(query, dtype=np.float64) / np.linalg.norm(query)
+    selected = []
+    while len(selected) < min(k, len(vectors)):
+        best, best_score = None, -np.inf
+        for i, v in enumerate(vectors):
+            if i in selected:
+                continue
+            if selected:
+                redundancy = max(float(v @ vectors[j]) for j in selected)
+                score = lambda_mult * float(v @ q) - (1 - lambda_mult) * redundancy
+            else:
+                score = float(v @ q)
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+    return selected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--chunks-per-page", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    args = parser.parse_args()
+
+    chunks, metadatas, page_of, topics = corpus(args.pages, args.chunks_per_page, args.dim)
+    rng = np.random.default_rng(1)
+    queries = topics[rng.integers(0, len(topics), args.queries)] + 0.8 * rng.standard_normal((args.queries, args.dim))
+    queries = queries.astype(np.float32)
+
+    small_k = max(1, args.k - 2)
+    rows = {f"top-{args.k} similarity": [], f"page dedup, {args.k}": [], f"dedup + MMR, {args.k}": [],
+            f"dedup + MMR, {small_k}": []}
+    for q in queries:
+        sims = chunks @ (q / np.linalg.norm(q))
+        candidates = np.argsort(-sims)[: args.fetch_k]
+        kept = [candidates[i] for i in dedup_indices([metadatas[c] for c in candidates])]
+        mmr = [kept[i] for i in mmr_select(q, chunks[kept], args.k, args.lambda_mult)]
+        mmr_small = [kept[i] for i in mmr_select(q, chunks[kept], small_k, args.lambda_mult)]
+        for name, selected in zip(rows, (candidates[: args.k], kept[: args.k], mmr, mmr_small)):
+            pages = len({int(page_of[i]) for i in selected})
+            rows[name].append((len(selected), pages, len(selected) - pages, float(np.mean(sims[selected]))))
+
+    print(f"{args.pages * args.chunks_per_page} chunks ({args.chunks_per_page}/page), k={args.k}, "
+          f"fetch_k={args.fetch_k}, lambda={args.lambda_mult}, {CHUNK_TOKENS} tokens/chunk")
+    print(f"{'selection':>18} {'chunks':>6} {'pages':>6} {'redundant':>9} {'prompt tok':>10} {'mean sim':>8}")
+    for name, values in rows.items():
+        chunks_n, pages, redundant, sim = (statistics.mean(v[i] for v in values) for i in range(4))
+        print(f"{name:>18} {chunks_n:6.1f} {pages:6.2f} {redundant:9.2f} {chunks_n * CHUNK_TOKENS:10.0f} {sim:8.3f}")
+    print()
+
+    print(f"{'fetch_k':>8} {'loop ms':>8} {'numpy ms':>8} {'same':>5}")
+    for fetch_k in (20, 50, 100, 200):
+        embeddings = chunks[rng.integers(0, len(chunks), fetch_k)]
+        loop_t, vec_t, same = [], [], True
+        for q in queries[:20]:
+            start = time.perf_counter()
+            reference = mmr_loop(q, embeddings, args.k, args.lambda_mult)
+            loop_t.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            selected = mmr_select(q, embeddings, args.k, args.lambda_mult)
+            vec_t.append(time.perf_counter() - start)
+            same &= reference == selected
+        print(f"{fetch_k:8d} {statistics.median(loop_t) * 1e3:8.2f} {statistics.median(vec_t) * 1e3:8.3f} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: sequential versus overlapped validation in the claims ResponseAgent,
+against a fake LLM client with fixed latencies (no API calls). Run from src/:
+    python -m scripts.bench_overlap_validation --format-s 2.0 --assess-s 1.5
+"""
+import argparse
+import time
+from types import SimpleNamespace as NS
+
+from rag_nakamo.agents.resp_with_claims import ResponseAgent
+
+ANSWER = ("Design controls apply to class II and class III devices. Manufacturers shall establish design input "
+          "procedures. Design verification confirms that design output meets design input requirements. ") * 6
+DOCS = [{"content": ANSWER + " Design validation ensures devices conform to user needs.", "source": "FDA", "page": 1}]
+
+
+class FakeCompletions:
+    def __init__(self, format_s, assess_s, chunks=40):
+        self.format_s, self.assess_s, self.chunks = format_s, assess_s, chunks
+
+    def create(self, stream=False, **kwargs):
+        if kwargs.get("max_tokens") == 500:  # assessment call
+            time.sleep(self.assess_s)
+            return NS(choices=[NS(message=NS(content='{"overall_quality": 4}'))], usage=None)
+        text = "## Executive Summary\n\n" + ANSWER
+        if not stream:
+            time.sleep(self.format_s)
+            return NS(choices=[NS(message=NS(content=text))], usage=None)
+
+        def gen():
+            size = len(text) // self.chunks + 1
+            for i in range(0, len(text), size):
+                time.sleep(self.format_s / self.chunks)
+                yield NS(choices=[NS(delta=NS(content=text[i:i + size]))], usage=None)
+        return gen()
+
+
+def run(agent, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = agent.process_message({"question": "Design controls?", "answer": ANSWER, "docs": DOCS})
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--format-s", type=float, default=2.0)
+    parser.add_argument("--assess-s", type=float, default=1.5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    fake = NS(chat=NS(completions=FakeCompletions(args.format_s, args.assess_s)))
+
+    modes = {
+        "sequential": dict(),
+        "overlapped": dict(overlap_validation=True),
+        "overlapped+skip decisive": dict(overlap_validation=True, skip_assessment_when_decisive=True),
+    }
+    for label, kwargs in modes.items():
+        agent = ResponseAgent(**kwargs)
+        agent.client = fake
+        wall, result = run(agent, args.repeat)
+        agent.close()
+        print(f"{label:>26}: {wall:.2f}s  decision={result['decision']} coverage={result['metrics']['coverage']:.2f} "
+              f"assessment={result['llm_assessment']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Parent-child retrieval (vectorstore/parents.py) against single-unit chunks, on the data/ PDFs,
+through RAGAgent.search_documents, no API calls.
+
+Embeddings are hashed bags of words and bigrams (1024 dims, unit length), a lexical stand-in for
+text-embedding-3-large, so absolute quality is not that of production; all setups share them.
+Setups, all with retrieval_top_k=5:
+  chunks    ~1200 character sentence-packed chunks (the semantic chunker's size), match = context
+  children  the ~400 character child spans, match = context
+  parents   children matched, their parents returned within --budgets tokens
+Ground truth per question: the --gold best sentences of the whole corpus by BM25. Reported:
+gold sentences found in the returned context (recall), gold sentences per 1k context tokens
+(density), context tokens, distinct sources/pages, vectors indexed, search latency.
+Run from src/:
+    python -m scripts.bench_parent_child --budgets 1500 3000
+    python -m scripts.bench_parent_child --unit section --parent-max-chars 3000
+"""
+import argparse
+import io
+import logging
+import os
+import re
+import shutil
+import statistics
+import tempfile
+import time
+import zlib
+from contextlib import redirect_stdout
+from glob import glob
+
+import numpy as np
+
+DIM = 1024
+
+
+class HashingEmbeddings:
+    def embed_query(self, text):
+        from rag_nakamo.compression import terms
+        words = terms(text)
+        vector = np.zeros(DIM, dtype=np.float32)
+        for token in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            vector[zlib.crc32(token.encode()) % DIM] += 1.0
+        vector = np.log1p(vector)
+        return (vector / max(np.linalg.norm(vector), 1e-12)).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class SentenceChunker:
+    """SemanticChunker interface (create_documents), sentences packed up to `size` characters."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def create_documents(self, texts):
+        from langchain_core.documents import Document
+        from rag_nakamo.compression import split_sentences
+        chunks = []
+        for text in texts:
+            current = ""
+            for sentence in split_sentences(text):
+                if current and len(current) + len(sentence) > self.size:
+                    chunks.append(Document(page_content=current))
+                    current = ""
+                current += (" " if current else "") + sentence
+            if current:
+                chunks.append(Document(page_content=current))
+        return chunks
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="../data/")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[1500, 3000], help="parent token budgets")
+    parser.add_argument("--unit", choices=["page", "section"], default="page")
+    parser.add_argument("--parent-max-chars", type=int, default=None, help="default: Settings.parent_max_chars")
+    parser.add_argument("--gold", type=int, default=3, help="gold sentences per question")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    work = tempfile.mkdtemp()
+    os.environ.update(OPENAI_API_KEY="sk-bench", ANONYMIZED_TELEMETRY="False", ENABLE_SINGLEFLIGHT="false",
+                      ENABLE_RERANK="false", ENABLE_MMR="false", VECTOR_INDEX="chroma", USE_CHUNK_STORE="false",
+                      INDEX_ROOT="", RETRIEVAL_TOP_K="5", PARENT_UNIT=args.unit)
+    os.environ.pop("INDEX_ROOT")
+    if args.parent_max_chars:
+        os.environ["PARENT_MAX_CHARS"] = str(args.parent_max_chars)
+    from rag_nakamo.agents.rag import RAGAgent
+    from rag_nakamo.compression import bm25_scores, split_sentences
+    from rag_nakamo.settings import get_settings
+    from rag_nakamo.tokens import estimate_tokens
+    from rag_nakamo.vectorstore.chroma_manager import create_and_populate_vector_store
+    from rag_nakamo.vectorstore.chunk_store import ChunkStore
+    from rag_nakamo.vectorstore.ingestion import clean_and_chunk, load_pdf
+    from scripts.bench_compression import QUESTIONS
+
+    files = sorted(glob(os.path.join(args.data, "*.pdf")))
+    embeddings = HashingEmbeddings()
+
+    def build(name, parent_retrieval):
+        os.environ.update(CHROMA_DB_PATH=os.path.join(work, name), PARENT_STORE_PATH=os.path.join(work, "parents"),
+                          ENABLE_PARENT_RETRIEVAL=str(parent_retrieval).lower())
+        get_settings.cache_clear()
+        settings = get_settings().model_copy(update={"page_cache_path": None})
+        pages = [page for path in files for page in load_pdf(path)]
+        store = ChunkStore(settings.parent_store_path) if parent_retrieval else None
+        with redirect_stdout(io.StringIO()):  # cleanup and population reports
+            chunks = clean_and_chunk(pages, SentenceChunker(1200), settings, store)
+            start = time.perf_counter()
+            create_and_populate_vector_store(chunks, embeddings, settings.chroma_db_path,
+                                             settings.chroma_collection_name)
+        return chunks, time.perf_counter() - start, store
+
+    chunks, chunk_build_s, _ = build("chunks", False)
+    children, child_build_s, parent_store = build("children", True)
+
+    # gold: best BM25 sentences of the corpus (cleaned pages, as indexed)
+    corpus = [normalize(s) for chunk in chunks for s in split_sentences(chunk.page_content)]
+    gold = {q: [corpus[i] for i in np.argsort(-bm25_scores(q, corpus))[: args.gold]] for q in QUESTIONS}
+    print(f"{len(files)} PDFs: {len(chunks)} chunks, {len(children)} children, {len(parent_store)} parents "
+          f"({args.unit}); {len(QUESTIONS)} questions, {args.gold} gold sentences each\n")
+    print(f"{'setup':>14} {'vectors':>7} {'avg chars':>9} {'ctx tok':>7} {'recall':>6} {'per 1k tok':>10} "
+          f"{'pages':>5} {'search ms':>9}")
+
+    setups = [("chunks", "chunks", False, None, chunks), ("children", "children", False, None, children)]
+    setups += [(f"parents@{b}", "children", True, b, children) for b in args.budgets]
+    for label, name, parent_retrieval, budget, indexed in setups:
+        os.environ.update(CHROMA_DB_PATH=os.path.join(work, name), ENABLE_PARENT_RETRIEVAL=str(parent_retrieval).lower(),
+                          PARENT_TOKEN_BUDGET=str(budget or 0))
+        get_settings.cache_clear()
+        agent = RAGAgent(name="RAG Agent", description="RAG Agent")
+        agent.embeddings = embeddings
+        agent.search_documents(QUESTIONS[0])  # open the collection
+        tokens, recalls, densities, pages, latencies = [], [], [], [], []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            results = agent.process_message({"original_question": question, "filters": {}})
+            latencies.append(time.perf_counter() - start)
+            context = normalize(" ".join(r["content"] for r in results))
+            found = sum(sentence in context for sentence in gold[question])
+            tokens.append(estimate_tokens(context))
+            recalls.append(found / len(gold[question]))
+            densities.append(found / max(tokens[-1], 1) * 1000)
+            pages.append(len({(r["source"], r["page"]) for r in results}))
+        print(f"{label:>14} {len(indexed):7d} {statistics.mean(len(c.page_content) for c in indexed):9.0f} "
+              f"{statistics.mean(tokens):7.0f} {statistics.mean(recalls):6.0%} {statistics.mean(densities):10.2f} "
+              f"{statistics.mean(pages):5.1f} {statistics.median(latencies) * 1e3:9.2f}")
+    print(f"\nembedding + indexing: chunks {chunk_build_s:.1f}s, children {child_build_s:.1f}s "
+          f"(parents are stored, not embedded)")
+    shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
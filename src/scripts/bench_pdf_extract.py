@@ -0,0 +1,50 @@
+"""
+Pages/sec per PDF extraction backend over the PDFs in data/ (vectorstore/extractors.py),
+then the same run through the parsed-page cache (cold: parse + store, warm: hash + load).
+Backends that are not installed are listed and skipped. Run from src/:
+    python -m scripts.bench_pdf_extract --data ../data/ --repeat 3
+"""
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from glob import glob
+
+from rag_nakamo.vectorstore.extractors import EXTRACTORS, PageCache, available_backends, extract_pages
+
+
+def run(files, backend, cache=None):
+    start = time.perf_counter()
+    pages = sum(len(extract_pages(path, backend=backend, cache=cache)) for path in files)
+    return pages, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="../data/")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.getLogger("pypdf").setLevel(logging.ERROR)  # malformed-object warnings on some guidance PDFs
+
+    files = sorted(glob(args.data + "*.pdf"))
+    installed = available_backends()
+    missing = [b for b in EXTRACTORS if b not in installed]
+    print(f"{len(files)} PDFs, backends installed: {installed}" + (f", not installed: {missing}" if missing else ""))
+    print(f"{'backend':>10} {'pages':>6} {'parse p/s':>10} {'cold cache p/s':>14} {'warm cache p/s':>14} {'chars':>8}")
+    for backend in installed:
+        best = min((run(files, backend) for _ in range(args.repeat)), key=lambda r: r[1])
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = PageCache(cache_dir)
+            _, cold = run(files, backend, cache)
+            warm = min(run(files, backend, cache)[1] for _ in range(args.repeat))
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        chars = sum(len("".join(extract_pages(path, backend))) for path in files)
+        pages = best[0]
+        print(f"{backend:>10} {pages:6d} {pages / best[1]:10.1f} {pages / cold:14.1f} {pages / warm:14.0f} {chars:8d}")
+
+
+if __name__ == "__main__":
+    main()
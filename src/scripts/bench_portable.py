@@ -0,0 +1,100 @@
+"""
+Moving a built index between environments (vectorstore/portable.py), no API calls.
+
+A collection of synthetic records (3072-dim vectors like text-embedding-3-large, ~1 KB texts,
+ingestion-style metadata) is exported to Parquet + NPY and imported into a fresh store, in plain
+and compact (chunk store) mode. Reported: export / verify / import times, export size, and the
+embeddings API work an import replaces (texts, tokens, calls at batch 256).
+Run from src/:
+    python -m scripts.bench_portable --docs 10000
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+
+def build(path, name, docs, dims, chunk_store=None, batch=5000):
+    import chromadb
+    collection = chromadb.PersistentClient(path=path).create_collection(name)
+    rng = np.random.default_rng(0)
+    words = np.array("device software validation risk design control requirement manufacturer".split())
+    for start in range(0, docs, batch):
+        n = min(batch, docs - start)
+        texts = [" ".join(rng.choice(words, 140)) + f" #{start + i}" for i in range(n)]
+        metadatas = [{"source": f"doc{(start + i) % 30}.pdf", "page": (start + i) % 200, "total_pages": 200,
+                      "authority": "FDA", "file_hash": "ab" * 8, "score": 0.5} for i in range(n)]
+        vectors = rng.standard_normal((n, dims)).astype(np.float32)
+        ids = [f"r{start + i}" for i in range(n)]
+        if chunk_store is not None:
+            for metadata, cid in zip(metadatas, chunk_store.add_many(texts)):
+                metadata["chunk_id"] = cid
+            collection.add(ids=ids, embeddings=vectors, metadatas=metadatas)
+        else:
+            collection.add(ids=ids, embeddings=vectors, metadatas=metadatas, documents=texts)
+
+
+def size_mb(path):
+    return sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(path) for f in fs) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--dims", type=int, default=3072)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    os.environ["ANONYMIZED_TELEMETRY"] = "False"
+    from rag_nakamo.tokens import CHARS_PER_TOKEN
+    from rag_nakamo.vectorstore.chunk_store import ChunkStore
+    import chromadb
+    from rag_nakamo.vectorstore.portable import (export_collection, import_collection, load_export, read_manifest,
+                                                 store_checksum, verify_files)
+
+    print(f"{args.docs} records x {args.dims} dims")
+    print(f"{'mode':>8} {'build s':>8} {'chroma MB':>9} {'export s':>8} {'export MB':>9} {'verify s':>8} "
+          f"{'load ms':>7} {'import s':>8} {'checksum s':>10} {'match':>6}")
+    for mode in ("plain", "compact"):
+        work = tempfile.mkdtemp()
+        source_store = ChunkStore(os.path.join(work, "src_chunks")) if mode == "compact" else None
+        t = time.perf_counter()
+        build(os.path.join(work, "src"), "regulatory_documents", args.docs, args.dims, source_store)
+        build_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        export_collection(os.path.join(work, "src"), "regulatory_documents", os.path.join(work, "export"),
+                          chunk_store=source_store)
+        export_s = time.perf_counter() - t
+        t = time.perf_counter()
+        verify_files(os.path.join(work, "export"))
+        verify_s = time.perf_counter() - t
+        t = time.perf_counter()
+        table, embeddings = load_export(os.path.join(work, "export"))
+        load_ms = (time.perf_counter() - t) * 1e3
+
+        target_store = ChunkStore(os.path.join(work, "dst_chunks")) if mode == "compact" else None
+        t = time.perf_counter()
+        result = import_collection(os.path.join(work, "export"), os.path.join(work, "dst"), chunk_store=target_store,
+                                   verify=False)
+        import_s = time.perf_counter() - t
+        # import_collection runs this by default (verify=True), timed on its own here
+        t = time.perf_counter()
+        collection = chromadb.PersistentClient(path=os.path.join(work, "dst")).get_collection("regulatory_documents")
+        ok = store_checksum(collection, target_store) == read_manifest(os.path.join(work, "export"))["checksums"]["content"]
+        checksum_s = time.perf_counter() - t
+        print(f"{mode:>8} {build_s:8.1f} {size_mb(os.path.join(work, 'src')):9.0f} {export_s:8.1f} "
+              f"{size_mb(os.path.join(work, 'export')):9.0f} {verify_s:8.2f} {load_ms:7.1f} {import_s:8.1f} "
+              f"{checksum_s:10.1f} {'ok' if ok and result['count'] == args.docs else 'MISMATCH':>6}", flush=True)
+        texts = table.column("document").to_pylist()
+        shutil.rmtree(work, ignore_errors=True)
+    tokens = sum(len(t) for t in texts) / CHARS_PER_TOKEN
+    print(f"\nan import replaces {len(texts)} embedding inputs, ~{tokens / 1e6:.1f}M tokens, "
+          f"{(len(texts) + 255) // 256} API calls at batch 256 (plus the semantic chunker's sentence embeddings)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Index size, query latency and recall@k: full-precision Chroma (HNSW, cosine) versus the
+truncated / quantized first stage with full-precision rescoring (vectorstore/quantized_index.py).
+Ground truth is exact brute-force search on the full vectors.
+
+No API calls: vectors are synthetic 3072-dim embeddings with a Matryoshka-like spectrum
+(clustered, variance decaying along the dimensions, as in text-embedding-3 where leading
+dimensions carry most information). Recall on the real collection will differ; build the
+index from Chroma (python -m rag_nakamo.vectorstore.quantized_index build) to check.
+Run from src/:
+    python -m scripts.bench_quantized_index --docs 10000 --queries 200
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from rag_nakamo.vectorstore.quantized_index import QuantizedIndex
+
+
+def synthetic(n_docs, n_queries, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    spectrum = (np.arange(dim) + 1.0) ** -0.5
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32) * spectrum
+    docs = centers[rng.integers(0, clusters, n_docs)] + 0.6 * rng.standard_normal((n_docs, dim)).astype(np.float32) * spectrum
+    queries = docs[rng.integers(0, n_docs, n_queries)] + 0.5 * rng.standard_normal((n_queries, dim)).astype(np.float32) * spectrum
+    return docs.astype(np.float32), queries.astype(np.float32)
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def recall(found, truth):
+    return statistics.mean(len(set(f) & set(t)) / len(t) for f, t in zip(found, truth))
+
+
+def timed_search(fn, queries):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q))
+        latencies.append(time.perf_counter() - start)
+    return results, statistics.median(latencies) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--oversample", type=int, default=4)
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    docs, queries = synthetic(args.docs, args.queries, args.dim, args.clusters)
+    normed = docs / np.linalg.norm(docs, axis=1, keepdims=True)
+    qn = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [list(np.argsort(-(normed @ q))[: args.k]) for q in qn]
+    ids = [f"doc-{i}" for i in range(args.docs)]
+    metadatas = [{"source": f"doc{i % 50}.pdf", "page": i % 300} for i in range(args.docs)]
+    workdir = tempfile.mkdtemp()
+    print(f"{args.docs} docs x {args.dim} dims, {args.queries} queries, recall@{args.k}, oversample {args.oversample}")
+    print(f"{'index':>26} {'disk MB':>8} {'RAM MB':>8} {'p50 ms':>7} {'recall':>7}")
+
+    try:
+        if not args.skip_chroma:
+            import chromadb
+            path = os.path.join(workdir, "chroma")
+            collection = chromadb.PersistentClient(path=path).create_collection("bench", metadata={"hnsw:space": "cosine"})
+            for i in range(0, args.docs, 5000):
+                collection.add(ids=ids[i:i + 5000], embeddings=docs[i:i + 5000], metadatas=metadatas[i:i + 5000])
+            collection.query(query_embeddings=[queries[0]], n_results=args.k)  # load segment
+            found, p50 = timed_search(
+                lambda q: [int(x[4:]) for x in collection.query(query_embeddings=[q], n_results=args.k,
+                                                                 include=["distances"])["ids"][0]],
+                queries)
+            print(f"{'chroma full precision':>26} {dir_size(path) / 1e6:8.1f} {docs.nbytes / 1e6:8.1f} "
+                  f"{p50:7.2f} {recall(found, truth):7.3f}")
+
+        # binary keeps 1 bit per dimension and needs a deeper candidate list to recover recall
+        for dims, quantization, oversample in [(args.dim, "none", args.oversample), (512, "none", args.oversample),
+                                               (512, "int8", args.oversample), (256, "int8", args.oversample),
+                                               (1024, "binary", args.oversample), (1024, "binary", 8 * args.oversample),
+                                               (3072, "binary", 8 * args.oversample)]:
+            path = os.path.join(workdir, f"q-{dims}-{quantization}")
+            if not os.path.exists(path):
+                QuantizedIndex.build(path, ids, docs, metadatas, dims=dims, quantization=quantization)
+            index = QuantizedIndex(path)
+            found, p50 = timed_search(
+                lambda q: [i for i, _ in index.search(q, k=args.k, oversample=oversample)], queries)
+            sizes = index.nbytes()
+            label = f"{dims}d {quantization} x{oversample}"
+            print(f"{label:>26} {sum(v for k, v in sizes.items() if k != 'in_memory') / 1e6:8.1f} "
+                  f"{sizes['in_memory'] / 1e6:8.1f} {p50:7.2f} {recall(found, truth):7.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Admission control under a misbehaving provider: a local stub that returns 429s (at random
+and above a concurrency cap) and occasional slow responses. Compares the bare OpenAI client
+(SDK defaults: 2 retries, no limits) with the shared wrapper from llm/client.py.
+No API key needed. Run from src/:
+    python -m scripts.bench_resilience --requests 300 --threads 48
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.stub_llm_server import start_stub
+
+
+def run_load(call, requests, threads):
+    latencies, failures = [], {}
+    lock = threading.Lock()
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            call(i)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            with lock:
+                failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(requests)))
+    return latencies, failures, time.perf_counter() - start
+
+
+def report(label, latencies, failures, wall, stub, extra=""):
+    ok = len(latencies)
+    p = sorted(latencies)
+    p50 = statistics.median(p) if p else 0
+    p99 = p[int(0.99 * (len(p) - 1))] if p else 0
+    print(f"{label:>10}: ok {ok}, failed {dict(failures) or 0}, p50 {p50:.2f}s, p99 {p99:.2f}s, wall {wall:.1f}s, "
+          f"stub saw {stub.stats['requests']} requests / {stub.stats['429']} 429s / max inflight {stub.stats['max_inflight']}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=48)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--max-concurrency", type=int, default=8, help="stub returns 429 above this")
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--slow-s", type=float, default=3.0)
+    parser.add_argument("--latency-s", type=float, default=0.1)
+    args = parser.parse_args()
+
+    messages = [{"role": "user", "content": "What are FDA software validation requirements?"}]
+    stub_kwargs = dict(latency_s=args.latency_s, error_rate=args.error_rate, max_concurrency=args.max_concurrency,
+                       slow_rate=args.slow_rate, slow_s=args.slow_s, seed=0)
+
+    from openai import OpenAI
+    server, stub, url = start_stub(**stub_kwargs)
+    bare = OpenAI(api_key="sk-stub", base_url=url)
+    latencies, failures, wall = run_load(
+        lambda i: bare.chat.completions.create(model="stub", messages=messages, max_tokens=50),
+        args.requests, args.threads)
+    report("bare", latencies, failures, wall, stub)
+    server.shutdown()
+
+    server, stub, url = start_stub(**stub_kwargs)
+    os.environ.update(OPENAI_API_KEY="sk-stub", OPENAI_BASE_URL=url, MODEL_PROVIDER="openai",
+                      LLM_ATTEMPT_TIMEOUT_S="1.5", LLM_DEADLINE_S="30", LLM_LATENCY_TARGET_S="1.0",
+                      LLM_BACKOFF_BASE_S="0.1", LLM_BACKOFF_MAX_S="2", LLM_MAX_RETRIES="8")
+    from rag_nakamo.llm.client import get_llm_client
+    client = get_llm_client()
+    latencies, failures, wall = run_load(
+        lambda i: client.chat.completions.create(model="stub", messages=messages, max_tokens=50),
+        args.requests, args.threads)
+    snapshot = client.control.snapshot()
+    report("limited", latencies, failures, wall, stub,
+           f"\n{'':>12}retries {snapshot['retries']}, throttled {snapshot['throttled']}, "
+           f"deadline exceeded {snapshot['deadline_exceeded']}, final concurrency limit {snapshot['concurrency_limit']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
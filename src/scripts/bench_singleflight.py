@@ -0,0 +1,100 @@
+"""
+Benchmark: single-flight coalescing in SimpleOrchestrator under a bursty synthetic load.
+Fake RAG / response agents with fixed latencies stand in for the real ones (no API calls).
+Run from src/:
+    python -m scripts.bench_singleflight --bursts 20 --burst-size 50 --hot-questions 5
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from rag_nakamo.agents.new_orch import SimpleOrchestrator
+
+
+class FakeAgent:
+    def __init__(self, latency, result):
+        self.latency, self.result, self.calls = latency, result, 0
+        self._lock = threading.Lock()
+
+    def timed(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self.result, self.latency
+
+
+QUESTIONS = [
+    "What are FDA software validation requirements?",
+    "What does the FDA guidance say about design controls?",
+    "How does WHO define medical device regulation?",
+    "Which standards apply to medical device software?",
+    "What are the requirements for design validation?",
+    "Is a mobile medical application a regulated device?",
+    "What is the FDA policy on device software functions?",
+    "How should design reviews be documented under FDA guidance?",
+]
+
+
+def variant(question, rng):
+    """Same question as typed by different users."""
+    q = question if rng.random() < 0.5 else question.lower()
+    return ("  " if rng.random() < 0.3 else "") + q.rstrip("?") + ("?" if rng.random() < 0.7 else "")
+
+
+def run(orchestrator, args, rng):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(query):
+        start = time.perf_counter()
+        orchestrator.process_message(query)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    hot = QUESTIONS[: args.hot_questions]
+    for _ in range(args.bursts):
+        threads = []
+        for _ in range(args.burst_size):
+            question = rng.choice(hot) if rng.random() < args.hot_share else rng.choice(QUESTIONS)
+            threads.append(threading.Thread(target=one, args=(variant(question, rng),)))
+            threads[-1].start()
+            time.sleep(rng.expovariate(1 / args.arrival_ms) / 1000)
+        for t in threads:
+            t.join()
+        time.sleep(args.gap_s)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--hot-questions", type=int, default=3)
+    parser.add_argument("--hot-share", type=float, default=0.9)
+    parser.add_argument("--arrival-ms", type=float, default=5.0, help="mean gap between requests in a burst")
+    parser.add_argument("--gap-s", type=float, default=0.2)
+    parser.add_argument("--rag-s", type=float, default=0.3)
+    parser.add_argument("--response-s", type=float, default=1.0)
+    args = parser.parse_args()
+
+    for enabled in (False, True):
+        orchestrator = SimpleOrchestrator()
+        if not enabled:
+            orchestrator._inflight = None
+        rag = FakeAgent(args.rag_s, [{"source": "FDA", "content": "..."}])
+        response = FakeAgent(args.response_s, "answer")
+        orchestrator.agents = {"rag_agent": rag, "response_agent": response}
+
+        start = time.perf_counter()
+        latencies = run(orchestrator, args, random.Random(0))
+        wall = time.perf_counter() - start
+        label = "single-flight" if enabled else "baseline"
+        ratio = orchestrator._inflight.coalescing_ratio() if enabled else 0.0
+        print(f"{label:>13}: {len(latencies)} requests, {response.calls} pipeline executions, "
+              f"coalescing ratio {ratio:.2f}, p50 {statistics.median(latencies):.2f}s, wall {wall:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Ingestion daemon (vectorstore/watcher.py) on a copy of data/, no API calls: fake 64-dim
+embeddings and a fixed-size chunker stand in for OpenAI and the semantic chunker.
+
+Scenario, with index_root versioning and a RAGAgent-style reader of CURRENT:
+  full build of data/ (baseline: what a manual ingestion run re-does every time)
+  new guidance PDF dropped in            -> indexed and published
+  a PDF copied in slowly (12 writes)     -> debounced into one indexing pass
+  an existing PDF replaced (fewer pages) -> old chunks deleted, new ones upserted
+  a PDF deleted                          -> its chunks removed
+Reported per event: freshness (first file event -> new version active), chunks touched,
+batches, peak queue depth; then throughput from the daemon's metrics file.
+Run from src/:
+    python -m scripts.bench_watcher [--polling]
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from glob import glob
+
+import numpy as np
+
+DIM = 64
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(DIM).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(0.002 * len(texts))  # ~ API time per text at batch 256
+        return [self.embed_query(t) for t in texts]
+
+
+class FixedChunker:
+    """SemanticChunker interface (create_documents), ~1000 character chunks."""
+
+    def create_documents(self, texts):
+        from langchain_core.documents import Document
+        return [Document(page_content=text[i:i + 1000]) for text in texts for i in range(0, max(len(text), 1), 1000)]
+
+
+def write_pdf(source, target, pages=None, slow_writes=0):
+    from pypdf import PdfReader, PdfWriter
+    writer = PdfWriter()
+    for page in PdfReader(source).pages[:pages]:
+        writer.add_page(page)
+    tmp = target + ".part"
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    data = open(tmp, "rb").read()
+    os.remove(tmp)
+    if not slow_writes:
+        with open(target, "wb") as f:
+            f.write(data)
+        return
+    step = len(data) // slow_writes + 1
+    with open(target, "wb") as f:  # a slow copy: one modify event per write
+        for i in range(0, len(data), step):
+            f.write(data[i:i + step])
+            f.flush()
+            time.sleep(0.15)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="../data/")
+    parser.add_argument("--polling", action="store_true")
+    parser.add_argument("--debounce", type=float, default=1.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    out = sys.stdout
+    sys.stdout = io.StringIO()  # clean_and_chunk's cleanup reports
+
+    def report(text):
+        print(text, file=out, flush=True)
+
+    work = tempfile.mkdtemp()
+    data_dir = os.path.join(work, "data") + "/"
+    os.makedirs(data_dir)
+    sources = sorted(glob(args.data + "*.pdf"))
+    for path in sources[:2]:
+        shutil.copy(path, data_dir)
+    os.environ.update({"OPENAI_API_KEY": "sk-bench", "ANONYMIZED_TELEMETRY": "False",
+                       "INDEX_ROOT": os.path.join(work, "indexes"),
+                       "WATCH_METRICS_PATH": os.path.join(work, "metrics.json")})
+    from rag_nakamo.settings import get_settings
+    get_settings.cache_clear()
+    settings = get_settings().model_copy(update={"page_cache_path": None})
+    import chromadb
+    from rag_nakamo.vectorstore.versions import IndexVersions
+    from rag_nakamo.vectorstore.watcher import DocumentWatcher, IncrementalIndexer
+
+    versions = IndexVersions(settings.index_root)
+    indexer = IncrementalIndexer(FakeEmbeddings(), FixedChunker(), settings)
+    start = time.perf_counter()
+    indexer.process([os.path.join(data_dir, os.path.basename(p)) for p in sources[:2]])
+    full_s = time.perf_counter() - start
+    report(f"full build of {len(sources[:2])} PDFs: {indexer.metrics['chunks_upserted']} chunks in {full_s:.2f}s "
+         f"-> {versions.current()}")
+
+    watcher = DocumentWatcher(data_dir, indexer, debounce_s=args.debounce, poll_s=0.5, use_polling=args.polling)
+    peak = [0]
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    while watcher.mode is None:
+        time.sleep(0.05)
+    report(f"watcher mode: {watcher.mode}, debounce {args.debounce}s\n")
+
+    def monitor():
+        while thread.is_alive():
+            peak[0] = max(peak[0], watcher.queue_depth())
+            time.sleep(0.02)
+    threading.Thread(target=monitor, daemon=True).start()
+
+    third = os.path.join(data_dir, os.path.basename(sources[2]))
+    first = os.path.join(data_dir, os.path.basename(sources[0]))
+    second = os.path.join(data_dir, os.path.basename(sources[1]))
+    events = [
+        ("new PDF dropped in", lambda: shutil.copy(sources[2], third)),
+        ("slow copy, 12 writes", lambda: write_pdf(sources[0], os.path.join(data_dir, "FDA_Draft_Update.pdf"),
+                                                  slow_writes=12)),
+        ("PDF replaced (20 pages)", lambda: write_pdf(sources[0], first, pages=20)),
+        ("PDF deleted", lambda: os.remove(second)),
+    ]
+    report(f"{'event':>24} {'freshness s':>11} {'batches':>7} {'upserted':>8} {'deleted':>7} {'collection':>10}")
+    for name, action in events:
+        before = dict(indexer.metrics)
+        version = versions.current()
+        t0 = time.perf_counter()
+        action()
+        while versions.current() == version and time.perf_counter() - t0 < 60:
+            time.sleep(0.02)
+        freshness = time.perf_counter() - t0
+        time.sleep(args.debounce + 0.5)  # let stray events of the same action settle
+        count = chromadb.PersistentClient(path=versions.paths(versions.current())["chroma_db_path"]).get_collection(
+            settings.chroma_collection_name).count()
+        report(f"{name:>24} {freshness:11.2f} {indexer.metrics['batches'] - before['batches']:7d} "
+             f"{indexer.metrics['chunks_upserted'] - before['chunks_upserted']:8d} "
+             f"{indexer.metrics['chunks_deleted'] - before['chunks_deleted']:7d} {count:10d}")
+    watcher.stop()
+    thread.join(timeout=5)
+
+    metrics = json.load(open(settings.watch_metrics_path))
+    report(f"\npeak queue depth {peak[0]}, {metrics['chunks_upserted']} chunks upserted at {metrics['chunks_per_s']} chunks/s "
+         f"of indexing time, publish total {metrics['publish_seconds']:.2f}s, versions kept {len(versions.versions())}")
+    shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
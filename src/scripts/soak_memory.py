@@ -0,0 +1,97 @@
+"""
+Soak test: RSS over 100k queries through one shared SimpleOrchestrator (8 threads) with the
+bounded ConversationStore, versus the old pattern of appending every message to a list on
+a long-lived agent. Agents are fakes with realistic payload sizes (no API calls); each mode
+runs in its own process. Run from src/:
+    python -m scripts.soak_memory --queries 100000 --threads 8
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+class FakeRAG:
+    def timed(self, query, *args, **kwargs):
+        docs = [{"rank": i, "content": f"{query} " + "regulatory text " * 60, "source": f"doc{i}.pdf",
+                 "page": i, "section": "", "relevance_score": 0.5} for i in range(5)]
+        return docs, 0.0
+
+
+class FakeResponse:
+    def __init__(self, keep_history: bool):
+        self.message_history = [] if keep_history else None
+
+    def timed(self, query, content, deadline=None, history=""):
+        answer = f"## Executive Summary\n{query}\n" + "answer text with citations [doc1.pdf, Page 1]. " * 40
+        if self.message_history is not None:  # legacy: long-lived agent remembers everything
+            self.message_history.append({"query": query, "content": content, "answer": answer})
+        return answer, 0.0
+
+
+def soak(mode: str, queries: int, threads: int, conversations: int, samples: int):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-soak")
+    from rag_nakamo.agents.new_orch import SimpleOrchestrator
+    from rag_nakamo.conversation import ConversationStore
+
+    store = ConversationStore(max_turns=8, max_conversations=1000) if mode == "bounded" else None
+    orchestrator = SimpleOrchestrator(conversation_store=store)
+    orchestrator.register_agent("rag_agent", FakeRAG())
+    orchestrator.register_agent("response_agent", FakeResponse(keep_history=mode == "unbounded"))
+    import logging
+    logging.disable(logging.INFO)
+
+    rng = random.Random(0)
+    lock = threading.Lock()
+    done = [0]
+    step = queries // samples
+
+    def one(i):
+        orchestrator.process_message(f"What are FDA validation requirements for case {i}?",
+                                     conversation_id=f"c{rng.randrange(conversations)}")
+        with lock:
+            done[0] += 1
+            if done[0] % step == 0:
+                print(f"{done[0]},{rss_mb():.1f}", flush=True)
+
+    print(f"0,{rss_mb():.1f}", flush=True)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for start in range(0, queries, 1000):  # bounded submission, no backlog of futures
+            list(pool.map(one, range(start, min(start + 1000, queries))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--conversations", type=int, default=5000, help="distinct ids, store keeps 1000")
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--mode", choices=["bounded", "unbounded"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        soak(args.mode, args.queries, args.threads, args.conversations, args.samples)
+        return
+
+    for mode in ("bounded", "unbounded"):
+        out = subprocess.run(
+            [sys.executable, "-m", "scripts.soak_memory", "--mode", mode, "--queries", str(args.queries),
+             "--threads", str(args.threads), "--conversations", str(args.conversations), "--samples", str(args.samples)],
+            capture_output=True, text=True, check=True).stdout
+        points = [tuple(map(float, line.split(","))) for line in out.splitlines() if "," in line]
+        curve = "  ".join(f"{int(n / 1000)}k:{rss:.0f}" for n, rss in points)
+        warm = next(rss for n, rss in points if n >= args.queries * 0.2)
+        print(f"{mode:>9} RSS MB  {curve}")
+        print(f"{'':>9} growth after 20% warm-up: {points[-1][1] - warm:+.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
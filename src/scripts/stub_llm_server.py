@@ -0,0 +1,139 @@
+"""
+OpenAI-compatible stub server for load tests (chat completions, embeddings, models).
+Injects failures and latency: 429s at a fixed rate and above a concurrency cap,
+occasional slow responses, and an optional long-tailed (lognormal) latency.
+    python -m scripts.stub_llm_server --port 8089 --error-rate 0.1 --max-concurrency 8
+or start_stub(...) from another script.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency_s=0.05, error_rate=0.0, slow_rate=0.0, slow_s=5.0,
+                 max_concurrency=0, lognormal_sigma=0.0, per_token_s=0.0, per_input_token_s=0.0, dim=256, seed=None):
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_s = slow_s
+        self.max_concurrency = max_concurrency  # 0: unlimited
+        self.lognormal_sigma = lognormal_sigma  # >0: latency_s is the median of a lognormal
+        self.per_token_s = per_token_s  # decode time per requested max_tokens
+        self.per_input_token_s = per_input_token_s  # prefill time per prompt token (chars / 4)
+        self.dim = dim
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.stats = {"requests": 0, "429": 0, "slow": 0, "max_inflight": 0}
+
+    def latency(self, max_tokens=0, prompt_tokens=0):
+        with self.lock:
+            slow = self.rng.random() < self.slow_rate
+            tail = self.rng.lognormvariate(0, self.lognormal_sigma) if self.lognormal_sigma else 1.0
+        if slow:
+            self.stats["slow"] += 1
+            return self.slow_s
+        return self.latency_s * tail + self.per_token_s * (max_tokens or 0) + self.per_input_token_s * prompt_tokens
+
+
+def make_handler(config: StubConfig):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client gave up (timeout / cancelled hedge)
+
+        def do_GET(self):
+            self._send(200, {"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with config.lock:
+                config.stats["requests"] += 1
+                throttled = (config.rng.random() < config.error_rate
+                             or (config.max_concurrency and config.inflight >= config.max_concurrency))
+                if throttled:
+                    config.stats["429"] += 1
+                else:
+                    config.inflight += 1
+                    config.stats["max_inflight"] = max(config.stats["max_inflight"], config.inflight)
+            if throttled:
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                           {"retry-after": "0.2"})
+                return
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+            try:
+                time.sleep(config.latency(request.get("max_tokens"), prompt_tokens))
+            finally:
+                with config.lock:
+                    config.inflight -= 1
+            if self.path.endswith("/embeddings"):
+                inputs = request.get("input")
+                inputs = inputs if isinstance(inputs, list) else [inputs]
+                data = [{"object": "embedding", "index": i, "embedding": [0.01] * config.dim} for i in range(len(inputs))]
+                self._send(200, {"object": "list", "data": data, "model": request.get("model"),
+                                 "usage": {"prompt_tokens": 8 * len(inputs), "total_tokens": 8 * len(inputs)}})
+                return
+            content = "stub answer"
+            if "prompt_harm_label" in json.dumps(request.get("messages", [])):  # PromptGuard classifier
+                content = json.dumps({"prompt_harm_label": "unharmful", "response_refusal_label": "compliance",
+                                      "response_harm_label": "unharmful"})
+            self._send(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "stub-model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 2, "total_tokens": prompt_tokens + 2},
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub(port: int = 0, **config_kwargs):
+    """Starts the stub in a daemon thread, returns (server, config, base_url)."""
+    config = StubConfig(**config_kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-s", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-s", type=float, default=5.0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--lognormal-sigma", type=float, default=0.0)
+    args = parser.parse_args()
+    server, _, url = start_stub(args.port, latency_s=args.latency_s, error_rate=args.error_rate,
+                                slow_rate=args.slow_rate, slow_s=args.slow_s,
+                                max_concurrency=args.max_concurrency, lognormal_sigma=args.lognormal_sigma)
+    print(f"Stub serving on {url} (OPENAI_BASE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+HNSW parameter sweep for the Chroma collection (Settings.hnsw_*), no API calls.
+
+Vectors come from our collection (CURRENT index version, else CHROMA_DB_PATH) or, with
+--synthetic N, from the Matryoshka-like generator of bench_quantized_index. --queries of them are
+held out as queries, the rest is indexed once per (space, M, construction_ef), then every search_ef
+is applied to the built collection. Reported: build time, index size on disk, query latency
+(p50/p95, one query per call like RAGAgent) and recall@k against exact brute-force search in the
+same metric. The recommendation is the fastest setting that reaches --target recall.
+Run from src/:
+    python -m scripts.tune_hnsw --queries 200 --k 5
+    python -m scripts.tune_hnsw --synthetic 20000 --m 8 16 32 --construction-ef 64 100 200
+"""
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+
+def load_collection(batch_size=5000):
+    import chromadb
+    from rag_nakamo.settings import get_settings
+    from rag_nakamo.vectorstore.versions import IndexVersions
+    settings = get_settings()
+    path = settings.chroma_db_path
+    if settings.index_root and IndexVersions(settings.index_root).current():
+        versions = IndexVersions(settings.index_root)
+        path = versions.paths(versions.current())["chroma_db_path"]
+    collection = chromadb.PersistentClient(path=path).get_collection(settings.chroma_collection_name)
+    rows = [collection.get(limit=batch_size, offset=offset, include=["embeddings"])["embeddings"]
+            for offset in range(0, collection.count(), batch_size)]
+    print(f"{collection.count()} vectors from {path}")
+    return np.concatenate(rows).astype(np.float32)
+
+
+def exact_top_k(docs, queries, k, space):
+    if space == "l2":
+        scores = -(np.sum(docs ** 2, axis=1)[None, :] - 2 * queries @ docs.T)
+    elif space == "cosine":
+        scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ (
+            docs / np.linalg.norm(docs, axis=1, keepdims=True)).T
+    else:
+        scores = queries @ docs.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="N synthetic vectors instead of the collection")
+    parser.add_argument("--dims", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--space", nargs="+", default=None, choices=["cosine", "l2", "ip"])
+    parser.add_argument("--m", nargs="+", type=int, default=[8, 16, 32])
+    parser.add_argument("--construction-ef", nargs="+", type=int, default=[100, 200])
+    parser.add_argument("--search-ef", nargs="+", type=int, default=[10, 20, 40, 100, 200])
+    parser.add_argument("--target", type=float, default=0.95, help="recall@k the recommendation must reach")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+    from rag_nakamo.settings import get_settings
+    from rag_nakamo.vectorstore.chroma_manager import set_search_ef
+
+    settings = get_settings()
+    if args.synthetic:
+        from scripts.bench_quantized_index import synthetic
+        vectors, _ = synthetic(args.synthetic, 1, args.dims, clusters=max(10, args.synthetic // 200))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)  # unit length, as OpenAI embeddings
+    else:
+        vectors = load_collection()
+    rng = np.random.default_rng(0)
+    held_out = rng.choice(len(vectors), size=min(args.queries, len(vectors) // 10), replace=False)
+    mask = np.ones(len(vectors), dtype=bool)
+    mask[held_out] = False
+    docs, queries = vectors[mask], vectors[held_out]
+    print(f"{len(docs)} indexed x {docs.shape[1]} dims, {len(queries)} held-out queries, recall@{args.k}\n")
+
+    print(f"{'space':>6} {'M':>3} {'c_ef':>4} {'build s':>7} {'MB':>6} {'s_ef':>4} {'p50 ms':>6} {'p95 ms':>6} {'recall':>6}")
+    rows = []
+    for space in args.space or [settings.hnsw_space]:
+        truth = exact_top_k(docs, queries, args.k, space)
+        for m in args.m:
+            for construction_ef in args.construction_ef:
+                work = tempfile.mkdtemp()
+                collection = chromadb.PersistentClient(path=work).create_collection("tune", metadata={
+                    "hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef})
+                start = time.perf_counter()
+                for lo in range(0, len(docs), 5000):
+                    collection.add(ids=[str(i) for i in range(lo, min(lo + 5000, len(docs)))],
+                                   embeddings=docs[lo:lo + 5000])
+                build_s = time.perf_counter() - start
+                size_mb = dir_size(work) / 1e6
+                for search_ef in args.search_ef:
+                    set_search_ef(collection, search_ef)
+                    # a loaded index keeps its beam, reopen as a newly started agent would
+                    SharedSystemClient.clear_system_cache()
+                    collection = chromadb.PersistentClient(path=work).get_collection("tune")
+                    collection.query(query_embeddings=[queries[0]], n_results=args.k, include=[])
+                    latencies, found = [], []
+                    for query in queries:
+                        start = time.perf_counter()
+                        res = collection.query(query_embeddings=[query], n_results=args.k, include=[])
+                        latencies.append(time.perf_counter() - start)
+                        found.append({int(i) for i in res["ids"][0]})
+                    recall = statistics.mean(len(f & t) / args.k for f, t in zip(found, truth))
+                    p50 = statistics.median(latencies) * 1e3
+                    p95 = statistics.quantiles(latencies, n=20)[18] * 1e3
+                    rows.append((space, m, construction_ef, build_s, size_mb, search_ef, p50, p95, recall))
+                    print(f"{space:>6} {m:3d} {construction_ef:4d} {build_s:7.1f} {size_mb:6.0f} {search_ef:4d} "
+                          f"{p50:6.2f} {p95:6.2f} {recall:6.3f}", flush=True)
+                shutil.rmtree(work, ignore_errors=True)
+
+    good = [r for r in rows if r[8] >= args.target]
+    if not good:
+        print(f"\nno setting reaches recall {args.target}, best {max(r[8] for r in rows):.3f}: raise M / ef")
+        return
+    space, m, construction_ef, build_s, _, search_ef, _, p95, recall = min(good, key=lambda r: (r[7], r[3]))
+    print(f"\nfastest with recall@{args.k} >= {args.target}: p95 {p95:.2f} ms, recall {recall:.3f}, build {build_s:.1f}s")
+    print(f"  HNSW_SPACE={space} HNSW_M={m} HNSW_CONSTRUCTION_EF={construction_ef} HNSW_SEARCH_EF={search_ef}")
+    print("  (space, M and construction_ef apply to the next ingestion; search_ef can be set on a built collection "
+          "with chroma_manager.set_search_ef)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the package lives in src/ (scripts run from there), no install needed for the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
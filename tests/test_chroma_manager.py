@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+from rag_nakamo.vectorstore.chroma_manager import collection_space, relevance_score
+
+
+def unit(rng, n, dims=16):
+    vectors = rng.normal(size=(n, dims)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+def test_relevance_score_is_the_cosine_similarity_in_every_space(tmp_path, space):
+    rng = np.random.default_rng(1)
+    docs, query = unit(rng, 20), unit(rng, 1)[0]
+    collection = chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection(
+        f"docs_{space}", metadata={"hnsw:space": space})
+    collection.add(ids=[str(i) for i in range(20)], embeddings=docs)
+    assert collection_space(collection) == space
+    res = collection.query(query_embeddings=[query], n_results=5, include=["distances"])
+    scores = [relevance_score(d, space) for d in res["distances"][0]]
+    expected = [float(docs[int(i)] @ query) for i in res["ids"][0]]
+    assert scores == pytest.approx(expected, abs=1e-4)
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_space_from_the_configuration_when_the_metadata_has_none(tmp_path):
+    collection = chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection(
+        "configured", configuration={"hnsw": {"space": "ip"}})
+    assert not (collection.metadata or {}).get("hnsw:space")
+    assert collection_space(collection) == "ip"
+    assert collection_space(SimpleNamespace(metadata=None, configuration_json={"hnsw": {"space": "cosine"}})) == "cosine"
+    assert collection_space(SimpleNamespace(metadata={}, configuration_json=None)) == "l2"  # Chroma's default
+    assert collection_space(SimpleNamespace(metadata=None)) == "l2"  # older chromadb: no configuration_json
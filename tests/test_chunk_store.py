@@ -0,0 +1,66 @@
+import os
+import threading
+
+from rag_nakamo.vectorstore.chunk_store import INDEX_RECORD, ChunkStore, chunk_id
+
+
+def test_round_trip_and_dedup(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    ids = store.add_many(["alpha", "beta", "alpha"])
+    assert ids[0] == ids[2] and len(store) == 2
+    assert store.get_many(ids) == ["alpha", "beta", "alpha"]
+    assert ChunkStore(str(tmp_path)).get(ids[1]) == "beta"  # reopened from disk
+
+
+def test_remap_keeps_the_old_map_open(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    first = store.add("first chunk")
+    assert store.get(first) == "first chunk"
+    old = store._mmap
+    second = store.add("second chunk, appended after the first map")
+    assert store.get(second).startswith("second chunk")  # remaps
+    assert store._mmap is not old
+    assert not old.closed  # a reader still slicing it is not cut off
+    assert old[0:1]
+
+
+def test_reads_while_appending(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    ids = store.add_many([f"chunk {i}" for i in range(10)])
+    errors, done = [], threading.Event()
+
+    def read():
+        while not done.is_set():
+            try:
+                for i, cid in enumerate(list(ids)):
+                    assert store.get(cid) == f"chunk {i}"
+            except Exception as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    [t.start() for t in readers]
+    for i in range(10, 300):
+        ids.append(store.add(f"chunk {i}"))  # every append grows the file past the current map
+    done.set()
+    [t.join() for t in readers]
+    assert errors == []
+
+
+def test_concurrent_adds_store_each_text_once(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    texts = [f"shared chunk {i}" for i in range(50)]
+    start = threading.Barrier(8)
+
+    def add():
+        start.wait()
+        store.add_many(texts)
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store) == 50
+    assert os.path.getsize(store.idx_path) == 50 * INDEX_RECORD.size  # no duplicate records
+    assert store.get_many([chunk_id(t) for t in texts]) == texts
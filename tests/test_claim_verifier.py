@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from rag_nakamo.agents.claim_verifier import ClaimVerifier, DocTermIndex, SentenceStream, claim_terms
+
+DOCS = [
+    {"content": "Manufacturers shall establish a post-market surveillance system (PMS), Article 83."},
+    {"content": "The notified body assesses the technical documentation of class IIb devices."},
+    {"content": 42},  # not text, ignored
+]
+
+
+def old_supported(claim, docs):
+    """The check the index replaced: substring search of every term in every doc."""
+    doc_texts = [d["content"].lower() for d in docs if isinstance(d["content"], str)]
+    terms = claim_terms(claim)
+    count = sum(any(token in doc_text for doc_text in doc_texts) for token in terms)
+    return bool(terms) and count >= max(1, len(terms) * 0.3)
+
+
+@pytest.mark.parametrize("term, found", [
+    ("surveillance", True),
+    ("surveil", True),  # prefix of a word
+    ("market", True),  # inside "post-market"
+    ("otified", True),  # inside a word
+    ("documentations", False),  # longer than any doc word
+    ("market surveillance", False),  # spans two words, claim terms never do
+    ("iib", True),
+    ("absent", False),
+])
+def test_term_lookup_matches_substring_search(term, found):
+    index = DocTermIndex([d["content"] for d in DOCS if isinstance(d["content"], str)])
+    assert index.contains(term) is found
+    assert index.contains(term) is found  # memoized
+
+
+def test_lexical_support_matches_the_old_check():
+    rng = random.Random(0)
+    words = ("surveil notified technical documentation assesses marketing established body bodies article "
+             "quality unrelated devicemaker ocumen").split()
+    claims = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 9))) for _ in range(300)]
+    verifier = ClaimVerifier()
+    supported, unsupported = verifier.check(claims, DOCS)
+    assert supported == [c for c in claims if old_supported(c, DOCS)]
+    assert unsupported == [c for c in claims if not old_supported(c, DOCS)]
+
+
+def test_claim_without_terms_is_unsupported():
+    assert ClaimVerifier().check(["It is a device."], DOCS) == ([], ["It is a device."])
+
+
+def test_embedding_mode_scores_every_claim_against_every_chunk():
+    vectors = {
+        "claim a": [1.0, 0.0, 0.0],
+        "claim b": [0.0, 2.0, 0.0],  # not unit length
+        "claim c": [0.6, 0.0, 0.8],
+        "doc 1": [0.9, 0.1, 0.0],
+        "doc 2": [0.0, 0.0, 1.0],
+    }
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [vectors[t] for t in texts]
+
+    verifier = ClaimVerifier(mode="embedding", embed_fn=embed, similarity_threshold=0.75)
+    supported, unsupported = verifier.check(["claim a", "claim b", "claim c"],
+                                            [{"content": "doc 1"}, {"content": "doc 2"}])
+    assert supported == ["claim a", "claim c"]  # cos 0.99 with doc 1, 0.8 with doc 2
+    assert unsupported == ["claim b"]  # cos 0.11 at best
+    assert calls == [["claim a", "claim b", "claim c", "doc 1", "doc 2"]]  # one embedding call
+
+
+def test_embedding_mode_without_docs_or_embed_fn():
+    assert ClaimVerifier(mode="embedding", embed_fn=lambda t: []).check(["claim"], []) == ([], ["claim"])
+    with pytest.raises(ValueError):
+        ClaimVerifier(mode="embedding")
+
+
+def test_sentence_stream_matches_split_of_the_full_text():
+    text = "First claim. Second one!  Third?\nLast without end"
+    stream, sentences = SentenceStream(), []
+    for i in range(0, len(text), 3):
+        sentences += stream.feed(text[i:i + 3])
+    sentences += stream.flush()
+    assert sentences == SentenceStream.BOUNDARY.split(text)
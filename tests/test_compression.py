@@ -0,0 +1,69 @@
+import numpy as np
+
+from rag_nakamo.compression import ContextCompressor, bm25_scores, split_sentences
+from rag_nakamo.tokens import estimate_tokens
+
+FILLER = "The committee met on a Tuesday and the minutes were circulated afterwards."
+
+
+def doc(content, source="a.pdf", page=1, rank=1):
+    return {"content": content, "source": source, "page": page, "rank": rank, "relevance_score": 0.5}
+
+
+def test_split_sentences_joins_short_fragments():
+    text = "Design validation is required. See 4.2.\n\nRisk files must be kept up to date."
+    assert split_sentences(text) == ["Design validation is required. See 4.2.", "Risk files must be kept up to date."]
+
+
+def test_bm25_prefers_sentences_with_query_terms():
+    sentences = [FILLER, "Design validation confirms the device meets user needs.", "Validation of design."]
+    scores = bm25_scores("What is design validation?", sentences)
+    assert scores[0] == 0 and scores[1] > 0 and scores[2] > scores[1]  # shorter sentence, same terms
+    assert not bm25_scores("the of", sentences).any()  # stopwords only
+
+
+def test_under_budget_is_unchanged():
+    docs = [doc("Short context about design validation.")]
+    compressed, stats = ContextCompressor(token_budget=1000).compress("design validation", docs)
+    assert compressed == docs and stats["tokens_out"] == stats["tokens_in"]
+
+
+def test_selects_relevant_sentences_within_budget():
+    relevant = "Design validation must be performed under defined operating conditions."
+    docs = [doc(" ".join([FILLER] * 5 + [relevant] + [FILLER] * 5), page=1),
+            doc(" ".join([FILLER] * 8), source="b.pdf", page=3, rank=2)]
+    compressor = ContextCompressor(token_budget=40)
+    compressed, stats = compressor.compress("design validation requirements", docs)
+    assert stats["tokens_out"] <= 40 < stats["tokens_in"]
+    assert relevant in compressed[0]["content"] and compressed[0]["source"] == "a.pdf"
+    assert compressed[0]["rank"] == 1 and compressed[0]["page"] == 1  # other fields kept
+    assert compressed[0]["content"] == relevant  # the rest of the budget went to b.pdf's best sentence
+
+
+def test_every_document_keeps_its_best_sentence_first():
+    docs = [doc(f"Risk management file number {i} must be reviewed. " + " ".join([FILLER] * 6), page=i)
+            for i in range(3)]
+    compressed, _ = ContextCompressor(token_budget=60).compress("risk management review", docs)
+    assert [d["page"] for d in compressed] == [0, 1, 2]
+    assert all(d["content"].startswith("Risk management") for d in compressed)
+
+
+def test_neighbors_keep_adjacent_sentences():
+    sentences = [f"Sentence number {i} talks about topic {i} in detail." for i in range(10)]
+    sentences[5] = "Software verification is described in this sentence."
+    docs = [doc(" ".join(sentences))]
+    budget = sum(estimate_tokens(s) + 1 for s in sentences[4:7])
+    compressed, _ = ContextCompressor(token_budget=budget, neighbors=1).compress("software verification", docs)
+    assert compressed[0]["content"] == " ".join(sentences[4:7])
+
+
+def test_embedding_scoring_uses_the_embeddings():
+    class Embeddings:
+        def embed_documents(self, texts):
+            return [[1.0, 0.0] if "validation" in t else [0.0, 1.0] for t in texts]
+
+        def embed_query(self, text):
+            return [1.0, 0.0]
+
+    scores = ContextCompressor(method="embedding").score("q", [FILLER, "validation sentence here."], Embeddings())
+    assert np.allclose(scores, [0.0, 1.0])
@@ -0,0 +1,47 @@
+from rag_nakamo.conversation import ConversationStore, Turn, extractive_summary, format_history
+
+
+def test_least_recently_used_conversation_is_evicted():
+    store = ConversationStore(max_conversations=2)
+    store.append("a", "user", "first")
+    store.append("b", "user", "second")
+    store.get("a")  # a is now more recent than b
+    store.append("c", "user", "third")
+    assert len(store) == 2 and store.stats["evicted_conversations"] == 1
+    assert store.get("b") == ("", [])
+    assert store.get("a")[1] == [Turn("user", "first")]
+
+
+def test_turns_are_trimmed_to_max_turns_and_summarized():
+    store = ConversationStore(max_turns=3)
+    for i in range(5):
+        store.append("a", "user" if i % 2 == 0 else "assistant", f"Turn {i}. More detail on turn {i}.")
+    summary, turns = store.get("a")
+    assert [t.content for t in turns] == [f"Turn {i}. More detail on turn {i}." for i in (2, 3, 4)]
+    assert summary == "user: Turn 0.\nassistant: Turn 1."  # first sentence of each evicted turn
+    assert store.stats == {"appended": 5, "summarized": 2, "evicted_conversations": 0}
+
+
+def test_summary_keeps_the_newest_lines_within_the_cap():
+    summary = ""
+    for i in range(50):
+        summary = extractive_summary(summary, Turn("user", f"Question number {i} about design controls."), 120)
+        assert len(summary) <= 120
+    assert summary.endswith("user: Question number 49 about design controls.")
+    assert all(line.startswith("user: ") for line in summary.split("\n"))  # no line cut in the middle
+
+    store = ConversationStore(max_turns=1, max_summary_chars=100)
+    for i in range(20):
+        store.append("a", "user", f"Question number {i} about design controls.")
+    assert len(store.get("a")[0]) <= 100
+
+
+def test_long_turns_are_truncated():
+    store = ConversationStore(max_turn_chars=10)
+    store.append("a", "assistant", "x" * 50)
+    assert store.get("a")[1] == [Turn("assistant", "x" * 10)]
+
+
+def test_format_history():
+    assert format_history("user: Earlier.", [Turn("user", "Now?")]) == "(earlier) user: Earlier.\nuser: Now?"
+    assert format_history("", []) == ""
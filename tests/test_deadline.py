@@ -0,0 +1,37 @@
+import math
+import time
+
+import pytest
+
+from rag_nakamo.deadline import Deadline, client_budget
+
+
+def test_from_budget_none_or_zero_is_no_deadline():
+    assert Deadline.from_budget(None) is None
+    assert Deadline.from_budget(0) is None
+
+
+def test_degrade_fires_below_threshold_and_records():
+    deadline = Deadline(1.0)
+    assert not deadline.degrade("rerank", below_s=0.1)
+    assert deadline.degrade("top_k", below_s=5.0)
+    assert deadline.fired == ["top_k"]
+    assert 0 < deadline.degradations[0]["remaining_s"] <= 1.0
+
+
+def test_remaining_never_negative():
+    deadline = Deadline(0.001)
+    time.sleep(0.01)
+    assert deadline.remaining() == 0.0
+    assert deadline.elapsed() >= 0.01
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), (0.01, 2.0), (30, 30.0), (1e9, 120.0)])
+def test_client_budget_is_clamped(value, expected):
+    assert client_budget(value, 2.0, 120.0) == expected
+
+
+@pytest.mark.parametrize("value", ["5", "fast", True, [1], {"s": 1}, math.nan, math.inf])
+def test_client_budget_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        client_budget(value, 2.0, 120.0)
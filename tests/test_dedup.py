@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from rag_nakamo.vectorstore.dedup import (MinHasher, cleanup_report, dedup_chunks, find_near_duplicates, lsh_params,
+                                          strip_page_furniture)
+
+WORDS = ("device software validation risk management design control record requirement manufacturer "
+         "quality system audit process procedure verification review change clinical label").split()
+
+
+def passage(seed, n=80):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def test_signature_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    a = passage(1, 200)
+    b = a.replace(a.split()[100], "changed", 1)
+    assert (hasher.signature(a) == hasher.signature(a)).all()
+    assert (hasher.signature(a) == hasher.signature(b)).mean() > 0.8
+    assert (hasher.signature(a) == hasher.signature(passage(2, 200))).mean() < 0.3
+    assert hasher.signature("").shape == (256,)
+
+
+def test_lsh_params_split_the_permutations():
+    bands, rows = lsh_params(128, 0.85)
+    assert bands * rows == 128 and bands > 1
+
+
+def test_near_duplicates_point_at_the_first_copy():
+    base = passage(1)
+    texts = [base, passage(2), base + " Revision 2.", passage(3), base]
+    assert find_near_duplicates(texts, threshold=0.85) == [None, None, 0, None, 0]
+
+
+def test_dedup_chunks_merge_records_duplicates():
+    base = passage(1)
+    chunks = [Document(page_content=base, metadata={"source": "a.pdf", "page": 1}),
+              Document(page_content=passage(2), metadata={"source": "a.pdf", "page": 2}),
+              Document(page_content=base, metadata={"source": "b.pdf", "page": 7})]
+    kept, stats = dedup_chunks(chunks, merge=True)
+    assert kept == chunks[:2] and stats == {"chunks_removed": 1, "removed_chars": len(base)}
+    assert kept[0].metadata["duplicates"] == 1 and kept[0].metadata["duplicate_pages"] == "b.pdf:7"
+    kept, _ = dedup_chunks([Document(page_content=base, metadata={}), Document(page_content=base, metadata={})],
+                           merge=False)
+    assert "duplicates" not in kept[0].metadata
+
+
+def test_strip_page_furniture():
+    pages = [Document(page_content=f"ACME Guidance Document\n{passage(i)}\nConfidential - rev {i}\n{i}",
+                      metadata={"source": "a.pdf", "page": i}) for i in range(10)]
+    pages[0].page_content = "CHAPTER 1\n" + pages[0].page_content
+    stats = strip_page_furniture(pages)
+    assert stats["furniture_patterns"] == 3  # header, footer and page number, modulo the digits
+    assert all("ACME" not in p.page_content and "Confidential" not in p.page_content for p in pages)
+    assert pages[0].page_content.startswith("CHAPTER 1")
+    assert pages[3].page_content == passage(3)
+    assert "30 furniture lines" in cleanup_report(10, 10, stats, 0)
+
+
+@pytest.mark.parametrize("perms", [64, 128])
+def test_no_false_positives_on_distinct_passages(perms):
+    texts = [passage(seed) for seed in range(200)]
+    assert all(match is None for match in find_near_duplicates(texts, 0.85, perms))
+    assert np.isfinite(MinHasher(perms).signature(texts[0]).astype(float)).all()
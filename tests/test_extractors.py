@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from rag_nakamo.vectorstore import extractors
+from rag_nakamo.vectorstore.extractors import PageCache, choose_backend, extract_pages, file_hash
+
+
+@pytest.mark.parametrize("file_name, expected", [
+    ("WHO_guidance.pdf", "pdfminer"),
+    ("scans/FDA_scan_01.pdf", "pypdfium2"),  # matched on the file name, not the path
+    ("FDA_design.pdf", "pypdf"),  # no override: the default
+    ("who_lowercase.pdf", "pypdf"),  # case sensitive (POSIX)
+])
+def test_overrides_match_the_file_name(file_name, expected):
+    overrides = {"WHO_*.pdf": "pdfminer", "*_scan_*.pdf": "pypdfium2"}
+    assert choose_backend(file_name, "pypdf", overrides) == expected
+
+
+def test_first_matching_override_wins():
+    overrides = {"WHO_*.pdf": "pdfminer", "*.pdf": "pypdfium2"}
+    assert choose_backend("WHO_x.pdf", "pypdf", overrides) == "pdfminer"
+    assert choose_backend("EU_x.pdf", "pypdf", overrides) == "pypdfium2"
+
+
+def test_auto_picks_the_first_installed_backend(monkeypatch):
+    monkeypatch.setattr(extractors, "available_backends", lambda: ["pypdf", "pdfminer"])
+    assert choose_backend("a.pdf", "auto") == "pypdf"
+    monkeypatch.setattr(extractors, "available_backends", lambda: ["pdfminer", "pypdfium2"])
+    assert choose_backend("a.pdf", "auto") == "pypdfium2"
+    monkeypatch.setattr(extractors, "available_backends", lambda: [])
+    assert choose_backend("a.pdf", "auto") == "pypdf"  # nothing installed: the import error comes on use
+    assert choose_backend("WHO_a.pdf", "pypdf", {"WHO_*": "auto"}) == "pypdf"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown PDF backend"):
+        choose_backend("a.pdf", "tesseract")
+
+
+@pytest.fixture
+def counting_backends(monkeypatch):
+    calls = []
+
+    def backend(name):
+        def extract(path):
+            calls.append((name, os.path.basename(path)))
+            with open(path) as f:
+                return [f"{name}: {line}" for line in f.read().splitlines()]
+        return extract
+
+    for name in ("pypdf", "pdfminer"):
+        monkeypatch.setitem(extractors.EXTRACTORS, name, backend(name))
+    return calls
+
+
+def test_cache_is_keyed_by_content_hash_and_backend(tmp_path, counting_backends):
+    cache = PageCache(str(tmp_path / "cache"))
+    doc = tmp_path / "a.pdf"
+    doc.write_text("page one\npage two")
+
+    assert extract_pages(str(doc), "pypdf", cache) == ["pypdf: page one", "pypdf: page two"]
+    assert extract_pages(str(doc), "pypdf", cache) == ["pypdf: page one", "pypdf: page two"]
+    assert counting_backends == [("pypdf", "a.pdf")] and cache.stats == {"hits": 1, "misses": 1}
+
+    assert extract_pages(str(doc), "pdfminer", cache)[0] == "pdfminer: page one"  # other backend: parsed
+    copy = tmp_path / "renamed.pdf"
+    copy.write_text("page one\npage two")
+    assert extract_pages(str(copy), "pypdf", cache)[0] == "pypdf: page one"  # same content: cached
+    doc.write_text("page one, revised")
+    assert extract_pages(str(doc), "pypdf", cache) == ["pypdf: page one, revised"]  # changed content: parsed
+    assert counting_backends == [("pypdf", "a.pdf"), ("pdfminer", "a.pdf"), ("pypdf", "a.pdf")]
+    assert sorted(os.listdir(cache.path)) == sorted(
+        f"{digest}-{backend}-v{extractors.CACHE_VERSION}.json.zst"
+        for digest, backend in [(file_hash(str(copy)), "pypdf"), (file_hash(str(copy)), "pdfminer"),
+                                (file_hash(str(doc)), "pypdf")])
+
+
+def test_corrupt_cache_file_is_a_miss(tmp_path, counting_backends):
+    cache = PageCache(str(tmp_path / "cache"))
+    doc = tmp_path / "a.pdf"
+    doc.write_text("page one")
+    extract_pages(str(doc), "pypdf", cache)
+    (cached,) = os.listdir(cache.path)
+    with open(os.path.join(cache.path, cached), "wb") as f:
+        f.write(b"not zstd")
+    assert extract_pages(str(doc), "pypdf", cache) == ["pypdf: page one"]
+    assert len(counting_backends) == 2 and cache.stats["hits"] == 0
+
+
+def test_without_cache_every_call_parses(tmp_path, counting_backends):
+    doc = tmp_path / "a.pdf"
+    doc.write_text("page one")
+    extract_pages(str(doc), "pypdf")
+    extract_pages(str(doc), "pypdf")
+    assert len(counting_backends) == 2
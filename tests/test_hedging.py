@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from rag_nakamo.llm.hedging import HedgedCompletions, HedgePolicy, quantile
+
+
+class ScriptedCompletions:
+    """create() sleeps for the next scripted latency (default: fast), or blocks on an event."""
+
+    def __init__(self, latencies=()):
+        self.latencies = list(latencies)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+            latency = self.latencies.pop(0) if self.latencies else 0.0
+        if isinstance(latency, threading.Event):
+            latency.wait(5)
+        else:
+            time.sleep(latency)
+        return f"answer {n}"
+
+
+def warmed(policy, latency=0.01, samples=20):
+    for _ in range(samples):
+        policy.record(policy.attempt_latencies, latency)
+    return policy
+
+
+def test_trigger_is_the_quantile_once_there_are_enough_samples():
+    policy = HedgePolicy("t", quantile=0.9, min_samples=20, min_delay_s=0.0)
+    for i in range(19):
+        policy.record(policy.attempt_latencies, (i + 1) / 100)
+    assert policy.delay() is None  # 19 samples: no hedging yet
+    policy.record(policy.attempt_latencies, 0.20)
+    assert policy.delay() == quantile([(i + 1) / 100 for i in range(20)], 0.9) == 0.19
+    assert HedgePolicy("t", min_samples=1, min_delay_s=0.05).delay() is None
+    assert warmed(HedgePolicy("t", min_delay_s=0.05), latency=0.001).delay() == 0.05  # floor
+
+
+def test_no_hedge_before_min_samples():
+    completions = ScriptedCompletions([0.05] * 5)
+    hedged = HedgedCompletions(completions, HedgePolicy("t", budget=1.0, min_samples=20))
+    for _ in range(5):
+        hedged.create(model="m")
+    assert completions.calls == 5 and hedged.policy.stats["hedges"] == 0
+
+
+def test_no_hedge_for_calls_faster_than_the_trigger():
+    policy = warmed(HedgePolicy("t", budget=1.0, min_delay_s=0.05), latency=0.2)
+    completions = ScriptedCompletions([0.01] * 5)
+    hedged = HedgedCompletions(completions, policy)
+    for _ in range(5):
+        hedged.create(model="m")
+    assert completions.calls == 5 and policy.stats["hedges"] == 0
+
+
+def test_hedges_stay_within_the_budget():
+    # enough fast samples that the slow calls below do not move the p90
+    policy = warmed(HedgePolicy("t", budget=0.25, min_delay_s=0.01), samples=500)
+    completions = ScriptedCompletions([0.05] * 100)  # every call is slower than the trigger
+    hedged = HedgedCompletions(completions, policy)
+    for _ in range(12):
+        hedged.create(model="m")
+    assert policy.stats["calls"] == 12
+    assert policy.stats["hedges"] == 3  # credit reaches 1.0 every 4th call
+    assert policy.snapshot()["hedge_rate"] == 0.25
+
+
+def test_credit_is_capped():
+    policy = HedgePolicy("t", budget=0.5, max_credit=2.0)
+    for _ in range(100):
+        policy.start_call()
+    assert [policy.take_hedge() for _ in range(3)] == [True, True, False]
+
+
+def test_hedge_wins_over_a_stuck_primary():
+    stuck = threading.Event()
+    policy = warmed(HedgePolicy("t", budget=1.0, min_delay_s=0.01))
+    completions = ScriptedCompletions([stuck, 0.0])
+    start = time.perf_counter()
+    assert HedgedCompletions(completions, policy).create(model="m") == "answer 2"
+    assert time.perf_counter() - start < 1.0
+    assert policy.stats["hedges"] == 1 and policy.stats["hedge_wins"] == 1
+    stuck.set()
+
+
+def test_loser_not_yet_dispatched_is_cancelled():
+    # one worker: the hedge queues behind the primary, which then answers first (the worker
+    # picks the hedge up at once, it must not reach the provider)
+    policy = warmed(HedgePolicy("t", budget=1.0, min_delay_s=0.01))
+    completions = ScriptedCompletions([0.1])
+    hedged = HedgedCompletions(completions, policy, max_workers=1)
+    assert hedged.create(model="m") == "answer 1" and policy.stats["hedges"] == 1
+    time.sleep(0.05)  # skipped by the worker, possibly after create returned
+    assert policy.stats["losers_cancelled"] == 1
+    assert completions.calls == 1  # the duplicate never reached the provider
+
+
+def test_error_of_one_attempt_falls_back_to_the_other():
+    class Flaky(ScriptedCompletions):
+        def create(self, **kwargs):
+            result = super().create(**kwargs)
+            if result == "answer 1":
+                raise ConnectionError("reset")
+            return result
+
+    policy = warmed(HedgePolicy("t", budget=1.0, min_delay_s=0.01))
+    assert HedgedCompletions(Flaky([0.05, 0.1]), policy).create(model="m") == "answer 2"
+    with pytest.raises(ConnectionError):
+        HedgedCompletions(Flaky([0.0]), HedgePolicy("t")).create(model="m")
+
+
+def test_streams_are_not_hedged():
+    completions = ScriptedCompletions()
+    policy = warmed(HedgePolicy("t", budget=1.0))
+    assert HedgedCompletions(completions, policy).create(model="m", stream=True) == "answer 1"
+    assert policy.stats["calls"] == 0
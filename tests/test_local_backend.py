@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from rag_nakamo.llm.local import LocalBackend, LocalChatClient
+
+
+class RecordingEngine:
+    """Answers with the batch's temperatures, optionally blocking until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate(self, batch):
+        self.release.wait()
+        self.batches.append([r.temperature for r in batch])
+        return [(f"t={r.temperature}", 1, 1) for r in batch]
+
+
+def test_batches_never_mix_temperatures():
+    engine = RecordingEngine()
+    engine.release.clear()
+    backend = LocalBackend(engine, max_batch=4, batch_wait_ms=50)
+    blocker = backend.submit([{"role": "user", "content": "first"}], temperature=0.0)
+    time.sleep(0.1)  # the worker holds the first batch while the rest queues up
+    futures = [backend.submit([{"role": "user", "content": str(i)}], temperature=t)
+               for i, t in enumerate([0.7, 0.0, 0.7, 0.0, 0.0])]
+    engine.release.set()
+    assert blocker.result(timeout=2)[0] == "t=0.0"
+    assert [f.result(timeout=2)[0] for f in futures] == ["t=0.7", "t=0.0", "t=0.7", "t=0.0", "t=0.0"]
+    assert all(len(set(batch)) == 1 for batch in engine.batches)
+
+
+def test_create_honours_timeout():
+    engine = RecordingEngine()
+    engine.release.clear()
+    client = LocalChatClient(LocalBackend(engine, max_batch=1, batch_wait_ms=0))
+    client.backend.submit([{"role": "user", "content": "busy"}])
+    time.sleep(0.05)
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        client.chat.completions.create(messages=[{"role": "user", "content": "late"}], timeout=0.1)
+    assert time.perf_counter() - start < 1.0
+    engine.release.set()
+    time.sleep(0.1)
+    assert engine.batches == [[0.0]]  # the timed out request was dropped, not generated
+
+
+def test_create_returns_openai_shape():
+    client = LocalChatClient(LocalBackend(RecordingEngine()))
+    completion = client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], temperature=0.0)
+    assert completion.choices[0].message.content == "t=0.0"
+    assert completion.usage.total_tokens == 2
+
+
+def test_stuck_ollama_server_fails_the_batch_not_the_worker():
+    import socket
+    from rag_nakamo.llm.local import OllamaEngine
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)  # accepts connections, never answers
+    engine = OllamaEngine(f"http://127.0.0.1:{server.getsockname()[1]}", "m", max_batch=1, timeout_s=0.2)
+    backend = LocalBackend(engine, max_batch=1, batch_wait_ms=0)
+    try:
+        with pytest.raises(Exception, match="timed out"):
+            backend.submit([{"role": "user", "content": "hi"}]).result(timeout=5)
+        engine.client.close()
+        backend.engine = RecordingEngine()
+        assert backend.submit([{"role": "user", "content": "next"}]).result(timeout=5)[0] == "t=0.0"
+        assert backend.snapshot()["batches"] == 2
+    finally:
+        server.close()
@@ -0,0 +1,91 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from rag_nakamo import logger_config
+from rag_nakamo.logger_config import LazyJson, setup_logging
+
+
+@pytest.fixture
+def queued_json_log():
+    stream = io.StringIO()
+    setup_logging(level="DEBUG", fmt="json", use_queue=True, debug_sample_rate=1.0, stream=stream)
+    yield stream
+    logger_config._stop_listener()
+    logging.getLogger().handlers.clear()
+
+
+def flushed(stream):
+    logger_config._stop_listener()  # drains the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class RecordingPayload(LazyJson):
+    __slots__ = ("threads",)
+
+    def __init__(self, payload):
+        super().__init__(payload)
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return super().__str__()
+
+
+def test_lazy_payload_is_formatted_by_the_listener(queued_json_log):
+    payload = RecordingPayload({"order": [2, 1]})
+    logger = logging.getLogger("test.lazy")
+    logger.propagate = False  # pytest's own capture handlers on the root format in this thread
+    logger.handlers = [h for h in logging.getLogger().handlers if isinstance(h, logger_config.DroppingQueueHandler)]
+    logger.debug("Reranked: %s", payload)
+    entries = flushed(queued_json_log)
+    assert entries[0]["msg"] == 'Reranked: {"order": [2, 1]}'
+    assert threading.current_thread().name not in payload.threads
+
+
+def test_exception_survives_the_queue(queued_json_log):
+    try:
+        raise ValueError("bad chunk")
+    except ValueError:
+        logging.getLogger("test").exception("Ingestion failed")
+    entry = flushed(queued_json_log)[0]
+    assert entry["msg"] == "Ingestion failed"
+    assert "ValueError: bad chunk" in entry["exc"]
+
+
+def test_extra_fields_in_json(queued_json_log):
+    logging.getLogger("test").info("done", extra={"request_id": "abc"})
+    assert flushed(queued_json_log)[0]["request_id"] == "abc"
+
+
+def test_debug_sampling_drops_unsampled_queries():
+    stream = io.StringIO()
+    setup_logging(level="DEBUG", fmt="json", use_queue=False, debug_sample_rate=0.0, stream=stream)
+    try:
+        logger_config.sample_query()
+        logging.getLogger("test").debug("detail")
+        logging.getLogger("test").info("summary")
+    finally:
+        logger_config._debug_sampled.set(True)
+        logging.getLogger().handlers.clear()
+    assert [json.loads(line)["msg"] for line in stream.getvalue().splitlines()] == ["summary"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logger_config.DroppingQueueHandler(__import__("queue").Queue(maxsize=1))
+    record = logging.makeLogRecord({"msg": "x"})
+    handler.enqueue(record)
+    handler.enqueue(record)
+    assert handler.dropped == 1
+
+
+def test_plain_args_are_formatted_at_the_call(queued_json_log):
+    logger = logging.getLogger("test.args")
+    order = [2, 1]
+    logger.info("Order: %s", order)
+    order.append(3)  # changed after the call, before the listener formats
+    logger.info("Named: %(k)s", {"k": "v"})
+    assert [entry["msg"] for entry in flushed(queued_json_log)] == ["Order: [2, 1]", "Named: v"]
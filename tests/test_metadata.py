@@ -0,0 +1,69 @@
+import pytest
+
+from rag_nakamo.agents.rag import RAGAgent
+from rag_nakamo.settings import get_settings
+from rag_nakamo.vectorstore.metadata import (build_where, detect_authority, detect_publication_year,
+                                             filters_from_focus_areas)
+
+
+@pytest.mark.parametrize("filters, where", [
+    (None, None),
+    ({}, None),
+    ({"authority": None, "source": []}, None),
+    ({"authority": "FDA"}, {"authority": "FDA"}),
+    ({"authority": ["FDA", "WHO"]}, {"authority": {"$in": ["FDA", "WHO"]}}),
+    ({"year_min": "2015", "year_max": 2020},
+     {"$and": [{"publication_year": {"$gte": 2015}}, {"publication_year": {"$lte": 2020}}]}),
+    ({"$or": [{"authority": "FDA"}]}, {"$or": [{"authority": "FDA"}]}),
+])
+def test_build_where(filters, where):
+    assert build_where(filters) == where
+
+
+@pytest.mark.parametrize("focus_areas, filters", [
+    (None, {}),
+    (["software validation"], {}),
+    (["FDA", "software"], {"authority": ["FDA"]}),
+    (["FDA", "World Health Organization"], {}),  # both authorities: no filter
+])
+def test_filters_from_focus_areas(focus_areas, filters):
+    assert filters_from_focus_areas(focus_areas) == filters
+
+
+def test_detect_authority_and_year():
+    assert detect_authority("data/FDA_design_controls.pdf") == "FDA"
+    assert detect_authority("report.pdf", "Guidance of the World Health Organization") == "WHO"
+    assert detect_authority("report.pdf", "who knows") == "Unknown"
+    assert detect_publication_year("Document issued on March 11, 1997.") == 1997
+
+
+class RecordingRAG(RAGAgent):
+    """search_documents answers only unfiltered queries, like an index without the metadata."""
+
+    def __init__(self):
+        super().__init__(name="RAG Agent", description="RAG Agent")
+        self.settings = get_settings().model_copy(update={"enable_metadata_filters": True, "enable_rerank": False})
+        self.calls = []
+
+    def search_documents(self, query, filters=None, k=None):
+        from langchain_core.documents import Document
+        self.calls.append(filters)
+        return [] if filters else [Document(page_content="Design validation.", metadata={"source": "a.pdf"})]
+
+
+def test_focus_area_filters_fall_back_to_unfiltered_search():
+    agent = RecordingRAG()
+    results = agent.process_message({"original_question": "q", "arguments": {"focus_areas": ["FDA"]}})
+    assert agent.calls == [{"authority": ["FDA"]}, None]
+    assert results[0]["content"] == "Design validation."
+
+
+def test_explicit_filters_do_not_fall_back():
+    agent = RecordingRAG()
+    assert agent.process_message({"original_question": "q", "filters": {"authority": "WHO"}}) == []
+    assert agent.calls == [{"authority": "WHO"}]
+
+
+def test_metadata_filters_off_by_default():
+    from rag_nakamo.settings import Settings
+    assert Settings.model_fields["enable_metadata_filters"].default is False
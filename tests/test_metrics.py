@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from rag_nakamo import metrics
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def run(code, directory):
+    env = {**os.environ, "PYTHONPATH": SRC, "PROMETHEUS_MULTIPROC_DIR": str(directory)}
+    return subprocess.run([sys.executable, "-c", textwrap.dedent(code)], env=env, check=True,
+                          capture_output=True, text=True).stdout
+
+
+def sample(text, line_start):
+    return [float(line.split()[-1]) for line in text.splitlines() if line.startswith(line_start)]
+
+
+def test_exposition_of_this_process():
+    metrics.GUARD_DECISIONS.labels("block", "unavailable").inc()
+    text = metrics.exposition().decode()
+    assert sample(text, 'rag_guard_decisions_total{classifier="unavailable",decision="block"}')[0] >= 1
+
+
+def test_processes_are_merged(tmp_path):
+    job = """
+        from rag_nakamo.metrics import REQUESTS, REQUESTS_IN_FLIGHT
+        REQUESTS.labels("true", "success").inc(2)
+        REQUESTS_IN_FLIGHT.inc()
+    """
+    run(job, tmp_path)
+    run(job, tmp_path)
+    text = metrics.exposition(str(tmp_path)).decode()
+    assert sample(text, 'rag_requests_total{status="success",used_rag="true"}') == [4.0]
+    # exited processes (marked dead at exit) leave their counters, not their in-flight gauge
+    assert sample(text, "rag_requests_in_flight") in ([], [0.0])
+
+
+def test_files_of_dead_processes_are_removed(tmp_path):
+    run("from rag_nakamo.metrics import REQUESTS; REQUESTS.labels('true', 'success').inc()", tmp_path)
+    assert os.listdir(tmp_path)
+    assert metrics.remove_dead_processes(str(tmp_path)) >= 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".db")]
+
+
+def test_cli_writes_a_file(tmp_path):
+    run("from rag_nakamo.metrics import DEGRADATIONS; DEGRADATIONS.labels('skip_rerank').inc()", tmp_path)
+    out = tmp_path / "metrics.prom"
+    run(f"import sys; sys.argv = ['metrics', '--out', {str(out)!r}]; from rag_nakamo.metrics import main; main()",
+        tmp_path)
+    assert sample(out.read_text(), 'rag_degradations_total{step="skip_rerank"}') == [1.0]
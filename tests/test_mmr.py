@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from rag_nakamo.vectorstore.mmr import dedup_indices, mmr_select
+
+
+def reference_mmr(query, embeddings, k, lambda_mult):
+    """Textbook MMR, pairwise loops."""
+    unit = lambda v: v / np.linalg.norm(v)
+    docs, q = [unit(d) for d in embeddings], unit(query)
+    selected = []
+    while len(selected) < min(k, len(docs)):
+        best, best_score = None, -np.inf
+        for i, d in enumerate(docs):
+            if i in selected:
+                continue
+            redundancy = max((float(d @ docs[j]) for j in selected), default=0.0)
+            score = lambda_mult * float(d @ q) - (1 - lambda_mult) * redundancy if selected else float(d @ q)
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+    return selected
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.5, 0.7, 1.0])
+def test_matches_the_pairwise_definition(lambda_mult):
+    rng = np.random.default_rng(7)
+    embeddings = rng.standard_normal((40, 16)).astype(np.float32)
+    query = rng.standard_normal(16).astype(np.float32)
+    assert mmr_select(query, embeddings, 8, lambda_mult) == reference_mmr(query, embeddings, 8, lambda_mult)
+
+
+def test_skips_near_copies():
+    query = np.array([1.0, 0.0, 0.0])
+    embeddings = np.array([[1.0, 0.1, 0.0], [1.0, 0.1, 0.001], [0.8, 0.0, 0.6]])
+    assert mmr_select(query, embeddings, 2, 0.5) == [0, 2]
+    assert mmr_select(query, embeddings, 2, 1.0) == [0, 1]  # relevance only
+
+
+def test_edge_cases():
+    assert mmr_select([1.0, 0.0], np.zeros((0, 2)), 3) == []
+    assert mmr_select([1.0, 0.0], [[1.0, 0.0]], 0) == []
+    assert sorted(mmr_select([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], 5)) == [0, 1]
+
+
+def test_dedup_indices():
+    metadatas = [{"source": "a", "page": 1}, {"source": "a", "page": 1}, {"source": "a", "page": 2},
+                 {"source": "b", "page": 1}, {"source": "a", "page": 3}, {"source": "c"}, {"source": "c"}]
+    assert dedup_indices(metadatas, max_per_page=1) == [0, 2, 3, 4, 5, 6]  # no page: not deduplicated
+    assert dedup_indices(metadatas, max_per_page=1, max_per_source=2) == [0, 2, 3, 5, 6]
+    assert dedup_indices(metadatas, max_per_page=0) == list(range(7))
@@ -0,0 +1,84 @@
+import threading
+from types import SimpleNamespace as NS
+
+from rag_nakamo.agents.new_orch import SimpleOrchestrator
+from rag_nakamo.agents.resp_with_claims import ResponseAgent
+
+SUPPORTED = ("Design controls apply to class II devices. Manufacturers shall establish design input procedures. "
+             "Design verification confirms design output requirements. ")
+UNSUPPORTED = "Quarterly audits of packaging suppliers are mandatory everywhere. "
+DOCS = [{"content": SUPPORTED + "Design validation ensures devices conform to user needs.", "source": "FDA"}]
+
+
+class FakeCompletions:
+    """Formatting returns `formatted` (streamed in small deltas), the assessment waits for `release`."""
+
+    def __init__(self, formatted):
+        self.formatted = formatted
+        self.assessments = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def create(self, stream=False, **kwargs):
+        if kwargs.get("max_tokens") == 500:  # assessment call
+            self.assessments += 1
+            self.release.wait(5)
+            return NS(choices=[NS(message=NS(content='Result: {"overall_quality": 4}'))], usage=None)
+        if not stream:
+            return NS(choices=[NS(message=NS(content=self.formatted))], usage=None)
+        return (NS(choices=[NS(delta=NS(content=self.formatted[i:i + 7]))], usage=None)
+                for i in range(0, len(self.formatted), 7))
+
+
+def agent_with(formatted, **kwargs):
+    agent = ResponseAgent(**kwargs)
+    completions = FakeCompletions(formatted)
+    agent.client = NS(chat=NS(completions=completions))
+    return agent, completions
+
+
+def answer(agent, draft):
+    return agent.process_message({"question": "Design controls?", "answer": draft, "docs": DOCS})
+
+
+def test_overlapped_matches_sequential():
+    formatted = "## Executive Summary\n\n" + SUPPORTED + UNSUPPORTED
+    sequential, _ = agent_with(formatted)
+    overlapped, completions = agent_with(formatted, overlap_validation=True)
+    expected, result = answer(sequential, SUPPORTED + UNSUPPORTED), answer(overlapped, SUPPORTED + UNSUPPORTED)
+    assert result == expected
+    # the heading and the first sentence split as one "#" line, not a claim
+    assert result["metrics"] == {"coverage": 2 / 3, "total_claims": 3, "unsupported": 1}
+    assert result["llm_assessment"] == {"overall_quality": 4} and completions.assessments == 1
+    overlapped.close()
+
+
+def test_decisive_draft_skips_the_assessment():
+    agent, completions = agent_with("## Executive Summary\n\n" + SUPPORTED, overlap_validation=True,
+                                    skip_assessment_when_decisive=True)
+    result = answer(agent, SUPPORTED)
+    assert result["llm_assessment"] == {"skipped": "decisive draft coverage 1.00"}
+    assert completions.assessments == 0 and agent._executor is None  # no thread started
+
+
+def test_decisive_final_coverage_drops_a_running_assessment():
+    # draft half supported (not decisive): the assessment starts; the formatted answer is fully supported
+    agent, completions = agent_with(SUPPORTED, overlap_validation=True, skip_assessment_when_decisive=True)
+    completions.release.clear()
+    result = answer(agent, SUPPORTED + UNSUPPORTED * 3)
+    assert result["metrics"]["coverage"] == 1.0 and result["decision"] == "approve"
+    assert result["llm_assessment"] == {"skipped": "decisive coverage 1.00"}  # not waited for
+    completions.release.set()
+    agent.close()
+
+
+def test_orchestrator_close_stops_the_assessment_threads():
+    agent, _ = agent_with("## Executive Summary\n\n" + SUPPORTED + UNSUPPORTED, overlap_validation=True)
+    orchestrator = SimpleOrchestrator()
+    orchestrator.register_agent("response_agent", agent)
+    answer(agent, SUPPORTED + UNSUPPORTED)
+    executor = agent._executor
+    orchestrator.close()
+    assert agent._executor is None and executor._shutdown
+    assert answer(agent, SUPPORTED + UNSUPPORTED)["llm_assessment"] == {"overall_quality": 4}  # restarted
+    agent.close()
@@ -0,0 +1,78 @@
+from langchain_core.documents import Document
+
+from rag_nakamo.tokens import estimate_tokens
+from rag_nakamo.vectorstore.parents import _split_long, build_children, build_parents, select_parents
+
+BODY = "Manufacturers shall document the design inputs and review them before approval.\n" * 8  # ~650 chars
+
+
+def page(text, source, number, heading=""):
+    return Document(page_content=text, metadata={"source": source, "page": number, "section_heading": heading})
+
+
+def test_sections_split_at_headings_and_never_cross_files():
+    pages = [
+        page(f"1. Scope\n{BODY}2. Design Input\n{BODY}", "a.pdf", 0),
+        page(f"{BODY}3. Design Output\n{BODY}", "a.pdf", 1),  # section 2 runs on over the page break
+        page(f"{BODY}", "b.pdf", 0, heading="4. Annex"),  # continuation text of another file
+    ]
+    parents = build_parents(pages, unit="section", max_chars=10000)
+    assert [(p.metadata["section_heading"], p.metadata["source"], p.metadata["page"], p.metadata["page_end"])
+            for p in parents] == [
+        ("1. Scope", "a.pdf", 0, 0),
+        ("2. Design Input", "a.pdf", 0, 1),
+        ("3. Design Output", "a.pdf", 1, 1),
+        ("4. Annex", "b.pdf", 0, 0),  # a new file closes the section, heading from the page metadata
+    ]
+    assert parents[1].page_content.startswith("2. Design Input") and parents[1].page_content.count(BODY[:40]) == 16
+
+
+def test_short_sections_run_on_under_the_first_heading():
+    toc = "1. Scope\n2. Design Input\n3. Design Output\n"
+    parents = build_parents([page(toc + BODY, "a.pdf", 0)], unit="section")
+    assert len(parents) == 1 and parents[0].metadata["section_heading"] == "1. Scope"
+
+
+def test_page_unit_and_long_parents_are_split():
+    parents = build_parents([page(BODY, "a.pdf", 0), page(BODY * 3, "a.pdf", 1)], unit="page", max_chars=1000)
+    assert [p.metadata["page"] for p in parents] == [0, 1, 1]
+    assert all(len(p.page_content) <= 1000 for p in parents)
+
+
+def test_split_long_cuts_a_single_line_longer_than_max_chars():
+    line = "x" * 25
+    assert _split_long(line, 10) == ["x" * 10, "x" * 10, "x" * 5]
+    # the rest of the cut line packs with the next one
+    assert _split_long("short\n" + line + "\nend", 10) == ["short", "x" * 10, "x" * 10, "x" * 5 + "\nend"]
+    assert _split_long("a\nb\nc\n", 4) == ["a\nb", "c"]  # lines packed up to max_chars
+
+
+def test_children_carry_the_parent():
+    parents = build_parents([page(BODY, "a.pdf", 0)])
+    children = build_children(parents, ["p1"], child_chars=200)
+    assert len(children) == 4 and all(len(c.page_content) <= 200 for c in children)
+    assert {c.metadata["parent_id"] for c in children} == {"p1"}
+    assert children[0].metadata["parent_tokens"] == estimate_tokens(parents[0].page_content)
+
+
+def hit(parent_id, tokens):
+    return {"parent_id": parent_id, "parent_tokens": tokens}
+
+
+def test_select_parents_groups_by_best_child():
+    metadatas = [hit("a", 100), hit("b", 100), hit("a", 100), {"source": "flat"}, hit("c", 100)]
+    selected = select_parents(metadatas, [0.9, 0.8, 0.7, 0.6, 0.5], k=5)
+    assert [(pid, score) for pid, score, _ in selected] == [("a", 0.9), ("b", 0.8), ("c", 0.5)]
+    assert [m["matched_children"] for _, _, m in selected] == [2, 1, 1]
+    assert len(select_parents(metadatas, [0.9, 0.8, 0.7, 0.6, 0.5], k=2)) == 2
+
+
+def test_select_parents_skips_parents_over_the_budget():
+    metadatas = [hit("a", 300), hit("big", 900), hit("b", 300), hit("c", 300)]
+    selected = select_parents(metadatas, [0.9, 0.8, 0.7, 0.6], k=5, token_budget=700)
+    assert [pid for pid, _, _ in selected] == ["a", "b"]  # big skipped for smaller ones, c over the budget
+
+
+def test_select_parents_always_returns_the_best_parent():
+    selected = select_parents([hit("huge", 5000), hit("b", 10)], [0.9, 0.8], k=5, token_budget=100)
+    assert [pid for pid, _, _ in selected] == ["huge"]  # over the budget on its own, nothing fits after it
@@ -0,0 +1,112 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+pytest.importorskip("pyarrow")
+
+from rag_nakamo.vectorstore.chroma_manager import set_search_ef
+from rag_nakamo.vectorstore.chunk_store import ChunkStore, chunk_id
+from rag_nakamo.vectorstore.portable import (EMBEDDINGS, MANIFEST, RECORDS, VECTOR_TOLERANCE, ImportVerificationError,
+                                             export_collection, import_collection, load_export, max_vector_error,
+                                             verify_files)
+
+NAME = "regulatory_documents"
+
+
+@pytest.fixture
+def source(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / "source")
+    collection = chromadb.PersistentClient(path=path).get_or_create_collection(NAME, metadata={
+        "hnsw:space": "cosine", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10})
+    texts = [f"Chunk {i} about design controls." for i in range(30)]
+    collection.add(ids=[f"doc-{i}" for i in range(30)], embeddings=rng.normal(size=(30, 8)).astype(np.float32),
+                   documents=texts, metadatas=[{"source": "FDA", "page": i % 4} for i in range(30)])
+    set_search_ef(collection, 64)  # after creation: only in the configuration
+    return path, texts
+
+
+def test_round_trip_keeps_count_content_and_hnsw_configuration(tmp_path, source):
+    path, _ = source
+    out = str(tmp_path / "export")
+    manifest = export_collection(path, NAME, out, batch_size=7)
+    assert manifest["count"] == 30 and manifest["dims"] == 8
+    assert manifest["hnsw"]["ef_search"] == 64 and manifest["hnsw"]["space"] == "cosine"
+    assert not any(k.startswith("hnsw:") for k in manifest["collection_metadata"])  # no stale search_ef
+
+    target = str(tmp_path / "target")
+    result = import_collection(out, target, batch_size=11)
+    assert result["count"] == 30 and result["checksum"] == manifest["checksums"]["content"]
+    assert result["max_vector_error"] <= VECTOR_TOLERANCE  # cosine: normalized again on upsert
+    imported = chromadb.PersistentClient(path=target).get_collection(NAME)
+    assert imported.configuration_json["hnsw"]["ef_search"] == 64
+    assert imported.configuration_json["hnsw"]["space"] == "cosine"
+    got = imported.get(ids=["doc-3"], include=["documents", "metadatas"])
+    assert got["documents"] == ["Chunk 3 about design controls."] and got["metadatas"] == [{"source": "FDA", "page": 3}]
+
+    with pytest.raises(ImportVerificationError, match="not empty"):
+        import_collection(out, target)
+    assert import_collection(out, target, replace=True)["count"] == 30
+
+
+def test_compact_import_rewrites_chunk_ids(tmp_path, source):
+    path, texts = source
+    out = str(tmp_path / "export")
+    manifest = export_collection(path, NAME, out)
+    store = ChunkStore(str(tmp_path / "chunk_store"))
+    result = import_collection(out, str(tmp_path / "target"), chunk_store=store)
+    assert result["checksum"] == manifest["checksums"]["content"]  # chunk_id is not part of the content
+    got = chromadb.PersistentClient(path=str(tmp_path / "target")).get_collection(NAME).get(
+        ids=["doc-5"], include=["documents", "metadatas"])
+    assert got["documents"] == [None]  # text only in the chunk store
+    assert got["metadatas"][0]["chunk_id"] == chunk_id(texts[5])
+    assert store.get(got["metadatas"][0]["chunk_id"]) == texts[5]
+
+    # and back: a compact collection exports its texts from the chunk store
+    again = export_collection(str(tmp_path / "target"), NAME, str(tmp_path / "export2"), chunk_store=store)
+    assert again["checksums"]["content"] == manifest["checksums"]["content"]
+
+
+def test_changed_vector_is_detected(tmp_path, source):
+    path, _ = source
+    out = str(tmp_path / "export")
+    export_collection(path, NAME, out)
+    target = str(tmp_path / "target")
+    import_collection(out, target)
+    table, embeddings = load_export(out)
+    ids = table.column("id").to_pylist()
+    collection = chromadb.PersistentClient(path=target).get_collection(NAME)
+    assert max_vector_error(collection, ids, embeddings, batch_size=7) <= VECTOR_TOLERANCE
+    collection.upsert(ids=[ids[12]], embeddings=[np.asarray(embeddings[12]) * -1])
+    assert max_vector_error(collection, ids, embeddings, batch_size=7) > 0.1
+    collection.delete(ids=[ids[3]])
+    assert max_vector_error(collection, ids, embeddings) == float("inf")
+
+
+@pytest.mark.parametrize("name", [RECORDS, EMBEDDINGS])
+def test_truncated_file_is_rejected(tmp_path, source, name):
+    path, _ = source
+    out = str(tmp_path / "export")
+    export_collection(path, NAME, out)
+    assert verify_files(out)["count"] == 30
+    file = os.path.join(out, name)
+    with open(file, "r+b") as f:
+        f.truncate(os.path.getsize(file) - 100)
+    with pytest.raises(ImportVerificationError, match=name):
+        verify_files(out)
+    with pytest.raises(ImportVerificationError):
+        import_collection(out, str(tmp_path / "target"))
+    assert not os.path.exists(str(tmp_path / "target"))  # rejected before anything was written
+
+
+def test_unsupported_format_is_rejected(tmp_path, source):
+    path, _ = source
+    out = str(tmp_path / "export")
+    manifest = export_collection(path, NAME, out)
+    with open(os.path.join(out, MANIFEST), "w") as f:
+        json.dump({**manifest, "format_version": 99}, f)
+    with pytest.raises(ImportVerificationError, match="format"):
+        verify_files(out)
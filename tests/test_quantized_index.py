@@ -0,0 +1,42 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from rag_nakamo.vectorstore.quantized_index import QUANTIZATIONS, QuantizedIndex, build_from_chroma
+
+
+def vectors(n, dim=64, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization", QUANTIZATIONS)
+def test_finds_the_query_vector(tmp_path, quantization):
+    docs = vectors(200)
+    index = QuantizedIndex.build(str(tmp_path), [f"id{i}" for i in range(200)], docs,
+                                 [{"page": i} for i in range(200)], dims=32, quantization=quantization)
+    hits = index.search(docs[17], k=3, oversample=8)
+    assert hits[0][0] == 17 and hits[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert len(hits) == 3 and [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+
+def test_meta_keeps_ids_not_texts(tmp_path):
+    QuantizedIndex.build(str(tmp_path), ["a", "b"], vectors(2), [{"chunk_id": "x"}, {"chunk_id": "y"}], dims=16)
+    with open(os.path.join(tmp_path, "meta.json")) as f:
+        meta = json.load(f)
+    assert meta["ids"] == ["a", "b"] and "documents" not in meta
+
+
+@pytest.mark.parametrize("quantization", QUANTIZATIONS)
+def test_empty_collection(tmp_path, quantization):
+    index = QuantizedIndex.build(str(tmp_path), [], np.zeros((0, 64)), [], dims=32, quantization=quantization)
+    assert QuantizedIndex(str(tmp_path)).search(vectors(1)[0], k=5) == []
+    assert index.search(vectors(1)[0], k=5) == []
+
+
+def test_build_from_empty_chroma_collection(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    chromadb.PersistentClient(path=str(tmp_path / "chroma")).get_or_create_collection("empty")
+    index = build_from_chroma(str(tmp_path / "chroma"), "empty", str(tmp_path / "q"), dims=32, quantization="int8")
+    assert index.ids == [] and index.search(vectors(1)[0], k=3) == []
@@ -0,0 +1,105 @@
+import os
+import time
+
+import pytest
+
+from rag_nakamo.agents.rag import RAGAgent, _IndexHandle
+from rag_nakamo.vectorstore.versions import IndexVersions
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def agent_on(root):
+    agent = RAGAgent(name="RAG Agent", description="RAG Agent")
+    agent.__dict__["embeddings"] = FakeEmbeddings()
+    agent._versions = IndexVersions(str(root))
+    return agent
+
+
+def build(versions, name):
+    os.makedirs(versions.path(name))
+    versions._write_manifest(name, {"version": name, "status": "building"})
+    versions.validate(name, check=lambda query: 1, queries=["q"])
+    versions.activate(name)
+    time.sleep(0.01)  # distinct pointer mtime
+    return name
+
+
+def wait_for(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_retired_handle_closes_after_the_last_query(monkeypatch):
+    closed = []
+    monkeypatch.setattr(_IndexHandle, "close", lambda self: closed.append(self.version))
+    handle = _IndexHandle(agent=None, version="v1")
+    assert handle.pin() and handle.pin()
+    handle.retire()
+    assert not handle.pin()  # newer version current: queries go there
+    handle.unpin()
+    assert closed == []
+    handle.unpin()
+    assert closed == ["v1"]
+
+
+def test_switch_releases_the_previous_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(_IndexHandle, "open", lambda self, query_embedding: None)
+    agent = agent_on(tmp_path)
+    build(agent._versions, "v1")
+    closed = []
+    monkeypatch.setattr(_IndexHandle, "close", lambda self: closed.append(self.version))
+    with agent.pinned_index() as old:
+        assert old.version == "v1"
+        build(agent._versions, "v2")
+        agent._current_index()  # notices the pointer, opens v2 in the background
+        wait_for(lambda: agent._index.version == "v2")
+        assert closed == []  # still pinned by this query
+    assert closed == ["v1"]
+    with agent.pinned_index() as current:
+        assert current.version == "v2"
+    assert closed == ["v1"]
+
+
+def test_failed_open_keeps_serving_and_closes_the_new_handle(tmp_path, monkeypatch):
+    agent = agent_on(tmp_path)
+    build(agent._versions, "v1")
+    agent._current_index()
+    closed = []
+    monkeypatch.setattr(_IndexHandle, "close", lambda self: closed.append(self.version))
+
+    def broken(self, query_embedding):
+        raise RuntimeError("corrupt segment")
+
+    monkeypatch.setattr(_IndexHandle, "open", broken)
+    build(agent._versions, "v2")
+    agent._current_index()
+    wait_for(lambda: not agent._switching)
+    assert agent._index.version == "v1" and closed == ["v2"]
+    assert agent._index_stamp == agent._versions.pointer_stamp()  # not retried on every query
+
+
+def test_close_releases_the_chroma_system(tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    from chromadb.api.shared_system_client import SharedSystemClient
+    path = str(tmp_path / "chroma_db")
+    chromadb.PersistentClient(path=path).get_or_create_collection("regulatory_documents").add(
+        ids=["a"], embeddings=[[1.0, 0.0, 0.0]], documents=["Design validation."])
+    agent = agent_on(tmp_path)
+    handle = _IndexHandle(agent, "v1", chroma_db_path=path)
+    handle.open(FakeEmbeddings().embed_query("q"))
+    assert path in SharedSystemClient._identifier_to_system
+    handle.close()
+    assert path not in SharedSystemClient._identifier_to_system
+    assert "retriever" not in handle.__dict__
+    reopened = chromadb.PersistentClient(path=path).get_collection("regulatory_documents")
+    assert reopened.count() == 1  # the path opens again afterwards
+
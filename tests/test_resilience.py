@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from rag_nakamo.llm.resilience import (AdmissionControl, AIMDLimiter, DeadlineExceeded, TokenBucket,
+                                       estimate_call_tokens)
+from rag_nakamo.tokens import estimate_tokens
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def test_token_estimates():
+    assert estimate_tokens("x" * 400) == 100
+    messages = [{"role": "system", "content": "x" * 200}, {"role": "user", "content": "y" * 200}]
+    assert estimate_call_tokens(messages, max_tokens=50) == 150
+    assert estimate_call_tokens(None) == 0
+
+
+def test_bucket_spends_then_waits_for_refill():
+    bucket = TokenBucket(per_minute=600, capacity=2)  # 10 per second
+    assert bucket.acquire() < 0.01 and bucket.acquire() < 0.01
+    waited = bucket.acquire()
+    assert 0.05 < waited < 0.5
+
+
+def test_bucket_deadline_and_oversized_requests():
+    bucket = TokenBucket(per_minute=60, capacity=10)
+    bucket.acquire(10)
+    with pytest.raises(DeadlineExceeded):
+        bucket.acquire(5, deadline=time.monotonic() + 0.1)  # 5 s of refill needed
+    assert TokenBucket(per_minute=60, capacity=10).acquire(1000) < 0.01  # capped at capacity
+
+
+def test_bucket_adjust_records_debt():
+    bucket = TokenBucket(per_minute=6000, capacity=100)
+    bucket.acquire(100)
+    bucket.adjust(50)  # the call used 50 more than estimated
+    assert bucket.tokens < 0
+
+
+def test_aimd_additive_increase_multiplicative_decrease():
+    limiter = AIMDLimiter(initial=4, minimum=1, maximum=8, latency_target_s=1.0, cooldown_s=0.0)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert limiter.limit == pytest.approx(5.0, abs=0.1)  # +1/limit per success
+    limiter.acquire()
+    limiter.release(0.1, congested=True)
+    assert limiter.limit == pytest.approx(2.5, abs=0.1)  # halved on 429 / timeout
+    limiter.acquire()
+    limiter.release(5.0)
+    assert limiter.limit == pytest.approx(2.25, abs=0.1)  # x0.9 above the latency target
+    assert limiter.inflight == 0
+
+
+def test_aimd_cooldown_counts_a_burst_once():
+    limiter = AIMDLimiter(initial=8, cooldown_s=60.0)
+    for _ in range(3):
+        limiter.acquire()
+    for _ in range(3):
+        limiter.release(0.1, congested=True)
+    assert limiter.limit == 4.0
+
+
+def test_aimd_blocks_at_the_limit():
+    limiter = AIMDLimiter(initial=1)
+    limiter.acquire()
+    with pytest.raises(DeadlineExceeded):
+        limiter.acquire(deadline=time.monotonic() + 0.05)
+
+
+def test_admission_control_retries_retryable_errors():
+    control = AdmissionControl("test", rpm=6000, tpm=1e6, backoff_base_s=0.001)
+    failures = [RateLimited(), RateLimited()]
+
+    def flaky(timeout=None):
+        if failures:
+            raise failures.pop()
+        return "ok"
+
+    assert control.call(flaky) == "ok"
+    assert control.stats["retries"] == 2 and control.stats["throttled"] == 2
+    assert control.concurrency.inflight == 0
+
+
+def test_admission_control_does_not_retry_other_errors():
+    control = AdmissionControl("test", rpm=6000, tpm=1e6)
+    calls = []
+
+    def broken(timeout=None):
+        calls.append(timeout)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        control.call(broken)
+    assert len(calls) == 1 and control.stats["errors"] == 1
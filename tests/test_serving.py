@@ -0,0 +1,95 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from rag_nakamo import serving
+from rag_nakamo.metrics import REQUESTS
+from rag_nakamo.settings import get_settings
+
+
+class FakePipeline:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def answer(self, query, deadline_s=None, conversation_id=None):
+        self.calls.append((query, deadline_s, conversation_id))
+        if self.fail:
+            raise RuntimeError("index unavailable")
+        return {"response": f"answer to {query}", "used_rag": True, "degradations": []}
+
+
+@pytest.fixture
+def server():
+    pipeline = FakePipeline()
+    httpd = serving.ThreadingHTTPServer(("127.0.0.1", 0), serving.make_handler(pipeline))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, pipeline
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(httpd, method, path, body=None):
+    connection = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    payload = body if isinstance(body, (bytes, type(None))) else json.dumps(body).encode()
+    connection.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, response.getheader("Content-Type"), data
+
+
+def test_health(server):
+    httpd, _ = server
+    status, content_type, data = request(httpd, "GET", "/health")
+    assert status == 200 and content_type == "application/json"
+    assert json.loads(data)["status"] == "ok"
+
+
+def test_query(server):
+    httpd, pipeline = server
+    status, _, data = request(httpd, "POST", "/query",
+                              {"query": "Design controls?", "deadline_s": 10, "conversation_id": "c1"})
+    assert status == 200 and json.loads(data)["response"] == "answer to Design controls?"
+    assert pipeline.calls == [("Design controls?", 10, "c1")]
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"deadline_s": 10}, "missing query"),
+    ({"query": "q", "deadline_s": "soon"}, "deadline_s must be a number"),
+    (b"not json", "expected JSON body"),
+    ([1, 2], "expected JSON body"),
+])
+def test_bad_queries_are_rejected(server, body, error):
+    httpd, pipeline = server
+    status, _, data = request(httpd, "POST", "/query", body)
+    assert status == 400 and json.loads(data)["error"].startswith(error)
+    assert pipeline.calls == []
+
+
+def test_pipeline_error_is_a_500(server):
+    httpd, pipeline = server
+    pipeline.fail = True
+    status, _, data = request(httpd, "POST", "/query", {"query": "q"})
+    assert status == 500 and json.loads(data) == {"error": "index unavailable"}
+
+
+def test_metrics(server, monkeypatch):
+    httpd, _ = server
+    REQUESTS.labels("true", "success").inc()
+    status, content_type, data = request(httpd, "GET", "/metrics")
+    assert status == 200 and content_type.startswith("text/plain")
+    assert 'rag_requests_total{status="success",used_rag="true"}' in data.decode()
+
+    disabled = get_settings().model_copy(update={"enable_metrics": False})
+    monkeypatch.setattr(serving, "get_settings", lambda: disabled)
+    assert request(httpd, "GET", "/metrics")[0] == 404
+
+
+def test_unknown_paths(server):
+    httpd, _ = server
+    assert request(httpd, "GET", "/nope")[0] == 404
+    assert request(httpd, "POST", "/health", {})[0] == 404
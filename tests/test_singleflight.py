@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from rag_nakamo.agents.new_orch import SimpleOrchestrator
+from rag_nakamo.deadline import Deadline
+from rag_nakamo.singleflight import SingleFlight, normalize_query
+from rag_nakamo.vectorstore.chunk_store import ChunkHit
+
+
+def run_concurrently(n, target):
+    results = [None] * n
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, target(i))) for i in range(n)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    return results
+
+
+def test_normalize_query():
+    assert normalize_query("  What are  FDA requirements?? ") == "what are fda requirements"
+
+
+def test_concurrent_calls_share_one_execution():
+    flight, calls = SingleFlight("test"), []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return {"value": x}
+
+    results = run_concurrently(5, lambda i: flight.do("key", slow, 1))
+    assert calls == [1]
+    assert all(r == {"value": 1} for r in results)
+    assert len({id(r) for r in results}) == 5  # every caller owns its result
+    assert flight.stats == {"leaders": 1, "followers": 4}
+    assert flight.coalescing_ratio() == pytest.approx(0.8)
+
+
+def test_sequential_calls_are_not_cached():
+    flight, calls = SingleFlight("test"), []
+    for _ in range(3):
+        flight.do("key", lambda: calls.append(1))
+    assert len(calls) == 3
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight("test")
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    def call(i):
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            return str(e)
+
+    assert run_concurrently(3, call) == ["boom"] * 3
+
+
+def test_shared_chunk_hits_are_copied_with_the_store():
+    flight, store = SingleFlight("test"), object()
+
+    def search():
+        time.sleep(0.1)
+        return [ChunkHit("id", 0.9, {"source": "a.pdf"}, store)]
+
+    hits = [h[0] for h in run_concurrently(3, lambda i: flight.do("key", search))]
+    hits[0].rank, hits[0].metadata["source"] = 7, "b.pdf"
+    assert [h.rank for h in hits[1:]] == [0, 0]
+    assert [h["source"] for h in hits[1:]] == ["a.pdf", "a.pdf"]
+    assert all(h._store is store for h in hits)
+
+
+class SlowOrchestrator(SimpleOrchestrator):
+    def __init__(self):
+        super().__init__()
+        self._inflight = SingleFlight("orchestrator-test")
+        self.runs = 0
+
+    def _run_workflow(self, context):
+        self.runs += 1
+        time.sleep(0.2)
+        degradations = [{"degradation": "skip_rerank", "remaining_s": 1.0}] if context.deadline else []
+        return {"status": "success", "response": "answer", "rag_results": [], "used_rag": False,
+                "degradations": degradations, **self._own_fields(context)}
+
+
+def test_followers_get_their_own_request_fields():
+    orchestrator = SlowOrchestrator()
+    results = run_concurrently(3, lambda i: orchestrator.process_message("same question"))
+    assert orchestrator.runs == 1
+    assert len({r["request_id"] for r in results}) == 3
+    assert sum("coalesced_with" in r for r in results) == 2
+    results[0]["response"] = "guarded"
+    assert [r["response"] for r in results[1:]] == ["answer", "answer"]
+
+
+def test_conversations_and_deadline_classes_do_not_coalesce():
+    orchestrator = SlowOrchestrator()
+    run_concurrently(2, lambda i: orchestrator.process_message("same question", conversation_id=f"c{i}"))
+    assert orchestrator.runs == 2
+    budgets = [Deadline(2.0), Deadline(60.0)]
+    run_concurrently(2, lambda i: orchestrator.process_message("same question", deadline=budgets[i]))
+    assert orchestrator.runs == 4
+
+
+def test_followers_keep_the_leaders_degradations():
+    orchestrator = SlowOrchestrator()
+    deadlines = [Deadline(30.0) for _ in range(3)]
+    results = run_concurrently(3, lambda i: orchestrator.process_message("same question", deadline=deadlines[i]))
+    assert orchestrator.runs == 1
+    # a follower's answer is the leader's, produced without the rerank
+    assert all([d["degradation"] for d in r["degradations"]] == ["skip_rerank"] for r in results)
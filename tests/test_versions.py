@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from rag_nakamo.vectorstore.versions import IndexValidationError, IndexVersions, main
+
+
+@pytest.fixture
+def versions(tmp_path):
+    return IndexVersions(str(tmp_path), keep=2)
+
+
+def build(versions, name):
+    """A validated version directory named `name` (create() names by time, too coarse here)."""
+    os.makedirs(versions.path(name))
+    versions._write_manifest(name, {"version": name, "status": "building"})
+    versions.validate(name, check=lambda query: 3, queries=["q"], expected_count=10, count=10)
+    return name
+
+
+def test_activate_requires_validation(versions):
+    name = versions.create()
+    with pytest.raises(IndexValidationError):
+        versions.activate(name)
+    versions.activate(name, force=True)
+    assert versions.current() == name
+
+
+def test_failed_validation_marks_the_version(versions):
+    name = versions.create()
+    with pytest.raises(IndexValidationError):
+        versions.validate(name, check=lambda query: 0, queries=["q"])
+    assert versions.manifest(name)["status"] == "failed"
+
+
+def test_repeated_rollbacks_keep_going_back(versions):
+    # regression: the second rollback used to go forward again (A, B, C -> B -> C)
+    for name in "ABC":
+        versions.activate(build(versions, name))
+    assert versions.rollback() == "B"
+    assert versions.rollback() == "A"
+    assert versions.current() == "A"
+    with pytest.raises(IndexValidationError):
+        versions.rollback()
+
+
+def test_activation_after_rollback(versions):
+    for name in "ABC":
+        versions.activate(build(versions, name))
+    versions.rollback()
+    versions.activate(build(versions, "D"))
+    assert versions.stack() == ["A", "B", "D"]
+    assert versions.rollback() == "B"
+    assert versions.rollback() == "A"
+
+
+def test_rollback_skips_pruned_versions(versions):
+    for name in "ABC":
+        versions.activate(build(versions, name))
+    os.remove(os.path.join(versions.path("B"), "manifest.json"))
+    assert versions.rollback() == "A"
+
+
+def test_prune_keeps_current_and_rollback_targets(versions):
+    for name in "ABCD":
+        versions.activate(build(versions, name))
+    assert versions.prune(min_age_s=0) == ["A", "B"]
+    assert versions.versions() == ["C", "D"]
+
+
+def test_cli_activate_without_version(tmp_path, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["versions", "activate", "--root", str(tmp_path)])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
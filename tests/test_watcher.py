@@ -0,0 +1,122 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("chromadb")
+from langchain_core.documents import Document
+
+from rag_nakamo.settings import get_settings
+from rag_nakamo.vectorstore import ingestion
+from rag_nakamo.vectorstore.watcher import DocumentWatcher, IncrementalIndexer
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [1.0, float(len(text) % 7), float(text.count(" "))]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+class ParagraphChunker:
+    def create_documents(self, texts):
+        return [Document(page_content=p) for text in texts for p in text.split("\n\n") if p.strip()]
+
+
+@pytest.fixture
+def indexer(tmp_path, monkeypatch):
+    # the "PDFs" are text files, one page per form feed
+    monkeypatch.setattr(ingestion, "extract_pages",
+                        lambda path, backend, cache, digest: open(path).read().split("\f"))
+    settings = get_settings().model_copy(update={
+        "index_root": None, "chroma_db_path": str(tmp_path / "chroma_db"),
+        "chroma_collection_name": "watched_docs", "use_chunk_store": False, "enable_parent_retrieval": False,
+        "strip_page_furniture": False, "dedup_chunks": "off", "page_cache_path": None,
+        "watch_metrics_path": None, "vector_index": "chroma",
+        "quantized_index_path": str(tmp_path / "quantized_index"), "quantized_dims": 0,
+    })
+    indexer = IncrementalIndexer(FakeEmbeddings(), ParagraphChunker(), settings)
+    yield indexer
+    indexer.close()
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    return str(path)
+
+
+def texts_of(indexer, path):
+    return sorted(indexer.collection.get(where={"file_path": path})["documents"])
+
+
+def test_ready_waits_for_the_debounce(tmp_path):
+    watcher = DocumentWatcher(str(tmp_path), indexer=None, debounce_s=0.2)
+    watcher.touch(str(tmp_path / "a.pdf"))
+    watcher.touch(str(tmp_path / "notes.txt"))  # not a document
+    assert watcher.ready() == [] and watcher.queue_depth() == 1
+    time.sleep(0.1)
+    watcher.touch(str(tmp_path / "a.pdf"))  # a second save restarts the quiet period
+    time.sleep(0.15)
+    assert watcher.ready() == []
+    time.sleep(0.1)
+    assert watcher.ready() == [os.path.join(str(tmp_path), "a.pdf")]
+    assert watcher.ready() == [] and watcher.queue_depth() == 0
+
+
+def test_unchanged_content_is_not_reindexed(tmp_path, indexer):
+    path = write(tmp_path / "a.pdf", "Design controls.\n\nRisk management.")
+    indexer.process([path])
+    assert indexer.metrics["files_indexed"] == 1 and indexer.collection.count() == 2
+    assert not indexer.is_changed(path)
+    os.utime(path)  # touched, same bytes
+    watcher = DocumentWatcher(str(tmp_path), indexer)
+    watcher.scan()
+    assert watcher.queue_depth() == 0
+    indexer.process([path])
+    assert indexer.metrics["files_unchanged"] == 1 and indexer.metrics["files_indexed"] == 1
+
+
+def test_changed_file_replaces_its_chunks_and_removed_file_is_deleted(tmp_path, indexer):
+    a = write(tmp_path / "a.pdf", "Design controls.\n\nRisk management.\n\nLabelling.")
+    b = write(tmp_path / "b.pdf", "Clinical evaluation.")
+    indexer.process([a, b])
+    assert indexer.collection.count() == 4
+
+    write(a, "Design controls, revised.")
+    assert indexer.is_changed(a)
+    indexer.process([a])
+    assert texts_of(indexer, a) == ["Design controls, revised."]  # none of the three old chunks left
+    assert texts_of(indexer, b) == ["Clinical evaluation."]
+    assert indexer.metrics["chunks_deleted"] == 3 and indexer.files[a]["chunks"] == 1
+
+    os.remove(b)
+    watcher = DocumentWatcher(str(tmp_path), indexer)
+    watcher.scan()
+    assert watcher.queue_depth() == 1  # the deletion
+    indexer.process([b])
+    assert texts_of(indexer, b) == [] and b not in indexer.files
+    assert indexer.collection.count() == 1
+
+
+def test_state_survives_a_restart(tmp_path, indexer):
+    path = write(tmp_path / "a.pdf", "Design controls.")
+    indexer.process([path])
+    restarted = IncrementalIndexer(FakeEmbeddings(), ParagraphChunker(), indexer.settings)
+    assert restarted.files == indexer.files and not restarted.is_changed(path)
+
+
+def test_collection_is_opened_once(indexer):
+    assert indexer.collection is indexer.collection
+
+
+def test_in_place_batches_rebuild_the_quantized_index(tmp_path, indexer):
+    from rag_nakamo.vectorstore.quantized_index import QuantizedIndex
+    indexer.settings = indexer.settings.model_copy(update={"vector_index": "quantized"})
+    a = write(tmp_path / "a.pdf", "Design controls.\n\nRisk management.")
+    indexer.process([a])
+    assert len(QuantizedIndex(indexer.settings.quantized_index_path).ids) == 2
+    b = write(tmp_path / "b.pdf", "Clinical evaluation.")
+    indexer.process([b])
+    assert len(QuantizedIndex(indexer.settings.quantized_index_path).ids) == 3